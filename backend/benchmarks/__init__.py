@@ -0,0 +1 @@
+"""LiveWar 性能基准（无网络，直接驱动 LiveWarGameManager）"""
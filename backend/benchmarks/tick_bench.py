@@ -0,0 +1,331 @@
+"""
+LiveWar tick 基准测试
+
+说明：
+- 不经过 websocket / 调度器：按脚本化场景直接构造房间，逐 tick 推进并分阶段计时
+- 阶段与 LiveWarGameManager._process_tick 的顺序一致：
+  index（重建空间索引 / 格子计数）、mine_refresh、unit_ai、combat、cleanup（能量掉落、主矿工重生、胜负判定）、
+  state_build（构建并序列化状态帧，每个玩家和一个观战者各取一次）
+- 场景使用确定性模式（固定种子），同一场景在不同提交之间得到相同的初始局面
+- 结果为 JSON：每个场景的 ops/sec、tick 与各阶段耗时的 p50 / p99（毫秒）、序列化字节数，
+  以及可选的每 tick 内存分配峰值（tracemalloc，会显著拖慢运行，单独统计）
+
+用法：
+    python -m benchmarks.tick_bench                            # 全部场景，JSON 输出到标准输出
+    python -m benchmarks.tick_bench -s units_200 -s dense_melee --ticks 300
+    python -m benchmarks.tick_bench -o before.json             # 保存结果
+    python -m benchmarks.tick_bench --compare before.json      # 与之前的结果逐项对比
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from protos import game_pb2
+from service import game_manager as gm_module
+from service.game_manager import GAME_RULES, SCHEDULER_CONFIG, LiveWarGameManager, RoomGameState
+
+ROOM_ID = 1
+PLAYERS = ((1, "red"), (2, "blue"))
+SPECTATOR = None
+UNIT_TYPES = ("miner", "engineer", "heavy_tank", "assault_tank")
+PHASES = ("index", "mine_refresh", "unit_ai", "combat", "cleanup", "state_build")
+
+
+# ========== 场景 ==========
+
+def _spawn(gm: LiveWarGameManager, state: RoomGameState, team: str, unit_type: str, x: float, y: float) -> None:
+    user_id = 1 if team == "red" else 2
+    gm._spawn_basic_unit_for_player(ROOM_ID, user_id, team, unit_type)
+    unit = state.units.get(state.next_entity_id - 1)
+    gm._untrack_unit(state, unit)
+    unit.x = unit.target_x = x
+    unit.y = unit.target_y = y
+    unit.last_position = (x, y)
+    gm._track_unit(state, unit)
+
+
+def _set_lakes(gm: LiveWarGameManager, state: RoomGameState, cells) -> None:
+    """替换湖泊并重建障碍网格（避开基地所在格子）"""
+    bases = {(int(b.x), int(b.y)) for b in (state.red_base, state.blue_base) if b}
+    state.lakes = [cell for cell in dict.fromkeys(cells) if cell not in bases]
+    gm._rebuild_obstacles(state)
+
+
+def skirmish(units: int) -> Callable:
+    """两军混编，随机分布在地图中部"""
+
+    def setup(gm: LiveWarGameManager, state: RoomGameState, rng: random.Random) -> None:
+        for i in range(units):
+            team = "red" if i % 2 == 0 else "blue"
+            _spawn(gm, state, team, UNIT_TYPES[(i // 2) % 4], rng.uniform(10, 50), rng.uniform(10, 50))
+
+    return setup
+
+
+def dense_melee(gm: LiveWarGameManager, state: RoomGameState, rng: random.Random) -> None:
+    """200 个战斗单位挤在地图中心 10x10 的范围内"""
+    for i in range(200):
+        team = "red" if i % 2 == 0 else "blue"
+        _spawn(gm, state, team, UNIT_TYPES[2 + (i // 2) % 2], rng.uniform(25, 35), rng.uniform(25, 35))
+
+
+def maze_lakes(gm: LiveWarGameManager, state: RoomGameState, rng: random.Random) -> None:
+    """三道横贯地图的湖泊墙，缺口交替出现在两端；100 个坦克从两侧基地出发穿越迷宫"""
+    cells = []
+    for index, wall_x in enumerate((15, 30, 45)):
+        gap = range(2, 6) if index % 2 == 0 else range(state.height - 6, state.height - 2)
+        cells.extend((wall_x, y) for y in range(state.height) if y not in gap)
+    _set_lakes(gm, state, cells)
+    for i in range(100):
+        team = "red" if i % 2 == 0 else "blue"
+        base = state.red_base if team == "red" else state.blue_base
+        _spawn(gm, state, team, UNIT_TYPES[2 + (i // 2) % 2], base.x + rng.uniform(-3, 3), base.y + rng.uniform(-3, 3))
+
+
+def stuck_units(gm: LiveWarGameManager, state: RoomGameState, rng: random.Random) -> None:
+    """两圈湖泊分别围住 50 个单位，它们的目标都在包围圈外，会一直触发卡住检测与重新寻路"""
+    cells = []
+    for cx, cy in ((20, 30), (40, 30)):
+        for angle in range(0, 360, 3):
+            cells.append((int(cx + 7 * math.cos(math.radians(angle))), int(cy + 7 * math.sin(math.radians(angle)))))
+    _set_lakes(gm, state, cells)
+    for i in range(100):
+        team = "red" if i % 2 == 0 else "blue"
+        cx = 20 if team == "red" else 40
+        _spawn(gm, state, team, UNIT_TYPES[(i // 2) % 4], cx + rng.uniform(-4, 4), 30 + rng.uniform(-4, 4))
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "units_10": skirmish(10),
+    "units_50": skirmish(50),
+    "units_200": skirmish(200),
+    "units_500": skirmish(500),
+    "dense_melee": dense_melee,
+    "maze_lakes": maze_lakes,
+    "stuck_units": stuck_units,
+}
+
+
+def build_room(name: str, seed: int) -> LiveWarGameManager:
+    """按场景构造一个已开始游戏的房间（不加入全局调度器）"""
+    gm = LiveWarGameManager(seed=seed, record=False)
+    for user_id, team in PLAYERS:
+        gm.handle_envelope_from_client(
+            ROOM_ID,
+            user_id,
+            f"bench{user_id}",
+            game_pb2.GameMessage(type=game_pb2.GameMessage.JOIN_GAME, join_game=game_pb2.JoinGameRequest(team=team)),
+        )
+    gm._stop_game_loop(ROOM_ID)
+    state = gm.room_states[ROOM_ID]
+    # 加入游戏时生成的主矿工不计入场景
+    for unit in list(state.units):
+        gm._untrack_unit(state, unit)
+    state.units.clear()
+    state.player_main_miner_id.clear()
+    # 基地血量调高，避免场景中途分出胜负
+    for base in (state.red_base, state.blue_base):
+        base.hp = base.hp_max = 10 ** 9
+    SCENARIOS[name](gm, state, random.Random(seed))
+    return gm
+
+
+# ========== 计时 ==========
+
+async def run_tick(gm: LiveWarGameManager, timings: Optional[Dict[str, List[float]]] = None) -> int:
+    """
+    推进一个 tick，阶段顺序与 _process_tick 一致；timings 不为 None 时记录各阶段耗时（秒）。
+
+    Returns:
+        本 tick 序列化的状态字节数（不广播的 tick 为 0）
+    """
+    state = gm.room_states[ROOM_ID]
+    clock = time.perf_counter
+    state.tick += 1
+    state.game_time = state.tick * GAME_RULES["tick_interval"]
+    current_time = state.game_start_time + state.game_time
+
+    started = clock()
+    state.unit_index.rebuild(state.units)
+    state.occupancy.rebuild_units(state.units)
+    if state.unit_arrays is not None:
+        state.unit_arrays.rebuild(state.units)
+    t_index = clock()
+    gm._process_mine_field_refresh(ROOM_ID, current_time)
+    t_mines = clock()
+    gm._process_unit_ai(ROOM_ID, current_time)
+    t_ai = clock()
+    if state.unit_arrays is not None:
+        gm._process_combat_vectorized(ROOM_ID, current_time)
+    else:
+        gm._process_combat(ROOM_ID, current_time)
+    t_combat = clock()
+    gm._cleanup_energy_drops(ROOM_ID, current_time)
+    gm._check_and_respawn_player_miners(ROOM_ID, current_time)
+    await gm._check_game_over(ROOM_ID)
+    t_cleanup = clock()
+    size = 0
+    if state.tick % SCHEDULER_CONFIG["broadcast_every"] == 0:
+        frame = gm.build_state_frame(ROOM_ID)
+        for user_id, _ in PLAYERS:
+            size += len(frame.for_user(user_id, delta=True))
+        size += len(frame.for_user(SPECTATOR, delta=True))
+        state.heal_effects.clear()
+        state.bullet_effects.clear()
+    finished = clock()
+
+    if timings is not None:
+        for phase, duration in zip(
+            PHASES + ("tick",),
+            (t_index - started, t_mines - t_index, t_ai - t_mines, t_combat - t_ai,
+             t_cleanup - t_combat, finished - t_cleanup, finished - started),
+        ):
+            timings[phase].append(duration)
+    return size
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    """秒 -> 毫秒的 mean / p50 / p99 / max"""
+    return {
+        "mean_ms": round(statistics.fmean(values) * 1000, 4),
+        "p50_ms": round(_percentile(values, 50) * 1000, 4),
+        "p99_ms": round(_percentile(values, 99) * 1000, 4),
+        "max_ms": round(max(values) * 1000, 4),
+    }
+
+
+async def bench_scenario(name: str, ticks: int, warmup: int, seed: int, allocations: bool) -> Dict[str, object]:
+    gm = build_room(name, seed)
+    state = gm.room_states[ROOM_ID]
+    units_start = len(state.units)
+    for _ in range(warmup):
+        await run_tick(gm)
+
+    timings: Dict[str, List[float]] = {phase: [] for phase in PHASES + ("tick",)}
+    sizes = []
+    gc_before = sum(s["collections"] for s in gc.get_stats())
+    for _ in range(ticks):
+        size = await run_tick(gm, timings)
+        if size:
+            sizes.append(size)
+    gc_collections = sum(s["collections"] for s in gc.get_stats()) - gc_before
+
+    result: Dict[str, object] = {
+        "ticks": ticks,
+        "units_start": units_start,
+        "units_end": len(state.units),
+        "ops_per_sec": round(ticks / sum(timings["tick"]), 2),
+        "tick": _summary(timings["tick"]),
+        "phases": {phase: _summary(timings[phase]) for phase in PHASES},
+        "state_bytes_per_broadcast": round(statistics.fmean(sizes)) if sizes else 0,
+        "gc_collections": gc_collections,
+    }
+
+    if allocations:
+        # tracemalloc 会让每次分配都变慢，单独跑一轮，只统计内存不计时
+        peaks = []
+        tracemalloc.start()
+        retained_before = tracemalloc.get_traced_memory()[0]
+        for _ in range(min(ticks, 50)):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await run_tick(gm)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = tracemalloc.get_traced_memory()[0] - retained_before
+        tracemalloc.stop()
+        result["allocations"] = {
+            "peak_kb_per_tick_p50": round(_percentile(peaks, 50) / 1024, 1),
+            "peak_kb_per_tick_p99": round(_percentile(peaks, 99) / 1024, 1),
+            "retained_kb": round(retained / 1024, 1),
+        }
+    return result
+
+
+# ========== 入口 ==========
+
+def _compare(baseline: Dict[str, object], results: Dict[str, object]) -> None:
+    """逐场景打印 tick / 各阶段 p50 相对基线的变化"""
+    for name, result in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        rows = [("tick", old["tick"], result["tick"])]
+        rows += [(phase, old["phases"][phase], result["phases"][phase]) for phase in PHASES if phase in old["phases"]]
+        print(f"{name}:", file=sys.stderr)
+        for label, before, after in rows:
+            ratio = after["p50_ms"] / before["p50_ms"] if before["p50_ms"] else float("inf")
+            print(
+                f"  {label:<13} p50 {before['p50_ms']:>9.3f} -> {after['p50_ms']:>9.3f} ms ({ratio:5.2f}x)  "
+                f"p99 {before['p99_ms']:>9.3f} -> {after['p99_ms']:>9.3f} ms",
+                file=sys.stderr,
+            )
+
+
+def _print_table(results: Dict[str, object]) -> None:
+    header = f"{'scenario':<12} {'units':>9} {'ops/s':>8} {'p50':>8} {'p99':>8}  " + " ".join(f"{p:>12}" for p in PHASES)
+    print(header, file=sys.stderr)
+    for name, result in results["scenarios"].items():
+        phases = " ".join(f"{result['phases'][p]['p50_ms']:>12.3f}" for p in PHASES)
+        units = f"{result['units_start']}->{result['units_end']}"
+        print(
+            f"{name:<12} {units:>9} {result['ops_per_sec']:>8.1f} {result['tick']['p50_ms']:>8.3f} "
+            f"{result['tick']['p99_ms']:>8.3f}  {phases}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LiveWar tick 基准测试")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="只运行指定场景（可重复）")
+    parser.add_argument("--ticks", type=int, default=100, help="每个场景计时的 tick 数")
+    parser.add_argument("--warmup", type=int, default=5, help="计时前预热的 tick 数")
+    parser.add_argument("--seed", type=int, default=1, help="场景随机种子")
+    parser.add_argument("--allocations", action="store_true", help="额外统计每 tick 的内存分配（tracemalloc）")
+    parser.add_argument("--numpy-units", action="store_true", help="使用 NumPy 列式单位存储（需要安装 numpy）")
+    parser.add_argument("-o", "--output", help="结果写入文件（默认输出到标准输出）")
+    parser.add_argument("--compare", help="与之前保存的结果对比")
+    args = parser.parse_args()
+
+    gm_module.SIMULATION_CONFIG["numpy_units"] = args.numpy_units and gm_module.NUMPY_AVAILABLE
+    names = args.scenario or list(SCENARIOS)
+    results = {
+        "python": platform.python_version(),
+        "numpy_units": gm_module.SIMULATION_CONFIG["numpy_units"],
+        "tick_rate": 1.0 / GAME_RULES["tick_interval"],
+        "scenarios": {},
+    }
+    for name in names:
+        results["scenarios"][name] = asyncio.run(
+            bench_scenario(name, args.ticks, args.warmup, args.seed, args.allocations)
+        )
+
+    _print_table(results)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            _compare(json.load(f), results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
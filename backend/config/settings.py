@@ -1,6 +1,6 @@
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Any
+from typing import List, Any, Literal, Optional
 from pydantic import field_validator
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,6 +32,45 @@ class SesSettings(BaseSettings):
     template_id: int = 0
     region:str = 'ap-hongkong'
 
+class LiveWarSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="LIVEWAR_", env_file=ENV_FILE, env_file_encoding='utf-8',
+                                      extra='ignore')
+    # 模拟频率与广播频率（Hz），广播频率不高于模拟频率；广播间隔 = round(tick_rate / broadcast_rate) 个 tick。
+    # 状态帧带有速度 / 路点和权威 tick 时间，客户端在两次广播之间插值，3~5Hz 的广播即可保持平滑
+    tick_rate: float = 10.0
+    broadcast_rate: float = 5.0
+    # 处理超时后的策略：catch_up 连续补帧（最多落后 max_catch_up_ticks 帧），skip 直接丢弃落后的帧
+    overrun_policy: Literal["catch_up", "skip"] = "catch_up"
+    max_catch_up_ticks: int = 3
+    # 全局调度器把一帧切分为多少个子时隙，房间均匀分布在各子时隙中
+    sub_slots: int = 4
+    # 模拟工作进程数：0 表示在主进程的事件循环中模拟，>0 时房间按哈希分配到各工作进程
+    workers: int = 0
+    # 使用 NumPy 列式单位存储做向量化的战斗结算与目标查询（需要安装 numpy）
+    numpy_units: bool = False
+    # 确定性模式：设置后房间随机数种子由 seed 和 room_id 推导，地图也由房间随机数生成，
+    # 同样的命令序列总能得到同样的对局
+    seed: Optional[int] = None
+    # 对局录像目录：非空时记录每个房间收到的客户端命令，房间释放时写入 <record_dir>/room<id>-<时间>.json，
+    # 可用 python -m service.replay 回放
+    record_dir: str = ""
+    # 是否开放 POST /api/livewar/profiler（采样剖析器有额外开销，结果包含调用栈）；默认关闭，仅在排查性能时开启
+    profiler_endpoint: bool = False
+
+
+class CheckpointSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="CHECKPOINT_", env_file=ENV_FILE, env_file_encoding='utf-8',
+                                      extra='ignore')
+    # 房间状态快照文件（LiveWar 对局、五子棋棋盘、你画我猜画布），例如 ./rooms.ckpt；
+    # 默认为空：不保存也不恢复，需要显式开启
+    path: str = ""
+    # 定期保存间隔（秒），0 表示只在关闭时保存；进程被强制结束时最多丢失这么久的状态
+    interval: float = 30.0
+    # 启动时忽略早于这么多秒之前写入的快照（房间里的玩家早已离开）
+    max_age: float = 600.0
+    # 恢复的房间在这么多秒内无人重连则释放
+    restore_grace: float = 120.0
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=ENV_FILE, env_file_encoding="utf-8", extra="ignore")
@@ -66,6 +105,8 @@ class Settings(BaseSettings):
     gemini: GeminiAiSettings = GeminiAiSettings()
     qwen: QwenAiSettings = QwenAiSettings()
     ses: SesSettings = SesSettings()
+    live_war: LiveWarSettings = LiveWarSettings()
+    checkpoint: CheckpointSettings = CheckpointSettings()
 
 
 settings = Settings()
@@ -1,10 +1,14 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from db.db import Base, engine
 from register import register_router
 from exceptions.handle import handle_exception
+from config.auth import get_current_user
 from config.settings import settings
+from service.game_manager import game_manager
+from service.game_workers import game_worker_pool
+from rooms import room_checkpointer
 from loguru import logger
 
 
@@ -14,8 +18,21 @@ async def lifespan(application: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     logger.info(f"Docs http://127.0.0.1:8000/docs")
+    if not game_worker_pool:
+        game_manager.warm_map_pool()
+    # 恢复上次关闭（或最近一次定期保存）时的房间状态，之后定期保存
+    restored = await room_checkpointer.restore()
+    if restored:
+        counts = ", ".join(f"{kind}={len(room_ids)}" for kind, room_ids in restored.items())
+        logger.info(f"Restored rooms from checkpoint: {counts}")
+    room_checkpointer.install_signal_handlers()
+    room_checkpointer.start()
     yield
     logger.info("⛔ Stopping Application")
+    # 先保存快照（多进程模式下需要工作进程仍在运行），再关闭工作进程
+    await room_checkpointer.stop()
+    if game_worker_pool:
+        game_worker_pool.shutdown()
 
 
 app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
@@ -37,3 +54,29 @@ register_router(app)
 async def health_check():
     return {"status": "ok"}
 
+
+@app.get("/api/livewar/metrics")
+async def livewar_metrics():
+    """LiveWar 各房间最近若干 tick 的分阶段耗时、实体数量、序列化字节数与调度超时统计"""
+    if game_worker_pool:
+        return await game_worker_pool.tick_metrics()
+    return game_manager.tick_metrics()
+
+
+@app.post("/api/livewar/profiler")
+async def livewar_profiler(
+    enabled: bool = True,
+    duration: float = Query(30.0, gt=0, le=60),
+    current_user=Depends(get_current_user),
+):
+    """
+    开启（duration 秒后自动停止）或停止 LiveWar 采样剖析器，结果见 /api/livewar/metrics 的 sampler 字段。
+
+    需要登录，且只在 LIVEWAR_PROFILER_ENDPOINT 开启时可用；duration 不超过 60 秒。
+    """
+    if not settings.live_war.profiler_endpoint:
+        raise HTTPException(status_code=404, detail="Profiler endpoint is disabled")
+    if game_worker_pool:
+        return await game_worker_pool.set_sampling_profiler(enabled, duration)
+    return game_manager.set_sampling_profiler(enabled, duration)
+
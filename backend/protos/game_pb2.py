@@ -2,7 +2,7 @@
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
 # NO CHECKED-IN PROTOBUF GENCODE
 # source: game.proto
-# Protobuf Python Version: 5.29.3
+# Protobuf Python Version: 6.31.1
 """Generated protocol buffer code."""
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import descriptor_pool as _descriptor_pool
@@ -11,9 +11,9 @@ from google.protobuf import symbol_database as _symbol_database
 from google.protobuf.internal import builder as _builder
 _runtime_version.ValidateProtobufRuntimeVersion(
     _runtime_version.Domain.PUBLIC,
-    5,
-    29,
-    3,
+    6,
+    31,
+    1,
     '',
     'game.proto'
 )
@@ -24,63 +24,85 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ngame.proto\x12\x07livewar\"\xbc\x06\n\x0bGameMessage\x12\'\n\x04type\x18\x01 \x01(\x0e\x32\x19.livewar.GameMessage.Type\x12-\n\tjoin_game\x18\x02 \x01(\x0b\x32\x18.livewar.JoinGameRequestH\x00\x12\x31\n\x0bselect_team\x18\x03 \x01(\x0b\x32\x1a.livewar.SelectTeamRequestH\x00\x12\x31\n\x0bselect_unit\x18\x04 \x01(\x0b\x32\x1a.livewar.SelectUnitRequestH\x00\x12/\n\nspawn_unit\x18\x05 \x01(\x0b\x32\x19.livewar.SpawnUnitRequestH\x00\x12/\n\nleave_game\x18\x06 \x01(\x0b\x32\x19.livewar.LeaveGameRequestH\x00\x12/\n\nstart_game\x18\x07 \x01(\x0b\x32\x19.livewar.StartGameRequestH\x00\x12.\n\tconnected\x18\x14 \x01(\x0b\x32\x19.livewar.ConnectedPayloadH\x00\x12/\n\ngame_state\x18\x15 \x01(\x0b\x32\x19.livewar.GameStatePayloadH\x00\x12\x33\n\x0cplayer_event\x18\x16 \x01(\x0b\x32\x1b.livewar.PlayerEventPayloadH\x00\x12-\n\tgame_over\x18\x17 \x01(\x0b\x32\x18.livewar.GameOverPayloadH\x00\x12&\n\x05\x65rror\x18\x18 \x01(\x0b\x32\x15.livewar.ErrorPayloadH\x00\"\xe3\x01\n\x04Type\x12\x0b\n\x07UNKNOWN\x10\x00\x12\r\n\tJOIN_GAME\x10\x01\x12\x0f\n\x0bSELECT_TEAM\x10\x02\x12\x0f\n\x0bSELECT_UNIT\x10\x03\x12\x0e\n\nSPAWN_UNIT\x10\x04\x12\x0e\n\nLEAVE_GAME\x10\x05\x12\x0e\n\nSTART_GAME\x10\x06\x12\r\n\tCONNECTED\x10\n\x12\x0e\n\nGAME_STATE\x10\x0b\x12\x11\n\rPLAYER_JOINED\x10\x0c\x12\x0f\n\x0bPLAYER_LEFT\x10\r\x12\x10\n\x0cGAME_STARTED\x10\x0e\x12\r\n\tGAME_OVER\x10\x0f\x12\t\n\x05\x45RROR\x10\x10\x42\t\n\x07payload\"-\n\x0fJoinGameRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04team\x18\x02 \x01(\t\"!\n\x11SelectTeamRequest\x12\x0c\n\x04team\x18\x01 \x01(\t\"&\n\x11SelectUnitRequest\x12\x11\n\tunit_type\x18\x01 \x01(\t\"\x12\n\x10SpawnUnitRequest\"\x12\n\x10LeaveGameRequest\"\x12\n\x10StartGameRequest\":\n\x10\x43onnectedPayload\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x13\n\x0bplayer_name\x18\x02 \x01(\t\"J\n\x12PlayerEventPayload\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x13\n\x0bplayer_name\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\"6\n\x0fGameOverPayload\x12\x0e\n\x06winner\x18\x01 \x01(\t\x12\x13\n\x0bwinner_name\x18\x02 \x01(\t\"\x1f\n\x0c\x45rrorPayload\x12\x0f\n\x07message\x18\x01 \x01(\t\"\xf9\x01\n\x10GameStatePayload\x12\x0c\n\x04tick\x18\x01 \x01(\x05\x12\x11\n\tgame_time\x18\x02 \x01(\x01\x12\x14\n\x0cgame_started\x18\x03 \x01(\x08\x12\x0e\n\x06winner\x18\x04 \x01(\t\x12\x1f\n\x06player\x18\x05 \x01(\x0b\x32\x0f.livewar.Player\x12\x1b\n\x04room\x18\x06 \x01(\x0b\x32\r.livewar.Room\x12\x0c\n\x04logs\x18\x07 \x03(\t\x12)\n\nteam_stats\x18\x08 \x01(\x0b\x32\x15.livewar.TeamStatsMap\x12\'\n\x07players\x18\t \x03(\x0b\x32\x16.livewar.PlayerSummary\"\\\n\x06Player\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\x12\x1a\n\x12selected_unit_type\x18\x04 \x01(\t\x12\x0e\n\x06\x65nergy\x18\x05 \x01(\x05\"7\n\rPlayerSummary\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\" \n\x08Position\x12\t\n\x01x\x18\x01 \x01(\x01\x12\t\n\x01y\x18\x02 \x01(\x01\"1\n\x0bTerrainCell\x12\t\n\x01x\x18\x01 \x01(\x05\x12\t\n\x01y\x18\x02 \x01(\x05\x12\x0c\n\x04type\x18\x03 \x01(\x05\"\xdf\x01\n\x04Unit\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\x12\x10\n\x08owner_id\x18\x04 \x01(\t\x12\t\n\x01x\x18\x05 \x01(\x01\x12\t\n\x01y\x18\x06 \x01(\x01\x12\n\n\x02hp\x18\x07 \x01(\x05\x12\x0e\n\x06hp_max\x18\x08 \x01(\x05\x12\x0e\n\x06\x61ttack\x18\t \x01(\x05\x12\r\n\x05speed\x18\n \x01(\x01\x12\x0f\n\x07is_dead\x18\x0b \x01(\x08\x12\x17\n\x0f\x63\x61rrying_energy\x18\x0c \x01(\x05\x12\x10\n\x08target_x\x18\r \x01(\x01\x12\x10\n\x08target_y\x18\x0e \x01(\x01\"D\n\x04\x42\x61se\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\n\n\x02hp\x18\x04 \x01(\x05\x12\x0e\n\x06hp_max\x18\x05 \x01(\x05\"Q\n\tMineField\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\x0e\n\x06\x65nergy\x18\x04 \x01(\x05\x12\x12\n\nenergy_max\x18\x05 \x01(\x05\">\n\nEnergyDrop\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\x0e\n\x06\x65nergy\x18\x04 \x01(\x05\"d\n\nHealEffect\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\x14\n\x0c\x63reated_time\x18\x04 \x01(\x01\x12\x10\n\x08lifetime\x18\x05 \x01(\x01\x12\x0c\n\x04team\x18\x06 \x01(\t\"\x8c\x01\n\x0c\x42ulletEffect\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0e\n\x06\x66rom_x\x18\x02 \x01(\x01\x12\x0e\n\x06\x66rom_y\x18\x03 \x01(\x01\x12\x0c\n\x04to_x\x18\x04 \x01(\x01\x12\x0c\n\x04to_y\x18\x05 \x01(\x01\x12\x14\n\x0c\x63reated_time\x18\x06 \x01(\x01\x12\x10\n\x08lifetime\x18\x07 \x01(\x01\x12\x0c\n\x04team\x18\x08 \x01(\t\"\xad\x03\n\x04Room\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12 \n\x05walls\x18\x04 \x03(\x0b\x32\x11.livewar.Position\x12\x1f\n\x08red_base\x18\x05 \x01(\x0b\x32\r.livewar.Base\x12 \n\tblue_base\x18\x06 \x01(\x0b\x32\r.livewar.Base\x12\'\n\x0bmine_fields\x18\x07 \x03(\x0b\x32\x12.livewar.MineField\x12\x1c\n\x05units\x18\x08 \x03(\x0b\x32\r.livewar.Unit\x12)\n\x0c\x65nergy_drops\x18\t \x03(\x0b\x32\x13.livewar.EnergyDrop\x12)\n\x0cheal_effects\x18\n \x03(\x0b\x32\x13.livewar.HealEffect\x12-\n\x0e\x62ullet_effects\x18\x0b \x03(\x0b\x32\x15.livewar.BulletEffect\x12 \n\x05lakes\x18\x0c \x03(\x0b\x32\x11.livewar.Position\x12%\n\x07terrain\x18\r \x03(\x0b\x32\x14.livewar.TerrainCell\"L\n\tTeamStats\x12\r\n\x05units\x18\x01 \x01(\x05\x12\x0e\n\x06miners\x18\x02 \x01(\x05\x12\x11\n\tengineers\x18\x03 \x01(\x05\x12\r\n\x05tanks\x18\x04 \x01(\x05\"Q\n\x0cTeamStatsMap\x12\x1f\n\x03red\x18\x01 \x01(\x0b\x32\x12.livewar.TeamStats\x12 \n\x04\x62lue\x18\x02 \x01(\x0b\x32\x12.livewar.TeamStatsb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ngame.proto\x12\x07livewar\"\x90\x08\n\x0bGameMessage\x12\'\n\x04type\x18\x01 \x01(\x0e\x32\x19.livewar.GameMessage.Type\x12-\n\tjoin_game\x18\x02 \x01(\x0b\x32\x18.livewar.JoinGameRequestH\x00\x12\x31\n\x0bselect_team\x18\x03 \x01(\x0b\x32\x1a.livewar.SelectTeamRequestH\x00\x12\x31\n\x0bselect_unit\x18\x04 \x01(\x0b\x32\x1a.livewar.SelectUnitRequestH\x00\x12/\n\nspawn_unit\x18\x05 \x01(\x0b\x32\x19.livewar.SpawnUnitRequestH\x00\x12/\n\nleave_game\x18\x06 \x01(\x0b\x32\x19.livewar.LeaveGameRequestH\x00\x12/\n\nstart_game\x18\x07 \x01(\x0b\x32\x19.livewar.StartGameRequestH\x00\x12\x37\n\x0e\x63lient_options\x18\x08 \x01(\x0b\x32\x1d.livewar.ClientOptionsRequestH\x00\x12,\n\x08viewport\x18\t \x01(\x0b\x32\x18.livewar.ViewportRequestH\x00\x12.\n\tconnected\x18\x14 \x01(\x0b\x32\x19.livewar.ConnectedPayloadH\x00\x12/\n\ngame_state\x18\x15 \x01(\x0b\x32\x19.livewar.GameStatePayloadH\x00\x12\x33\n\x0cplayer_event\x18\x16 \x01(\x0b\x32\x1b.livewar.PlayerEventPayloadH\x00\x12-\n\tgame_over\x18\x17 \x01(\x0b\x32\x18.livewar.GameOverPayloadH\x00\x12&\n\x05\x65rror\x18\x18 \x01(\x0b\x32\x15.livewar.ErrorPayloadH\x00\x12\x33\n\x0cmap_snapshot\x18\x19 \x01(\x0b\x32\x1b.livewar.MapSnapshotPayloadH\x00\"\x9b\x02\n\x04Type\x12\x0b\n\x07UNKNOWN\x10\x00\x12\r\n\tJOIN_GAME\x10\x01\x12\x0f\n\x0bSELECT_TEAM\x10\x02\x12\x0f\n\x0bSELECT_UNIT\x10\x03\x12\x0e\n\nSPAWN_UNIT\x10\x04\x12\x0e\n\nLEAVE_GAME\x10\x05\x12\x0e\n\nSTART_GAME\x10\x06\x12\x12\n\x0e\x43LIENT_OPTIONS\x10\x07\x12\x10\n\x0cSET_VIEWPORT\x10\x08\x12\r\n\tCONNECTED\x10\n\x12\x0e\n\nGAME_STATE\x10\x0b\x12\x11\n\rPLAYER_JOINED\x10\x0c\x12\x0f\n\x0bPLAYER_LEFT\x10\r\x12\x10\n\x0cGAME_STARTED\x10\x0e\x12\r\n\tGAME_OVER\x10\x0f\x12\t\n\x05\x45RROR\x10\x10\x12\x10\n\x0cMAP_SNAPSHOT\x10\x11\x42\t\n\x07payload\"-\n\x0fJoinGameRequest\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04team\x18\x02 \x01(\t\"!\n\x11SelectTeamRequest\x12\x0c\n\x04team\x18\x01 \x01(\t\"&\n\x11SelectUnitRequest\x12\x11\n\tunit_type\x18\x01 \x01(\t\"\x12\n\x10SpawnUnitRequest\"\x12\n\x10LeaveGameRequest\"\x12\n\x10StartGameRequest\"G\n\x14\x43lientOptionsRequest\x12\x16\n\x0esupports_delta\x18\x01 \x01(\x08\x12\x17\n\x0fsupports_packed\x18\x02 \x01(\x08\"F\n\x0fViewportRequest\x12\t\n\x01x\x18\x01 \x01(\x01\x12\t\n\x01y\x18\x02 \x01(\x01\x12\r\n\x05width\x18\x03 \x01(\x01\x12\x0e\n\x06height\x18\x04 \x01(\x01\":\n\x10\x43onnectedPayload\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x13\n\x0bplayer_name\x18\x02 \x01(\t\"J\n\x12PlayerEventPayload\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x13\n\x0bplayer_name\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\"6\n\x0fGameOverPayload\x12\x0e\n\x06winner\x18\x01 \x01(\t\x12\x13\n\x0bwinner_name\x18\x02 \x01(\t\"\x1f\n\x0c\x45rrorPayload\x12\x0f\n\x07message\x18\x01 \x01(\t\"\xdf\x03\n\x10GameStatePayload\x12\x0c\n\x04tick\x18\x01 \x01(\x05\x12\x11\n\tgame_time\x18\x02 \x01(\x01\x12\x14\n\x0cgame_started\x18\x03 \x01(\x08\x12\x0e\n\x06winner\x18\x04 \x01(\t\x12\x1f\n\x06player\x18\x05 \x01(\x0b\x32\x0f.livewar.Player\x12\x1b\n\x04room\x18\x06 \x01(\x0b\x32\r.livewar.Room\x12\x0c\n\x04logs\x18\x07 \x03(\t\x12)\n\nteam_stats\x18\x08 \x01(\x0b\x32\x15.livewar.TeamStatsMap\x12\'\n\x07players\x18\t \x03(\x0b\x32\x16.livewar.PlayerSummary\x12\x13\n\x0bmap_version\x18\n \x01(\x05\x12\x16\n\x0e\x62\x61se_frame_seq\x18\x0b \x01(\x05\x12!\n\x05\x64\x65lta\x18\x0c \x01(\x0b\x32\x12.livewar.RoomDelta\x12\'\n\x06packed\x18\r \x01(\x0b\x32\x17.livewar.PackedEntities\x12(\n\x07minimap\x18\x0e \x01(\x0b\x32\x17.livewar.MinimapSummary\x12\x15\n\rtick_interval\x18\x0f \x01(\x01\x12\x17\n\x0f\x62roadcast_every\x18\x10 \x01(\x05\x12\x11\n\tframe_seq\x18\x11 \x01(\x05\"i\n\x0eMinimapSummary\x12\x11\n\tcell_size\x18\x01 \x01(\x05\x12\x0f\n\x07\x63olumns\x18\x02 \x01(\x05\x12\x0c\n\x04rows\x18\x03 \x01(\x05\x12\x11\n\tred_units\x18\x04 \x01(\x0c\x12\x12\n\nblue_units\x18\x05 \x01(\x0c\"\xad\x02\n\x0bPackedUnits\x12\x0b\n\x03ids\x18\x01 \x03(\r\x12 \n\x05types\x18\x02 \x03(\x0e\x32\x11.livewar.UnitType\x12\x1c\n\x05teams\x18\x03 \x03(\x0e\x32\r.livewar.Team\x12\x11\n\towner_ids\x18\x04 \x03(\r\x12\t\n\x01x\x18\x05 \x03(\x11\x12\t\n\x01y\x18\x06 \x03(\x11\x12\n\n\x02hp\x18\x07 \x03(\x05\x12\x0e\n\x06hp_max\x18\x08 \x03(\x05\x12\x0f\n\x07is_dead\x18\t \x03(\x08\x12\x17\n\x0f\x63\x61rrying_energy\x18\n \x03(\x05\x12\x10\n\x08target_x\x18\x0b \x03(\x11\x12\x10\n\x08target_y\x18\x0c \x03(\x11\x12\n\n\x02vx\x18\r \x03(\x11\x12\n\n\x02vy\x18\x0e \x03(\x11\x12\x12\n\nwaypoint_x\x18\x0f \x03(\x11\x12\x12\n\nwaypoint_y\x18\x10 \x03(\x11\"Y\n\x10PackedMineFields\x12\x0b\n\x03ids\x18\x01 \x03(\r\x12\t\n\x01x\x18\x02 \x03(\x11\x12\t\n\x01y\x18\x03 \x03(\x11\x12\x0e\n\x06\x65nergy\x18\x04 \x03(\x05\x12\x12\n\nenergy_max\x18\x05 \x03(\x05\"F\n\x11PackedEnergyDrops\x12\x0b\n\x03ids\x18\x01 \x03(\r\x12\t\n\x01x\x18\x02 \x03(\x11\x12\t\n\x01y\x18\x03 \x03(\x11\x12\x0e\n\x06\x65nergy\x18\x04 \x03(\x05\"\xaf\x01\n\x0ePackedEntities\x12\x16\n\x0eposition_scale\x18\x01 \x01(\x05\x12#\n\x05units\x18\x02 \x01(\x0b\x32\x14.livewar.PackedUnits\x12.\n\x0bmine_fields\x18\x03 \x01(\x0b\x32\x19.livewar.PackedMineFields\x12\x30\n\x0c\x65nergy_drops\x18\x04 \x01(\x0b\x32\x1a.livewar.PackedEnergyDrops\"\xb5\x03\n\tRoomDelta\x12\x1c\n\x05units\x18\x01 \x03(\x0b\x32\r.livewar.Unit\x12\x18\n\x10removed_unit_ids\x18\x02 \x03(\t\x12\'\n\x0bmine_fields\x18\x03 \x03(\x0b\x32\x12.livewar.MineField\x12\x1e\n\x16removed_mine_field_ids\x18\x04 \x03(\t\x12)\n\x0c\x65nergy_drops\x18\x05 \x03(\x0b\x32\x13.livewar.EnergyDrop\x12\x1f\n\x17removed_energy_drop_ids\x18\x06 \x03(\t\x12)\n\x0cheal_effects\x18\x07 \x03(\x0b\x32\x13.livewar.HealEffect\x12-\n\x0e\x62ullet_effects\x18\t \x03(\x0b\x32\x15.livewar.BulletEffect\x12\x1f\n\x08red_base\x18\x0b \x01(\x0b\x32\r.livewar.Base\x12 \n\tblue_base\x18\x0c \x01(\x0b\x32\r.livewar.BaseJ\x04\x08\x08\x10\tJ\x04\x08\n\x10\x0bR\x17removed_heal_effect_idsR\x19removed_bullet_effect_ids\"\xc9\x01\n\x12MapSnapshotPayload\x12\x13\n\x0bmap_version\x18\x01 \x01(\x05\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12 \n\x05walls\x18\x04 \x03(\x0b\x32\x11.livewar.Position\x12 \n\x05lakes\x18\x05 \x03(\x0b\x32\x11.livewar.Position\x12%\n\x07terrain\x18\x06 \x03(\x0b\x32\x14.livewar.TerrainCell\x12\x14\n\x0cterrain_bits\x18\x07 \x01(\x0c\"\\\n\x06Player\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\x12\x1a\n\x12selected_unit_type\x18\x04 \x01(\t\x12\x0e\n\x06\x65nergy\x18\x05 \x01(\x05\"7\n\rPlayerSummary\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\" \n\x08Position\x12\t\n\x01x\x18\x01 \x01(\x01\x12\t\n\x01y\x18\x02 \x01(\x01\"1\n\x0bTerrainCell\x12\t\n\x01x\x18\x01 \x01(\x05\x12\t\n\x01y\x18\x02 \x01(\x05\x12\x0c\n\x04type\x18\x03 \x01(\x05\"\x9f\x02\n\x04Unit\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\x12\x0c\n\x04team\x18\x03 \x01(\t\x12\x10\n\x08owner_id\x18\x04 \x01(\t\x12\t\n\x01x\x18\x05 \x01(\x01\x12\t\n\x01y\x18\x06 \x01(\x01\x12\n\n\x02hp\x18\x07 \x01(\x05\x12\x0e\n\x06hp_max\x18\x08 \x01(\x05\x12\x0e\n\x06\x61ttack\x18\t \x01(\x05\x12\r\n\x05speed\x18\n \x01(\x01\x12\x0f\n\x07is_dead\x18\x0b \x01(\x08\x12\x17\n\x0f\x63\x61rrying_energy\x18\x0c \x01(\x05\x12\x10\n\x08target_x\x18\r \x01(\x01\x12\x10\n\x08target_y\x18\x0e \x01(\x01\x12\n\n\x02vx\x18\x0f \x01(\x01\x12\n\n\x02vy\x18\x10 \x01(\x01\x12\x12\n\nwaypoint_x\x18\x11 \x01(\x01\x12\x12\n\nwaypoint_y\x18\x12 \x01(\x01\"D\n\x04\x42\x61se\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\n\n\x02hp\x18\x04 \x01(\x05\x12\x0e\n\x06hp_max\x18\x05 \x01(\x05\"Q\n\tMineField\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\x0e\n\x06\x65nergy\x18\x04 \x01(\x05\x12\x12\n\nenergy_max\x18\x05 \x01(\x05\">\n\nEnergyDrop\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\x0e\n\x06\x65nergy\x18\x04 \x01(\x05\"d\n\nHealEffect\x12\n\n\x02id\x18\x01 \x01(\t\x12\t\n\x01x\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\x12\x14\n\x0c\x63reated_time\x18\x04 \x01(\x01\x12\x10\n\x08lifetime\x18\x05 \x01(\x01\x12\x0c\n\x04team\x18\x06 \x01(\t\"\x8c\x01\n\x0c\x42ulletEffect\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0e\n\x06\x66rom_x\x18\x02 \x01(\x01\x12\x0e\n\x06\x66rom_y\x18\x03 \x01(\x01\x12\x0c\n\x04to_x\x18\x04 \x01(\x01\x12\x0c\n\x04to_y\x18\x05 \x01(\x01\x12\x14\n\x0c\x63reated_time\x18\x06 \x01(\x01\x12\x10\n\x08lifetime\x18\x07 \x01(\x01\x12\x0c\n\x04team\x18\x08 \x01(\t\"\xad\x03\n\x04Room\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05width\x18\x02 \x01(\x05\x12\x0e\n\x06height\x18\x03 \x01(\x05\x12 \n\x05walls\x18\x04 \x03(\x0b\x32\x11.livewar.Position\x12\x1f\n\x08red_base\x18\x05 \x01(\x0b\x32\r.livewar.Base\x12 \n\tblue_base\x18\x06 \x01(\x0b\x32\r.livewar.Base\x12\'\n\x0bmine_fields\x18\x07 \x03(\x0b\x32\x12.livewar.MineField\x12\x1c\n\x05units\x18\x08 \x03(\x0b\x32\r.livewar.Unit\x12)\n\x0c\x65nergy_drops\x18\t \x03(\x0b\x32\x13.livewar.EnergyDrop\x12)\n\x0cheal_effects\x18\n \x03(\x0b\x32\x13.livewar.HealEffect\x12-\n\x0e\x62ullet_effects\x18\x0b \x03(\x0b\x32\x15.livewar.BulletEffect\x12 \n\x05lakes\x18\x0c \x03(\x0b\x32\x11.livewar.Position\x12%\n\x07terrain\x18\r \x03(\x0b\x32\x14.livewar.TerrainCell\"L\n\tTeamStats\x12\r\n\x05units\x18\x01 \x01(\x05\x12\x0e\n\x06miners\x18\x02 \x01(\x05\x12\x11\n\tengineers\x18\x03 \x01(\x05\x12\r\n\x05tanks\x18\x04 \x01(\x05\"Q\n\x0cTeamStatsMap\x12\x1f\n\x03red\x18\x01 \x01(\x0b\x32\x12.livewar.TeamStats\x12 \n\x04\x62lue\x18\x02 \x01(\x0b\x32\x12.livewar.TeamStats*Y\n\x08UnitType\x12\x0e\n\nUNIT_MINER\x10\x00\x12\x11\n\rUNIT_ENGINEER\x10\x01\x12\x13\n\x0fUNIT_HEAVY_TANK\x10\x02\x12\x15\n\x11UNIT_ASSAULT_TANK\x10\x03*#\n\x04Team\x12\x0c\n\x08TEAM_RED\x10\x00\x12\r\n\tTEAM_BLUE\x10\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'game_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_UNITTYPE']._serialized_start=5077
+  _globals['_UNITTYPE']._serialized_end=5166
+  _globals['_TEAM']._serialized_start=5168
+  _globals['_TEAM']._serialized_end=5203
   _globals['_GAMEMESSAGE']._serialized_start=24
-  _globals['_GAMEMESSAGE']._serialized_end=852
-  _globals['_GAMEMESSAGE_TYPE']._serialized_start=614
-  _globals['_GAMEMESSAGE_TYPE']._serialized_end=841
-  _globals['_JOINGAMEREQUEST']._serialized_start=854
-  _globals['_JOINGAMEREQUEST']._serialized_end=899
-  _globals['_SELECTTEAMREQUEST']._serialized_start=901
-  _globals['_SELECTTEAMREQUEST']._serialized_end=934
-  _globals['_SELECTUNITREQUEST']._serialized_start=936
-  _globals['_SELECTUNITREQUEST']._serialized_end=974
-  _globals['_SPAWNUNITREQUEST']._serialized_start=976
-  _globals['_SPAWNUNITREQUEST']._serialized_end=994
-  _globals['_LEAVEGAMEREQUEST']._serialized_start=996
-  _globals['_LEAVEGAMEREQUEST']._serialized_end=1014
-  _globals['_STARTGAMEREQUEST']._serialized_start=1016
-  _globals['_STARTGAMEREQUEST']._serialized_end=1034
-  _globals['_CONNECTEDPAYLOAD']._serialized_start=1036
-  _globals['_CONNECTEDPAYLOAD']._serialized_end=1094
-  _globals['_PLAYEREVENTPAYLOAD']._serialized_start=1096
-  _globals['_PLAYEREVENTPAYLOAD']._serialized_end=1170
-  _globals['_GAMEOVERPAYLOAD']._serialized_start=1172
-  _globals['_GAMEOVERPAYLOAD']._serialized_end=1226
-  _globals['_ERRORPAYLOAD']._serialized_start=1228
-  _globals['_ERRORPAYLOAD']._serialized_end=1259
-  _globals['_GAMESTATEPAYLOAD']._serialized_start=1262
-  _globals['_GAMESTATEPAYLOAD']._serialized_end=1511
-  _globals['_PLAYER']._serialized_start=1513
-  _globals['_PLAYER']._serialized_end=1605
-  _globals['_PLAYERSUMMARY']._serialized_start=1607
-  _globals['_PLAYERSUMMARY']._serialized_end=1662
-  _globals['_POSITION']._serialized_start=1664
-  _globals['_POSITION']._serialized_end=1696
-  _globals['_TERRAINCELL']._serialized_start=1698
-  _globals['_TERRAINCELL']._serialized_end=1747
-  _globals['_UNIT']._serialized_start=1750
-  _globals['_UNIT']._serialized_end=1973
-  _globals['_BASE']._serialized_start=1975
-  _globals['_BASE']._serialized_end=2043
-  _globals['_MINEFIELD']._serialized_start=2045
-  _globals['_MINEFIELD']._serialized_end=2126
-  _globals['_ENERGYDROP']._serialized_start=2128
-  _globals['_ENERGYDROP']._serialized_end=2190
-  _globals['_HEALEFFECT']._serialized_start=2192
-  _globals['_HEALEFFECT']._serialized_end=2292
-  _globals['_BULLETEFFECT']._serialized_start=2295
-  _globals['_BULLETEFFECT']._serialized_end=2435
-  _globals['_ROOM']._serialized_start=2438
-  _globals['_ROOM']._serialized_end=2867
-  _globals['_TEAMSTATS']._serialized_start=2869
-  _globals['_TEAMSTATS']._serialized_end=2945
-  _globals['_TEAMSTATSMAP']._serialized_start=2947
-  _globals['_TEAMSTATSMAP']._serialized_end=3028
+  _globals['_GAMEMESSAGE']._serialized_end=1064
+  _globals['_GAMEMESSAGE_TYPE']._serialized_start=770
+  _globals['_GAMEMESSAGE_TYPE']._serialized_end=1053
+  _globals['_JOINGAMEREQUEST']._serialized_start=1066
+  _globals['_JOINGAMEREQUEST']._serialized_end=1111
+  _globals['_SELECTTEAMREQUEST']._serialized_start=1113
+  _globals['_SELECTTEAMREQUEST']._serialized_end=1146
+  _globals['_SELECTUNITREQUEST']._serialized_start=1148
+  _globals['_SELECTUNITREQUEST']._serialized_end=1186
+  _globals['_SPAWNUNITREQUEST']._serialized_start=1188
+  _globals['_SPAWNUNITREQUEST']._serialized_end=1206
+  _globals['_LEAVEGAMEREQUEST']._serialized_start=1208
+  _globals['_LEAVEGAMEREQUEST']._serialized_end=1226
+  _globals['_STARTGAMEREQUEST']._serialized_start=1228
+  _globals['_STARTGAMEREQUEST']._serialized_end=1246
+  _globals['_CLIENTOPTIONSREQUEST']._serialized_start=1248
+  _globals['_CLIENTOPTIONSREQUEST']._serialized_end=1319
+  _globals['_VIEWPORTREQUEST']._serialized_start=1321
+  _globals['_VIEWPORTREQUEST']._serialized_end=1391
+  _globals['_CONNECTEDPAYLOAD']._serialized_start=1393
+  _globals['_CONNECTEDPAYLOAD']._serialized_end=1451
+  _globals['_PLAYEREVENTPAYLOAD']._serialized_start=1453
+  _globals['_PLAYEREVENTPAYLOAD']._serialized_end=1527
+  _globals['_GAMEOVERPAYLOAD']._serialized_start=1529
+  _globals['_GAMEOVERPAYLOAD']._serialized_end=1583
+  _globals['_ERRORPAYLOAD']._serialized_start=1585
+  _globals['_ERRORPAYLOAD']._serialized_end=1616
+  _globals['_GAMESTATEPAYLOAD']._serialized_start=1619
+  _globals['_GAMESTATEPAYLOAD']._serialized_end=2098
+  _globals['_MINIMAPSUMMARY']._serialized_start=2100
+  _globals['_MINIMAPSUMMARY']._serialized_end=2205
+  _globals['_PACKEDUNITS']._serialized_start=2208
+  _globals['_PACKEDUNITS']._serialized_end=2509
+  _globals['_PACKEDMINEFIELDS']._serialized_start=2511
+  _globals['_PACKEDMINEFIELDS']._serialized_end=2600
+  _globals['_PACKEDENERGYDROPS']._serialized_start=2602
+  _globals['_PACKEDENERGYDROPS']._serialized_end=2672
+  _globals['_PACKEDENTITIES']._serialized_start=2675
+  _globals['_PACKEDENTITIES']._serialized_end=2850
+  _globals['_ROOMDELTA']._serialized_start=2853
+  _globals['_ROOMDELTA']._serialized_end=3290
+  _globals['_MAPSNAPSHOTPAYLOAD']._serialized_start=3293
+  _globals['_MAPSNAPSHOTPAYLOAD']._serialized_end=3494
+  _globals['_PLAYER']._serialized_start=3496
+  _globals['_PLAYER']._serialized_end=3588
+  _globals['_PLAYERSUMMARY']._serialized_start=3590
+  _globals['_PLAYERSUMMARY']._serialized_end=3645
+  _globals['_POSITION']._serialized_start=3647
+  _globals['_POSITION']._serialized_end=3679
+  _globals['_TERRAINCELL']._serialized_start=3681
+  _globals['_TERRAINCELL']._serialized_end=3730
+  _globals['_UNIT']._serialized_start=3733
+  _globals['_UNIT']._serialized_end=4020
+  _globals['_BASE']._serialized_start=4022
+  _globals['_BASE']._serialized_end=4090
+  _globals['_MINEFIELD']._serialized_start=4092
+  _globals['_MINEFIELD']._serialized_end=4173
+  _globals['_ENERGYDROP']._serialized_start=4175
+  _globals['_ENERGYDROP']._serialized_end=4237
+  _globals['_HEALEFFECT']._serialized_start=4239
+  _globals['_HEALEFFECT']._serialized_end=4339
+  _globals['_BULLETEFFECT']._serialized_start=4342
+  _globals['_BULLETEFFECT']._serialized_end=4482
+  _globals['_ROOM']._serialized_start=4485
+  _globals['_ROOM']._serialized_end=4914
+  _globals['_TEAMSTATS']._serialized_start=4916
+  _globals['_TEAMSTATS']._serialized_end=4992
+  _globals['_TEAMSTATSMAP']._serialized_start=4994
+  _globals['_TEAMSTATSMAP']._serialized_end=5075
 # @@protoc_insertion_point(module_scope)
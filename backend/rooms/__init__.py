@@ -4,6 +4,7 @@ from .chat_room import chat_room_manager
 from .drawing_room import drawing_room_manager
 from .live_war_room import live_war_room_manager
 from .gobang_room import gobang_room_manager
+from .checkpoint import room_checkpointer
 
 __all__ = [
     'RoomType',
@@ -11,4 +12,5 @@ __all__ = [
     'drawing_room_manager',
     'live_war_room_manager',
     'gobang_room_manager',
+    'room_checkpointer',
 ]
@@ -16,6 +16,8 @@ class ChatRoomManager:
         self.websocket_to_username: Dict[WebSocket, str] = {}
         self.websocket_to_user_id: Dict[WebSocket, Optional[int]] = {}
         self.room_id_to_websocket_to_username: Dict[int, Dict[WebSocket, str]] = {}
+        # 进程即将退出（等待保存快照）：连接断开时不再释放房间状态，见 rooms.checkpoint
+        self.draining = False
 
     async def connect(self, room_id: int, websocket: WebSocket, username: str, user_id: Optional[int]) -> None:
         """连接房间"""
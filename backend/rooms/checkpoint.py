@@ -0,0 +1,168 @@
+"""房间状态快照 - 定期 / 关闭时保存，启动时恢复
+
+说明：
+- 快照包含 LiveWar 对局（进程内或各工作进程中）、五子棋状态和你画我猜的画布，文件格式见 service.checkpoint
+- 各房间服务在事件循环中一次性收集（进程内模式下不会跨越 tick），文件在线程中写入
+- uvicorn 收到退出信号后先关闭全部 WebSocket，再执行 lifespan 的关闭阶段；为了让关闭时保存的快照仍包含房间，
+  退出信号到达时先进入 draining 状态，房间服务在连接断开时不再释放房间状态
+- 启动时恢复的 LiveWar 对局处于暂停状态，第一个连接重新进入房间时才继续推进
+- 启动时恢复的房间在 restore_grace 秒内无人重连则释放（与房间变空时一样）；五子棋状态本来就保留到进程结束，不释放
+"""
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, List, Optional
+
+from config.settings import settings
+from service.checkpoint import CheckpointError, CheckpointReader, write_checkpoint
+from service import game_manager as live_war_game_manager
+from service.game_workers import game_worker_pool
+from .drawing_room import drawing_room_manager
+from .gobang_room import gobang_room_manager
+from .live_war_room import live_war_room_manager
+
+# 快照分区类型
+SECTION_LIVE_WAR = "livewar"
+SECTION_GOBANG = "gobang"
+SECTION_DRAWING = "drawing"
+
+
+class RoomCheckpointer:
+    """房间状态快照的保存与恢复"""
+
+    def __init__(self, path: str, interval: float, max_age: float, restore_grace: float) -> None:
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.restore_grace = restore_grace
+        self._save_task: Optional[asyncio.Task] = None
+        self._release_task: Optional[asyncio.Task] = None
+        # 最近一次保存：时间、字节数、房间数、耗时（秒）
+        self.last_save: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    # ---- 保存 ----
+
+    async def save(self) -> int:
+        """保存全部房间状态，返回文件字节数"""
+        started = time.perf_counter()
+        if game_worker_pool:
+            live_war = await game_worker_pool.checkpoint_rooms()
+        else:
+            live_war = live_war_game_manager.game_manager.checkpoint_rooms()
+        sections = [(SECTION_LIVE_WAR, room_id, data) for room_id, data in live_war.items()]
+        sections.extend((SECTION_GOBANG, room_id, data) for room_id, data in gobang_room_manager.checkpoint_rooms().items())
+        sections.extend((SECTION_DRAWING, room_id, data) for room_id, data in drawing_room_manager.checkpoint_rooms().items())
+        size = await asyncio.to_thread(write_checkpoint, self.path, sections)
+        self.last_save = {
+            "time": time.time(),
+            "bytes": size,
+            "rooms": len(sections),
+            "duration": time.perf_counter() - started,
+        }
+        return size
+
+    async def _save_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception as e:
+                print(f"[Checkpoint] Error saving {self.path}: {e}", flush=True)
+
+    # ---- 恢复 ----
+
+    async def restore(self) -> Dict[str, List[int]]:
+        """从快照恢复房间（文件不存在 / 过期 / 损坏时不恢复），返回各类型恢复的 room_id"""
+        if not self.enabled or not os.path.exists(self.path):
+            return {}
+        restored: Dict[str, List[int]] = {}
+        live_war: Dict[int, bytes] = {}
+        try:
+            with CheckpointReader(self.path) as reader:
+                if reader.age > self.max_age:
+                    print(f"[Checkpoint] Ignoring {self.path}: written {reader.age:.0f}s ago", flush=True)
+                    return {}
+                if game_worker_pool:
+                    # 跨进程传递需要复制出 mmap
+                    live_war = {room_id: bytes(data) for room_id, data in reader.items(SECTION_LIVE_WAR)}
+                else:
+                    gm = live_war_game_manager.game_manager
+                    restored[SECTION_LIVE_WAR] = gm.restore_rooms(dict(reader.items(SECTION_LIVE_WAR)))
+                restored[SECTION_GOBANG] = gobang_room_manager.restore_rooms(dict(reader.items(SECTION_GOBANG)))
+                restored[SECTION_DRAWING] = drawing_room_manager.restore_rooms(dict(reader.items(SECTION_DRAWING)))
+        except (OSError, CheckpointError) as e:
+            print(f"[Checkpoint] Error reading {self.path}: {e}", flush=True)
+            return restored
+        if game_worker_pool:
+            restored[SECTION_LIVE_WAR] = await game_worker_pool.restore_rooms(live_war)
+
+        if restored.get(SECTION_LIVE_WAR) or restored.get(SECTION_DRAWING):
+            self._release_task = asyncio.create_task(self._release_unclaimed(restored))
+        return restored
+
+    async def _release_unclaimed(self, restored: Dict[str, List[int]]) -> None:
+        """宽限期结束后释放无人重连的恢复房间"""
+        await asyncio.sleep(self.restore_grace)
+        for room_id in restored.get(SECTION_LIVE_WAR, ()):
+            live_war_room_manager.release_restored_room(room_id)
+        for room_id in restored.get(SECTION_DRAWING, ()):
+            drawing_room_manager.release_restored_room(room_id)
+
+    # ---- 生命周期 ----
+
+    def begin_drain(self) -> None:
+        """进程即将退出：之后断开的连接不再释放房间状态，留给关闭时的快照"""
+        for manager in (live_war_room_manager, drawing_room_manager, gobang_room_manager):
+            manager.draining = True
+
+    def install_signal_handlers(self) -> None:
+        """
+        在 uvicorn 的退出信号处理之前进入 draining 状态（需要在 uvicorn 安装信号处理之后、主线程中调用，
+        例如 lifespan 启动阶段）
+        """
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous) -> None:
+                self.begin_drain()
+                previous(signum, frame)
+
+            try:
+                signal.signal(sig, handler)
+            except ValueError:
+                return  # 不在主线程：只能依赖定期快照
+
+    def start(self) -> None:
+        """启动定期保存（interval 为 0 时只在关闭时保存）"""
+        if self.enabled and self.interval > 0 and self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_periodically())
+
+    async def stop(self) -> None:
+        """停止定期保存并保存最终快照"""
+        for task in (self._save_task, self._release_task):
+            if task is not None:
+                task.cancel()
+        self._save_task = self._release_task = None
+        if not self.enabled:
+            return
+        self.begin_drain()
+        try:
+            await self.save()
+        except Exception as e:
+            print(f"[Checkpoint] Error saving {self.path}: {e}", flush=True)
+
+
+# 全局实例
+room_checkpointer = RoomCheckpointer(
+    settings.checkpoint.path,
+    settings.checkpoint.interval,
+    settings.checkpoint.max_age,
+    settings.checkpoint.restore_grace,
+)
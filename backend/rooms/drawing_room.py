@@ -1,12 +1,15 @@
 """你画我猜房间服务 - 支持聊天、音乐和画图功能"""
-from typing import Dict, Set, Optional
+from typing import Dict, List, Set, Optional
 import time
 import asyncio
 
 from fastapi import WebSocket
 from protos import chat_pb2
+from service.checkpoint import BlockWriter, read_blocks
 from .chat_room import ChatRoomManager
 
+DRAWER_TIMEOUT_SECONDS = 600  # 画画人自动退出时间（10 分钟）
+
 
 class DrawingRoomManager(ChatRoomManager):
     """你画我猜房间管理器 - 继承聊天房间功能，增加画图功能"""
@@ -29,6 +32,8 @@ class DrawingRoomManager(ChatRoomManager):
         username = self.websocket_to_username.get(websocket)
         
         super().disconnect(room_id, websocket)
+        if self.draining:
+            return  # 即将保存快照：保留画画人和画布，重启后恢复
         
         # 如果断开连接的是当前画画人，清除画画人状态和画布内容
         if username and room_id in self.room_id_to_drawer and self.room_id_to_drawer[room_id] == username:
@@ -54,10 +59,10 @@ class DrawingRoomManager(ChatRoomManager):
                 self.room_id_to_auto_stop_tasks[room_id].cancel()
                 del self.room_id_to_auto_stop_tasks[room_id]
 
-    async def _auto_stop_drawing(self, room_id: int) -> None:
-        """10分钟后自动退出画画"""
+    async def _auto_stop_drawing(self, room_id: int, delay: float = DRAWER_TIMEOUT_SECONDS) -> None:
+        """delay 秒（默认 10 分钟）后自动退出画画"""
         try:
-            await asyncio.sleep(600)  # 10分钟 = 600秒
+            await asyncio.sleep(delay)
             # 检查是否仍然是同一个画画人
             if room_id in self.room_id_to_drawer:
                 # 清除画画人状态和画布内容
@@ -104,6 +109,55 @@ class DrawingRoomManager(ChatRoomManager):
         envelope = chat_pb2.WsEnvelope(chat=drawer_state_msg)
         await self.broadcast(room_id, envelope.SerializeToString())
 
+    # ---- 快照（重启恢复） ----
+
+    def checkpoint_rooms(self) -> Dict[int, bytes]:
+        """有画画人的房间：画画人、开始时间、申请列表写入 JSON 元数据，画布（base64 文本）写入原始字节"""
+        sections = {}
+        for room_id, drawer in self.room_id_to_drawer.items():
+            writer = BlockWriter()
+            writer.meta("drawing", {
+                "drawer": drawer,
+                "start_time": self.room_id_to_drawer_start_time.get(room_id, time.time()),
+                "requests": sorted(self.room_id_to_requests.get(room_id, ())),
+            })
+            canvas = self.room_id_to_canvas_data.get(room_id)
+            if canvas is not None:
+                writer.raw("canvas", canvas.encode("utf-8"))
+            sections[room_id] = writer.getvalue()
+        return sections
+
+    def restore_rooms(self, sections: Dict[int, bytes]) -> List[int]:
+        """从快照恢复画画人和画布（已有画画人的房间跳过），按剩余时间重新启动自动退出；需要在事件循环中调用"""
+        restored = []
+        for room_id, data in sections.items():
+            if room_id in self.room_id_to_drawer:
+                continue
+            blocks = read_blocks(data)
+            meta = blocks["drawing"]
+            self.room_id_to_drawer[room_id] = meta["drawer"]
+            self.room_id_to_drawer_start_time[room_id] = meta["start_time"]
+            if meta["requests"]:
+                self.room_id_to_requests[room_id] = set(meta["requests"])
+            if "canvas" in blocks:
+                self.room_id_to_canvas_data[room_id] = bytes(blocks["canvas"]).decode("utf-8")
+            remaining = max(0.0, meta["start_time"] + DRAWER_TIMEOUT_SECONDS - time.time())
+            self.room_id_to_auto_stop_tasks[room_id] = asyncio.create_task(self._auto_stop_drawing(room_id, remaining))
+            restored.append(room_id)
+        return restored
+
+    def release_restored_room(self, room_id: int) -> None:
+        """恢复的房间在宽限期内无人重连：与房间变空时一样清理画图状态"""
+        if room_id in self.room_id_to_connections:
+            return
+        self.room_id_to_drawer.pop(room_id, None)
+        self.room_id_to_canvas_data.pop(room_id, None)
+        self.room_id_to_drawer_start_time.pop(room_id, None)
+        self.room_id_to_requests.pop(room_id, None)
+        task = self.room_id_to_auto_stop_tasks.pop(room_id, None)
+        if task:
+            task.cancel()
+
     async def handle_message(self, room_id: int, websocket: WebSocket, message: chat_pb2.ChatMessage) -> None:
         """处理消息 - 重写以支持画图功能"""
         username = self.websocket_to_username.get(websocket, "Anonymous")
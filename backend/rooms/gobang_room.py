@@ -36,6 +36,7 @@ import random
 from fastapi import WebSocket
 
 from protos import chat_pb2
+from service.checkpoint import BlockWriter, read_blocks
 from .chat_room import ChatRoomManager
 
 
@@ -88,8 +89,8 @@ class GobangRoomManager(ChatRoomManager):
         super().__init__()
         # room_id -> GobangRoomState
         self.room_states: Dict[int, GobangRoomState] = {}
-        # 断线超时：room_id -> (asyncio.Task, 断线的 user_id)
-        self._disconnect_tasks: Dict[int, Tuple[asyncio.Task, Optional[int]]] = {}
+        # 断线超时：(room_id, 断线的 user_id) -> asyncio.Task，每名对战玩家各自计时
+        self._disconnect_tasks: Dict[Tuple[int, int], asyncio.Task] = {}
 
     # ---- 基本连接逻辑 ----
 
@@ -174,6 +175,58 @@ class GobangRoomManager(ChatRoomManager):
             chat_pb2.WsEnvelope(chat=state_msg).SerializeToString(),
         )
 
+    # ---- 快照（重启恢复） ----
+
+    def checkpoint_rooms(self) -> Dict[int, bytes]:
+        """各房间的五子棋状态：玩家与对局标志写入 JSON 元数据，棋盘按行优先写入字节列"""
+        sections = {}
+        for room_id, state in self.room_states.items():
+            writer = BlockWriter()
+            writer.meta("gobang", {
+                "black_user_id": state.black_user_id,
+                "white_user_id": state.white_user_id,
+                "joined_user_ids": sorted(state.joined_user_ids),
+                "started": state.started,
+                "finished": state.finished,
+                "current_turn": state.current_turn,
+                "winner": state.winner,
+            })
+            writer.column("board", "b", (cell for row in state.board for cell in row))
+            sections[room_id] = writer.getvalue()
+        return sections
+
+    def restore_rooms(self, sections: Dict[int, bytes]) -> List[int]:
+        """
+        从快照恢复五子棋状态（已存在的房间跳过），返回恢复的 room_id。
+
+        重启时两名对战玩家都已断线：进行中的对局与断线处理一致，为双方分别启动超时任务，
+        超时未重连则结束对局（双方都未重连时不判胜负）。需要在事件循环中调用。
+        """
+        restored = []
+        for room_id, data in sections.items():
+            if room_id in self.room_states:
+                continue
+            blocks = read_blocks(data)
+            meta = blocks["gobang"]
+            board = blocks["board"]
+            state = GobangRoomState(
+                black_user_id=meta["black_user_id"],
+                white_user_id=meta["white_user_id"],
+                joined_user_ids=set(meta["joined_user_ids"]),
+                started=meta["started"],
+                finished=meta["finished"],
+                board=[list(board[y * BOARD_SIZE:(y + 1) * BOARD_SIZE]) for y in range(BOARD_SIZE)],
+                current_turn=meta["current_turn"],
+                winner=meta["winner"],
+            )
+            self.room_states[room_id] = state
+            restored.append(room_id)
+            if state.started and not state.finished:
+                for user_id in (state.black_user_id, state.white_user_id):
+                    if user_id is not None:
+                        self._start_disconnect_timeout(room_id, user_id)
+        return restored
+
     # ---- 内部工具方法 ----
 
     async def _broadcast_system(self, room_id: int, content: str) -> None:
@@ -394,35 +447,33 @@ class GobangRoomManager(ChatRoomManager):
         await self._broadcast_gobang_state(room_id)
 
     def _cancel_disconnect_task_if_reconnect(self, room_id: int, user_id: Optional[int]) -> None:
-        """若重连用户正是断线超时等待的玩家，取消超时任务"""
+        """若重连用户正在断线超时等待中，只取消该玩家自己的超时任务"""
         if user_id is None:
             return
-        entry = self._disconnect_tasks.pop(room_id, None)
-        if entry:
-            task, disconnected_uid = entry
-            if disconnected_uid == user_id and not task.done():
-                task.cancel()
+        task = self._disconnect_tasks.pop((room_id, user_id), None)
+        if task and not task.done():
+            task.cancel()
 
     def _start_disconnect_timeout(self, room_id: int, disconnected_user_id: int) -> None:
         """启动断线超时任务：5 分钟后若未重连则自动结束对局"""
-        # 若已有超时任务，先取消
-        entry = self._disconnect_tasks.pop(room_id, None)
-        if entry:
-            task, _ = entry
-            if not task.done():
-                task.cancel()
+        key = (room_id, disconnected_user_id)
+        # 若该玩家已有超时任务，先取消
+        task = self._disconnect_tasks.pop(key, None)
+        if task and not task.done():
+            task.cancel()
 
         async def _timeout_task() -> None:
             try:
                 await asyncio.sleep(DISCONNECT_TIMEOUT_SECONDS)
+                self._disconnect_tasks.pop(key, None)
                 await self._end_game_due_to_disconnect(room_id, disconnected_user_id)
             except asyncio.CancelledError:
                 pass
             finally:
-                self._disconnect_tasks.pop(room_id, None)
+                if self._disconnect_tasks.get(key) is asyncio.current_task():
+                    self._disconnect_tasks.pop(key, None)
 
-        task = asyncio.create_task(_timeout_task())
-        self._disconnect_tasks[room_id] = (task, disconnected_user_id)
+        self._disconnect_tasks[key] = asyncio.create_task(_timeout_task())
 
     async def _end_game_due_to_disconnect(self, room_id: int, disconnected_user_id: int) -> None:
         """因对战玩家断线超时而结束对局，重置状态并广播"""
@@ -437,10 +488,16 @@ class GobangRoomManager(ChatRoomManager):
         other_name = self._get_username_by_user_id(room_id, other_user_id)
         role_desc = "黑方" if disconnected_user_id == state.black_user_id else "白方"
 
-        game_over_msg = (
-            f"⏱ 对局结束！{disconnected_name}（{role_desc}）断线超过 5 分钟，"
-            f"另一方 {other_name} 获胜。可点击「加入对局」开始新一局。"
-        )
+        # 另一方也在断线等待中：双方都未重连，不判胜负
+        other_task = self._disconnect_tasks.pop((room_id, other_user_id), None)
+        if other_task is not None:
+            other_task.cancel()
+            game_over_msg = "⏱ 对局结束！双方都断线超过 5 分钟，本局不判胜负。可点击「加入对局」开始新一局。"
+        else:
+            game_over_msg = (
+                f"⏱ 对局结束！{disconnected_name}（{role_desc}）断线超过 5 分钟，"
+                f"另一方 {other_name} 获胜。可点击「加入对局」开始新一局。"
+            )
         await self._broadcast_system(room_id, game_over_msg)
 
         chat_msg = chat_pb2.ChatMessage(
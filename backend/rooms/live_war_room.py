@@ -1,11 +1,20 @@
 """LiveWar游戏房间服务 - 支持聊天、音乐和游戏功能"""
-from typing import Dict, Set, Optional
+from typing import Dict, Set, Optional, Tuple
 import time
 
 from fastapi import WebSocket
 from protos import chat_pb2, game_pb2
 from .chat_room import ChatRoomManager
 from service import game_manager as live_war_game_manager
+from service.game_workers import game_worker_pool
+from service.state_frame import (
+    ENCODING_AOI,
+    ENCODING_AOI_PACKED,
+    ENCODING_DELTA,
+    ENCODING_FULL,
+    ENCODING_PACKED,
+    StateFrame,
+)
 
 
 class LiveWarRoomManager(ChatRoomManager):
@@ -13,6 +22,49 @@ class LiveWarRoomManager(ChatRoomManager):
     
     def __init__(self) -> None:
         super().__init__()
+        # 每个连接协商的客户端能力（未发送 CLIENT_OPTIONS 的旧客户端不在其中）
+        self.websocket_to_client_options: Dict[WebSocket, game_pb2.ClientOptionsRequest] = {}
+        # 每个连接上报的视野 (x, y, width, height)，未设置的连接接收全图
+        self.websocket_to_viewport: Dict[WebSocket, Tuple[float, float, float, float]] = {}
+        # 每个连接最近收到的完整 / 增量状态帧序号（即该连接持有的增量基线）
+        self.websocket_to_frame_seq: Dict[WebSocket, int] = {}
+
+    def _supports_delta(self, websocket: WebSocket) -> bool:
+        options = self.websocket_to_client_options.get(websocket)
+        return bool(options and options.supports_delta)
+
+    def _supports_packed(self, websocket: WebSocket) -> bool:
+        options = self.websocket_to_client_options.get(websocket)
+        return bool(options and options.supports_packed)
+
+    def _frame_for_connection(self, websocket: WebSocket, frame: StateFrame) -> bytes:
+        """
+        取出该连接视角的状态帧字节。增量只发给收到过其基线帧的连接，
+        其余连接（新加入、漏帧、刚切换编码）收到完整状态，之后从这一帧开始接收增量
+        """
+        packed = self._supports_packed(websocket)
+        viewport = self.websocket_to_viewport.get(websocket)
+        delta = self._supports_delta(websocket) and frame.holds_baseline(self.websocket_to_frame_seq.get(websocket))
+        if frame.is_baseline_view(packed, viewport):
+            self.websocket_to_frame_seq[websocket] = frame.seq
+        else:
+            self.websocket_to_frame_seq.pop(websocket, None)
+        return frame.for_user(self.websocket_to_user_id.get(websocket), delta, packed, viewport)
+
+    def _update_room_encodings(self, room_id: int) -> None:
+        """汇总房间内各连接协商的编码，游戏循环广播时只构建这些编码"""
+        encodings = set()
+        for ws in self.room_id_to_connections.get(room_id, set()):
+            if ws in self.websocket_to_viewport:
+                encodings.add(ENCODING_AOI_PACKED if self._supports_packed(ws) else ENCODING_AOI)
+            elif self._supports_packed(ws):
+                encodings.add(ENCODING_PACKED)
+            elif self._supports_delta(ws):
+                encodings.add(ENCODING_DELTA)
+            else:
+                encodings.add(ENCODING_FULL)
+        gm = game_worker_pool or live_war_game_manager.game_manager
+        gm.set_room_encodings(room_id, encodings)
 
     async def handle_message(self, room_id: int, websocket: WebSocket, message: chat_pb2.ChatMessage) -> None:
         """处理消息 - 重写以支持游戏功能"""
@@ -20,106 +72,136 @@ class LiveWarRoomManager(ChatRoomManager):
         if message.type in (chat_pb2.MessageType.USER_TEXT, chat_pb2.MessageType.MUSIC):
             await super().handle_message(room_id, websocket, message)
 
-    async def handle_game_message(self, room_id: int, websocket: WebSocket, game_message: game_pb2.GameMessage) -> None:
-        """处理游戏消息"""
-        username = self.websocket_to_username.get(websocket, "Anonymous")
-        user_id = self.websocket_to_user_id.get(websocket)
-        
-        # 分发给简化版 LiveWar 管理器
-        gm = live_war_game_manager.game_manager
-
-        # 设置广播回调（如果还没有设置）
+    def _ensure_broadcast_callback(self, room_id: int) -> None:
+        """设置游戏循环的广播回调（如果还没有设置）"""
+        gm = game_worker_pool or live_war_game_manager.game_manager
         if room_id not in gm.broadcast_callbacks:
-            async def broadcast_callback(msg: game_pb2.GameMessage):
+            async def broadcast_callback(msg: game_pb2.GameMessage | StateFrame):
                 """游戏循环的广播回调"""
                 connections = list(self.room_id_to_connections.get(room_id, set()))
+                # 非状态消息对所有连接相同，只序列化一次
+                shared_data = None
+                if not isinstance(msg, StateFrame):
+                    shared_data = chat_pb2.WsEnvelope(game=msg).SerializeToString()
                 for ws in connections:
-                    uid_ws = self.websocket_to_user_id.get(ws)
-                    if msg.type == game_pb2.GameMessage.GAME_STATE:
-                        # 使用裁剪后的状态
-                        state = gm.build_state_for_user(room_id, uid_ws)
-                        if state is None:
-                            continue
-                        msg_to_send = game_pb2.GameMessage(
-                            type=game_pb2.GameMessage.GAME_STATE,
-                            game_state=state,
-                        )
+                    if shared_data is not None:
+                        data = shared_data
                     else:
-                        msg_to_send = msg
+                        # 状态帧：按玩家/观战者取出预先序列化好的字节
+                        data = self._frame_for_connection(ws, msg)
                     try:
-                        await ws.send_bytes(
-                            chat_pb2.WsEnvelope(game=msg_to_send).SerializeToString()
-                        )
+                        await ws.send_bytes(data)
                     except Exception:
                         pass  # 连接已断开，忽略
 
             gm.set_broadcast_callback(room_id, broadcast_callback)
 
+    async def handle_game_message(self, room_id: int, websocket: WebSocket, game_message: game_pb2.GameMessage) -> None:
+        """处理游戏消息"""
+        username = self.websocket_to_username.get(websocket, "Anonymous")
+        user_id = self.websocket_to_user_id.get(websocket)
+
+        # 客户端能力协商 / 视野只影响本连接的编码方式，不进入游戏逻辑
+        if game_message.type == game_pb2.GameMessage.CLIENT_OPTIONS:
+            self.websocket_to_client_options[websocket] = game_message.client_options
+            self._update_room_encodings(room_id)
+            return
+        if game_message.type == game_pb2.GameMessage.SET_VIEWPORT:
+            viewport = game_message.viewport
+            if viewport.width > 0 and viewport.height > 0:
+                self.websocket_to_viewport[websocket] = (viewport.x, viewport.y, viewport.width, viewport.height)
+            else:
+                self.websocket_to_viewport.pop(websocket, None)
+            self._update_room_encodings(room_id)
+            return
+        
+        self._ensure_broadcast_callback(room_id)
+
+        # 分发给 LiveWar 管理器（多进程模式下转发给房间所在的工作进程）
+        gm = game_worker_pool or live_war_game_manager.game_manager
         outgoing_msgs = gm.handle_envelope_from_client(
             room_id=room_id,
             user_id=user_id,
             username=username,
             msg=game_message,
         )
+        if game_worker_pool:
+            outgoing_msgs = await outgoing_msgs
+
+        # 非状态消息只序列化一次
+        serialized = [
+            None if isinstance(gm_msg, StateFrame) else chat_pb2.WsEnvelope(game=gm_msg).SerializeToString()
+            for gm_msg in outgoing_msgs
+        ]
 
         # 按玩家/观战者裁剪状态并广播
         connections = list(self.room_id_to_connections.get(room_id, set()))
         for ws in connections:
             uid_ws = self.websocket_to_user_id.get(ws)
-            for gm_msg in outgoing_msgs:
-                # ERROR 消息只发送给触发错误的玩家（uid），不广播给其他人
-                if gm_msg.type == game_pb2.GameMessage.ERROR:
+            for gm_msg, data in zip(outgoing_msgs, serialized):
+                if isinstance(gm_msg, StateFrame):
+                    # 状态帧：取出该连接视角的预序列化字节
+                    data = self._frame_for_connection(ws, gm_msg)
+                elif gm_msg.type == game_pb2.GameMessage.ERROR:
+                    # ERROR 消息只发送给触发错误的玩家（uid），不广播给其他人
                     if uid_ws != user_id:
                         continue  # 跳过，不发送给其他玩家
-                
-                if gm_msg.type == game_pb2.GameMessage.GAME_STATE:
-                    # 使用裁剪后的状态替换
-                    state = gm.build_state_for_user(room_id, uid_ws)
-                    if state is None:
-                        continue
-                    gm_msg_to_send = game_pb2.GameMessage(
-                        type=game_pb2.GameMessage.GAME_STATE,
-                        game_state=state,
-                    )
-                else:
-                    gm_msg_to_send = gm_msg
-
-                await ws.send_bytes(
-                    chat_pb2.WsEnvelope(game=gm_msg_to_send).SerializeToString()
-                )
+
+                await ws.send_bytes(data)
 
     def disconnect(self, room_id: int, websocket: WebSocket) -> None:
         """断开连接 - 重写以处理游戏相关清理"""
         super().disconnect(room_id, websocket)
+        self.websocket_to_client_options.pop(websocket, None)
+        self.websocket_to_viewport.pop(websocket, None)
+        self.websocket_to_frame_seq.pop(websocket, None)
         
-        # 如果房间为空，清理游戏状态
+        # 如果房间为空，停止游戏循环并清理游戏状态、广播回调、增量编码器等
+        # （进程即将退出时保留，由快照保存后在重启时恢复）
+        if self.draining:
+            return
         if room_id not in self.room_id_to_connections:
-            gm = live_war_game_manager.game_manager
-            # 停止游戏循环
-            gm._stop_game_loop(room_id)
-            # 删除游戏状态
-            if room_id in gm.room_states:
-                del gm.room_states[room_id]
-            # 删除广播回调
-            if room_id in gm.broadcast_callbacks:
-                del gm.broadcast_callbacks[room_id]
+            gm = game_worker_pool or live_war_game_manager.game_manager
+            gm.release_room(room_id)
+        else:
+            self._update_room_encodings(room_id)
+
+    def release_restored_room(self, room_id: int) -> None:
+        """恢复的房间在宽限期内无人重连：与房间变空时一样释放游戏状态"""
+        if room_id not in self.room_id_to_connections:
+            gm = game_worker_pool or live_war_game_manager.game_manager
+            gm.release_room(room_id)
 
     async def send_initial_state(self, room_id: int, websocket: WebSocket) -> None:
         """发送初始状态给新加入的用户"""
+        # 新连接在协商之前按旧版完整状态接收
+        self._update_room_encodings(room_id)
+        # 对局可能已在运行（例如从快照恢复的房间）：重连后即使不发送命令也能收到广播
+        self._ensure_broadcast_callback(room_id)
+        # 从快照恢复的对局在有人重连之前暂停，第一个连接进入时继续
+        gm = game_worker_pool or live_war_game_manager.game_manager
+        gm.resume_room(room_id)
         # 发送当前游戏状态给新加入的用户
-        gm = live_war_game_manager.game_manager
-        uid = self.websocket_to_user_id.get(websocket)
-        state = gm.build_state_for_user(room_id, uid)
-        if state:
-            game_state_msg = game_pb2.GameMessage(
-                type=game_pb2.GameMessage.GAME_STATE,
-                game_state=state,
+        if game_worker_pool:
+            snapshot, frame = await game_worker_pool.build_initial_state(room_id)
+        else:
+            gm = live_war_game_manager.game_manager
+            snapshot = gm.build_map_snapshot(room_id)
+            # 新连接总是先收到完整状态（关键帧），之后才能应用增量帧
+            frame = gm.build_state_frame(room_id, for_broadcast=False)
+        # 先发送静态地图快照，后续每 tick 的状态只携带 map_version
+        if snapshot:
+            map_msg = game_pb2.GameMessage(
+                type=game_pb2.GameMessage.MAP_SNAPSHOT,
+                map_snapshot=snapshot,
             )
             await self._send_to_connection(
                 room_id,
                 websocket,
-                chat_pb2.WsEnvelope(game=game_state_msg).SerializeToString(),
+                chat_pb2.WsEnvelope(game=map_msg).SerializeToString(),
             )
+        if frame:
+            await self._send_to_connection(room_id, websocket, self._frame_for_connection(websocket, frame))
 
 
 # 全局实例
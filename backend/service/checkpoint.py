@@ -0,0 +1,225 @@
+"""
+房间状态快照（checkpoint）文件格式
+
+说明：
+- 一个文件保存所有房间服务的内存状态（LiveWar 对局、五子棋棋盘、你画我猜画布），用于重启 / 滚动发布后恢复
+- 文件布局：定长文件头 + 目录（每个分区一项：类型、room_id、偏移、长度、crc32）+ 各分区数据，
+  分区数据按 8 字节对齐；读取时 mmap 整个文件，目录之外只按需切片，不复制未使用的分区
+- 分区数据由若干"块"组成：小块元数据为 JSON，单位 / 矿场等实体按列写成定长数组（array 的本机字节序），
+  读取时直接 memoryview.cast 为对应类型，不逐项解析
+- 写入时先写临时文件再 os.replace，进程中途退出不会留下半个文件
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+CHECKPOINT_MAGIC = b"LWCK"
+CHECKPOINT_VERSION = 1
+
+# 文件头：magic, 版本, 字节序（1 = little）, 创建时间, 分区数
+_HEADER = struct.Struct("<4sHBxdI4x")
+# 目录项：分区类型（ASCII，不足补 0）, room_id, 偏移, 长度, crc32
+_ENTRY = struct.Struct("<8sqQQI4x")
+# 块头：块名（ASCII，不足补 0）, 类型码, 数据长度；类型码为 array 的类型码，或 J（JSON）/ R（原始字节）
+_BLOCK = struct.Struct("<16scxxxI")
+
+_BYTE_ORDER = 1 if sys.byteorder == "little" else 0
+_ALIGN = 8
+
+
+class CheckpointError(Exception):
+    """快照文件损坏或与当前程序不兼容"""
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGN
+
+
+# ========== 分区数据：块编码 ==========
+
+class BlockWriter:
+    """按顺序写入一个分区的各个块"""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+
+    def _add(self, name: str, typecode: bytes, data: bytes) -> None:
+        self._parts.append(_BLOCK.pack(name.encode("ascii"), typecode, len(data)))
+        self._parts.append(data)
+        self._parts.append(bytes(_padding(len(data))))
+
+    def meta(self, name: str, value) -> None:
+        """JSON 元数据（标量、小字典；字典的整数键会变成字符串）"""
+        self._add(name, b"J", json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+    def raw(self, name: str, data: bytes) -> None:
+        self._add(name, b"R", bytes(data))
+
+    def column(self, name: str, typecode: str, values: Iterable) -> None:
+        """定长数组列（typecode 同 array 模块）"""
+        self._add(name, typecode.encode("ascii"), array(typecode, values).tobytes())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+def read_blocks(data) -> Dict[str, object]:
+    """
+    解析分区数据：JSON 块返回解码后的对象，原始字节块返回 memoryview，
+    数组列返回 cast 后的 memoryview（与 data 共享内存；data 来自 mmap 时，需要保留的值要自行复制）
+    """
+    view = memoryview(data)
+    blocks: Dict[str, object] = {}
+    offset = 0
+    while offset < len(view):
+        if offset + _BLOCK.size > len(view):
+            raise CheckpointError("分区数据被截断")
+        raw_name, typecode, size = _BLOCK.unpack_from(view, offset)
+        offset += _BLOCK.size
+        if offset + size > len(view):
+            raise CheckpointError("分区数据被截断")
+        body = view[offset:offset + size]
+        name = raw_name.rstrip(b"\0").decode("ascii")
+        if typecode == b"J":
+            blocks[name] = json.loads(bytes(body))
+        elif typecode == b"R":
+            blocks[name] = body
+        else:
+            blocks[name] = body.cast(typecode.decode("ascii"))
+        offset += size + _padding(size)
+    return blocks
+
+
+def optional(value: float) -> Optional[float]:
+    """列中以 NaN 表示的空值还原为 None"""
+    return None if value != value else value
+
+
+# ========== 文件读写 ==========
+
+def write_checkpoint(path: str, sections: Iterable[Tuple[str, int, bytes]], created_at: Optional[float] = None) -> int:
+    """
+    写入快照文件（先写 <path>.tmp 再替换），返回文件字节数。
+
+    sections 为 (分区类型, room_id, 分区数据)，类型最长 8 个 ASCII 字符。
+    """
+    sections = list(sections)
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    offset += _padding(offset)
+    entries = []
+    for kind, room_id, data in sections:
+        entries.append(_ENTRY.pack(kind.encode("ascii"), room_id, offset, len(data), zlib.crc32(data)))
+        offset += len(data) + _padding(len(data))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(
+            CHECKPOINT_MAGIC, CHECKPOINT_VERSION, _BYTE_ORDER,
+            time.time() if created_at is None else created_at, len(sections),
+        ))
+        f.write(b"".join(entries))
+        f.write(bytes(_padding(f.tell())))
+        for _, _, data in sections:
+            f.write(data)
+            f.write(bytes(_padding(len(data))))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return offset
+
+
+class CheckpointReader:
+    """
+    mmap 方式读取快照文件，只解析文件头和目录；分区数据在 get / items 时切片并校验 crc32。
+
+    返回的 memoryview 引用 mmap，需要在 close（或退出 with）之前用完或复制。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise CheckpointError("快照文件为空")
+        self._view = memoryview(self._mmap)
+        try:
+            self._entries = self._read_directory()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_directory(self) -> Dict[Tuple[str, int], Tuple[int, int, int]]:
+        if len(self._view) < _HEADER.size:
+            raise CheckpointError("快照文件头被截断")
+        magic, version, byte_order, created_at, count = _HEADER.unpack_from(self._view, 0)
+        if magic != CHECKPOINT_MAGIC:
+            raise CheckpointError("不是房间快照文件")
+        if version != CHECKPOINT_VERSION:
+            raise CheckpointError(f"不支持的快照版本 {version}")
+        if byte_order != _BYTE_ORDER:
+            raise CheckpointError("快照文件的字节序与本机不同")
+        if _HEADER.size + _ENTRY.size * count > len(self._view):
+            raise CheckpointError("快照目录被截断")
+        self.created_at = created_at
+        entries = {}
+        for index in range(count):
+            raw_kind, room_id, offset, size, crc = _ENTRY.unpack_from(self._view, _HEADER.size + _ENTRY.size * index)
+            if offset + size > len(self._view):
+                raise CheckpointError("快照分区被截断")
+            entries[raw_kind.rstrip(b"\0").decode("ascii"), room_id] = (offset, size, crc)
+        return entries
+
+    def __enter__(self) -> "CheckpointReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def age(self) -> float:
+        """快照写入至今的秒数"""
+        return time.time() - self.created_at
+
+    def sections(self) -> List[Tuple[str, int]]:
+        return list(self._entries)
+
+    def get(self, kind: str, room_id: int) -> Optional[memoryview]:
+        entry = self._entries.get((kind, room_id))
+        if entry is None:
+            return None
+        offset, size, crc = entry
+        data = self._view[offset:offset + size]
+        if zlib.crc32(data) != crc:
+            raise CheckpointError(f"分区 {kind}/{room_id} 校验失败")
+        return data
+
+    def items(self, kind: str) -> Iterator[Tuple[int, memoryview]]:
+        """某一类型的全部分区：(room_id, 分区数据)"""
+        for entry_kind, room_id in list(self._entries):
+            if entry_kind == kind:
+                yield room_id, self.get(kind, room_id)
+
+    def close(self) -> None:
+        if self._mmap.closed:
+            return
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # 调用方仍持有切片：mmap 随最后一个切片释放
+        self._file.close()
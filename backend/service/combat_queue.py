@@ -0,0 +1,138 @@
+"""
+LiveWar 战斗冷却队列
+
+说明：
+- 冷却中的单位放在按上次攻击时间排序的最小堆中（冷却时长对所有单位相同，等价于按下次可攻击时间排序），
+  冷却结束后移入"待命"集合；战斗阶段只访问待命单位，冷却中的单位不再逐 tick 检查
+- 待命集合按 id 有序维护（插入 / 删除时二分查找），战斗阶段按 id 顺序访问，与逐单位遍历的结算顺序一致
+- 静止的待命单位范围内没有目标时"挂起"：按攻击范围覆盖的格子登记，之后不再逐 tick 查找目标；
+  自己移动，或有敌方单位在这些格子中出生 / 移动时才唤醒回待命集合（攻击目标只会因这两种情况出现）。
+  移动中的单位每 tick 都会唤醒自己，由调用方留在待命集合中，不反复挂起
+- 攻击后重新入堆；单位移除 / 重新攻击时不从堆中删除旧记录，出堆时按 (时间, 单位) 是否仍然有效惰性丢弃
+"""
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+Cell = Tuple[int, int]
+
+
+class CooldownQueue:
+    """按冷却就绪时间调度的攻击者队列，元素需要有 id / team / x / y / attack_range / last_attack_time 属性"""
+
+    def __init__(self, cooldown: float, cell_size: int = 4) -> None:
+        self.cooldown = cooldown
+        self.cell_size = cell_size
+        self._units: Dict[int, object] = {}  # 队列中的全部单位
+        self._heap: List[Tuple[float, int]] = []  # 冷却中：(上次攻击时间, unit_id)
+        self._ready: Dict[int, object] = {}  # 冷却已结束、等待目标的单位
+        self._ready_ids: List[int] = []  # 待命单位 id（有序）
+        self._parked: Dict[int, List[Cell]] = {}  # 挂起的单位 -> 登记的格子
+        self._watchers: Dict[Cell, Dict[int, object]] = {}  # 格子 -> 在此等待目标的挂起单位
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    @property
+    def ready_count(self) -> int:
+        return len(self._ready)
+
+    @property
+    def parked_count(self) -> int:
+        return len(self._parked)
+
+    def clear(self) -> None:
+        self._units.clear()
+        self._heap.clear()
+        self._ready.clear()
+        self._ready_ids.clear()
+        self._parked.clear()
+        self._watchers.clear()
+
+    def _cell_of(self, x: float, y: float) -> Cell:
+        return int(math.floor(x)) // self.cell_size, int(math.floor(y)) // self.cell_size
+
+    def add(self, unit) -> None:
+        self._units[unit.id] = unit
+        self.cooled_down(unit)
+        self._wake_watchers(unit)
+
+    def remove(self, unit) -> None:
+        if self._units.pop(unit.id, None) is not None:
+            self._discard_ready(unit.id)
+            self._unpark(unit.id)
+
+    def cooled_down(self, unit) -> None:
+        """单位刚刚攻击（last_attack_time 已更新）：移回冷却堆"""
+        if unit.id not in self._units:
+            return
+        self._discard_ready(unit.id)
+        self._unpark(unit.id)
+        heapq.heappush(self._heap, (unit.last_attack_time, unit.id))
+
+    def park(self, unit) -> None:
+        """待命单位本 tick 范围内没有目标：挂起，直到自己移动或有敌方单位进入攻击范围覆盖的格子"""
+        if unit.id not in self._ready:
+            return
+        self._discard_ready(unit.id)
+        radius = unit.attack_range
+        min_cx, min_cy = self._cell_of(unit.x - radius, unit.y - radius)
+        max_cx, max_cy = self._cell_of(unit.x + radius, unit.y + radius)
+        cells = [(cx, cy) for cx in range(min_cx, max_cx + 1) for cy in range(min_cy, max_cy + 1)]
+        for cell in cells:
+            self._watchers.setdefault(cell, {})[unit.id] = unit
+        self._parked[unit.id] = cells
+
+    def moved(self, unit) -> None:
+        """单位位置发生了变化：唤醒它自己（如果挂起）以及在新位置所在格子等待目标的敌方单位"""
+        if not self._parked:
+            return
+        if unit.id in self._parked:
+            self._wake(unit)
+        self._wake_watchers(unit)
+
+    def _wake_watchers(self, unit) -> None:
+        watchers = self._watchers.get(self._cell_of(unit.x, unit.y))
+        if watchers:
+            for watcher in [w for w in watchers.values() if w.team != unit.team]:
+                self._wake(watcher)
+
+    def _wake(self, unit) -> None:
+        self._unpark(unit.id)
+        self._ready[unit.id] = unit
+        insort(self._ready_ids, unit.id)
+
+    def _unpark(self, unit_id: int) -> None:
+        cells = self._parked.pop(unit_id, None)
+        if cells is None:
+            return
+        for cell in cells:
+            watchers = self._watchers[cell]
+            del watchers[unit_id]
+            if not watchers:
+                del self._watchers[cell]
+
+    def _discard_ready(self, unit_id: int) -> None:
+        if self._ready.pop(unit_id, None) is not None:
+            ids = self._ready_ids
+            del ids[bisect_left(ids, unit_id)]
+
+    def pop_ready(self, current_time: float) -> List:
+        """
+        把冷却已结束的单位移入待命集合，按 id 顺序返回全部待命单位（列表副本，遍历时可安全增删）。
+
+        判定与逐单位检查一致：current_time - last_attack_time >= cooldown。
+        """
+        heap = self._heap
+        units = self._units
+        ready = self._ready
+        while heap and current_time - heap[0][0] >= self.cooldown:
+            last_attack_time, unit_id = heapq.heappop(heap)
+            unit = units.get(unit_id)
+            # 已移除或之后又攻击过（堆中有更新的记录）的旧记录直接丢弃
+            if unit is not None and unit.last_attack_time == last_attack_time and unit_id not in ready:
+                ready[unit_id] = unit
+                insort(self._ready_ids, unit_id)
+        return [ready[unit_id] for unit_id in self._ready_ids]
@@ -0,0 +1,86 @@
+"""
+LiveWar 实体存储（单位 / 矿场 / 能量掉落）
+
+说明：
+- 按 id 保存在 dict 中：查找、判断存在、删除都是 O(1)，不再重建列表或 list.remove
+- 实体 id 在房间内单调递增，dict 保持插入顺序，因此遍历顺序就是 id 顺序（与原来的列表顺序一致，
+  对局仍然可以确定性复现）；id 不复用，不需要空闲列表
+- 可按若干分区函数维护分区视图（例如按阵营、按 (阵营, 类型)、按所属玩家），出生 / 死亡时同步更新；
+  分区键在实体存续期间不能改变
+- 遍历期间不能增删实体（dict 会报错），需要边遍历边删除时先 list() 复制
+"""
+
+from itertools import chain
+from typing import Callable, Dict, Generic, Hashable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_EMPTY: Dict[int, object] = {}
+
+
+class EntityStore(Generic[T]):
+    """按 id 索引的实体集合，元素需要有 id 属性"""
+
+    __slots__ = ("_items", "_partitions", "_views")
+
+    def __init__(self, partitions: Optional[Dict[str, Callable[[T], Hashable]]] = None) -> None:
+        self._items: Dict[int, T] = {}
+        # 分区名 -> 分区函数；分区名 -> {分区键 -> {id -> 实体}}
+        self._partitions = partitions or {}
+        self._views: Dict[str, Dict[Hashable, Dict[int, T]]] = {name: {} for name in self._partitions}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items.values())
+
+    def __contains__(self, entity: object) -> bool:
+        """按 id 判断，并要求是同一个对象（已移除实体的旧引用返回 False）"""
+        return self._items.get(getattr(entity, "id", None)) is entity
+
+    def get(self, entity_id: int) -> Optional[T]:
+        return self._items.get(entity_id)
+
+    # ========== 维护 ==========
+
+    def add(self, entity: T) -> None:
+        self._items[entity.id] = entity
+        for name, key_of in self._partitions.items():
+            self._views[name].setdefault(key_of(entity), {})[entity.id] = entity
+
+    def remove(self, entity: T) -> bool:
+        """移除实体，返回是否存在"""
+        if self._items.get(entity.id) is not entity:
+            return False
+        del self._items[entity.id]
+        for name, key_of in self._partitions.items():
+            views = self._views[name]
+            key = key_of(entity)
+            view = views[key]
+            del view[entity.id]
+            if not view:
+                del views[key]
+        return True
+
+    def clear(self) -> None:
+        self._items.clear()
+        for views in self._views.values():
+            views.clear()
+
+    # ========== 分区视图 ==========
+
+    def view(self, partition: str, key: Hashable) -> Iterable[T]:
+        """某个分区键下的实体（id 顺序，实时视图）"""
+        return self._views[partition].get(key, _EMPTY).values()
+
+    def count(self, partition: str, key: Hashable) -> int:
+        return len(self._views[partition].get(key, _EMPTY))
+
+    def views(self, partition: str, keys: Iterable[Hashable]) -> Iterator[T]:
+        """依次遍历多个分区键下的实体（各分区内为 id 顺序）"""
+        views = self._views[partition]
+        return chain.from_iterable(views.get(key, _EMPTY).values() for key in keys)
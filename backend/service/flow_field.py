@@ -0,0 +1,107 @@
+"""
+LiveWar 共享流场寻路
+
+说明：
+- 对常用的静态目标（双方基地、存活矿场）按目标格子计算一张距离场（8 方向 Dijkstra，对角代价 1.414）
+- 只考虑占用网格中的静态障碍，单位之间的避让仍交给 ORCA
+- 同一房间内所有前往同一目标的单位共享同一张距离场，查询下一步为 O(1)
+- 占用网格的障碍版本号变化时整体失效，按需重新计算
+"""
+
+import heapq
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from service.occupancy import OccupancyGrid
+
+Cell = Tuple[int, int]
+
+_UNREACHABLE = float("inf")
+_DIAGONAL_COST = 1.414
+_DIRECTIONS = (
+    (1, 0, 1.0), (1, 1, _DIAGONAL_COST), (0, 1, 1.0), (-1, 1, _DIAGONAL_COST),
+    (-1, 0, 1.0), (-1, -1, _DIAGONAL_COST), (0, -1, 1.0), (1, -1, _DIAGONAL_COST),
+)
+
+
+class FlowField:
+    """以单个目标格子为源点的距离场"""
+
+    __slots__ = ("goal", "width", "height", "distances")
+
+    def __init__(self, occupancy: OccupancyGrid, goal: Cell) -> None:
+        self.goal = goal
+        self.width = occupancy.width
+        self.height = occupancy.height
+        self.distances = array("d", [_UNREACHABLE]) * (self.width * self.height)
+        self._compute(occupancy)
+
+    def _compute(self, occupancy: OccupancyGrid) -> None:
+        width, height = self.width, self.height
+        obstacles = occupancy.obstacles
+        distances = self.distances
+        goal_x, goal_y = self.goal
+        if not (0 <= goal_x < width and 0 <= goal_y < height):
+            return
+
+        # 目标本身（基地 / 矿场）是障碍格子，仍作为源点向外扩展
+        goal_idx = goal_y * width + goal_x
+        distances[goal_idx] = 0.0
+        open_set = [(0.0, goal_x, goal_y)]
+        while open_set:
+            dist, x, y = heapq.heappop(open_set)
+            if dist > distances[y * width + x]:
+                continue
+            for dx, dy, cost in _DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or nx >= width or ny < 0 or ny >= height:
+                    continue
+                idx = ny * width + nx
+                if obstacles[idx]:
+                    continue
+                new_dist = dist + cost
+                if new_dist < distances[idx]:
+                    distances[idx] = new_dist
+                    heapq.heappush(open_set, (new_dist, nx, ny))
+
+    def distance(self, grid_x: int, grid_y: int) -> float:
+        if 0 <= grid_x < self.width and 0 <= grid_y < self.height:
+            return self.distances[grid_y * self.width + grid_x]
+        return _UNREACHABLE
+
+    def next_cells(self, grid_x: int, grid_y: int) -> List[Cell]:
+        """
+        返回从 (grid_x, grid_y) 出发沿距离场下降的相邻格子，按距离从近到远排序。
+        调用方依次尝试，第一个未被单位占用的即为下一步。
+        """
+        current = self.distance(grid_x, grid_y)
+        candidates = []
+        for dx, dy, _ in _DIRECTIONS:
+            nx, ny = grid_x + dx, grid_y + dy
+            dist = self.distance(nx, ny)
+            if dist < current:
+                candidates.append((dist, (nx, ny)))
+        candidates.sort()
+        return [cell for _, cell in candidates]
+
+
+class FlowFieldCache:
+    """房间内按目标格子缓存的流场，障碍版本变化时整体失效"""
+
+    def __init__(self) -> None:
+        self._fields: Dict[Cell, FlowField] = {}
+        self._version: Optional[int] = None
+
+    def clear(self) -> None:
+        self._fields.clear()
+        self._version = None
+
+    def get(self, occupancy: OccupancyGrid, goal: Cell) -> FlowField:
+        if self._version != occupancy.version:
+            self._fields.clear()
+            self._version = occupancy.version
+        flow = self._fields.get(goal)
+        if flow is None:
+            flow = FlowField(occupancy, goal)
+            self._fields[goal] = flow
+        return flow
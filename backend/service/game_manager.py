@@ -9,15 +9,41 @@ LiveWar 游戏管理器（完整版，接入 live_war 完整逻辑）
 """
 
 import asyncio
+import itertools
 import time
 import math
 import random
-import uuid
 import heapq
-from dataclasses import dataclass, field
-from typing import Dict, Optional, List, Callable, Tuple
+from dataclasses import asdict, dataclass, field
+from operator import attrgetter
+from typing import Awaitable, Dict, Iterable, Optional, List, Callable, Collection, Sequence, Set, Tuple
 
+from config.settings import settings
 from protos import game_pb2
+from service.checkpoint import BlockWriter, optional, read_blocks
+from service.combat_queue import CooldownQueue
+from service.entity_store import EntityStore
+from service.flow_field import FlowFieldCache
+from service.occupancy import OccupancyGrid
+from service.path_cache import PathCache
+from service.spatial_index import SpatialHash
+from service.state_delta import StateDeltaEncoder
+from service.interest import AoiFrame
+from service.state_frame import (
+    DEFAULT_ENCODINGS,
+    ENCODING_AOI,
+    ENCODING_AOI_PACKED,
+    ENCODING_DELTA,
+    ENCODING_FULL,
+    ENCODING_PACKED,
+    StateFrame,
+)
+from service.map_gen import MapPool, default_bases, next_map_seed
+from service.replay import MatchRecording
+from service.terrain import pack_bits
+from service.tick_profiler import RoomProfile, SamplingProfiler
+from service.tick_scheduler import FixedTimestepClock, FrameStats, TickStats
+from service.unit_store import NUMPY_AVAILABLE, TEAM_CODES, TYPE_CODES, UnitArrays
 
 # ========== 游戏配置常量 ==========
 UNIT_TYPES = {
@@ -35,11 +61,17 @@ UNIT_SPAWN_COST = {
 }
 
 GAME_RULES = {
-    "tick_interval": 0.1,  # 100ms per tick
+    "tick_interval": 1.0 / settings.live_war.tick_rate,  # 默认 10Hz，即 100ms per tick
     "attack_cooldown": 1.0,
     "mining_speed_penalty": 0.8,
 }
 
+# 各单位类型可攻击的目标类型（不在表中的类型可以攻击所有敌方单位）
+COMBAT_TARGET_TYPES = {
+    "assault_tank": frozenset(("heavy_tank", "assault_tank", "engineer", "miner")),
+    "heavy_tank": frozenset(("heavy_tank", "assault_tank")),
+}
+
 MINE_FIELD_CONFIG = {
     "energy_per_harvest": 10,
     "lifetime": 180,  # 3 minutes
@@ -53,6 +85,79 @@ ENERGY_CONFIG = {
     "drop_lifetime": 60,
 }
 
+DELTA_CONFIG = {
+    "keyframe_interval": 50,  # 每50次广播发送一次完整关键帧（10Hz 模拟、5Hz 广播时约10秒）
+}
+
+PACKED_CONFIG = {
+    "position_scale": 64,  # 紧凑编码的坐标精度：1/64 格（60 格地图的坐标在 int16 范围内）
+}
+
+AOI_CONFIG = {
+    "margin": 4,  # 视野四周额外下发的格数（按空间索引的桶取整后实际更多）
+    "minimap_cell_size": 6,  # 小地图概览每格覆盖的地图格数
+}
+
+SCHEDULER_CONFIG = {
+    "overrun_policy": settings.live_war.overrun_policy,  # catch_up / skip
+    "max_catch_up_ticks": settings.live_war.max_catch_up_ticks,
+    "sub_slots": max(1, settings.live_war.sub_slots),
+    # 每隔多少个模拟 tick 广播一次状态（模拟 10Hz、广播 5Hz 时为 2）
+    "broadcast_every": max(1, round(settings.live_war.tick_rate / settings.live_war.broadcast_rate)),
+}
+
+SIMULATION_CONFIG = {
+    # 向量化的战斗结算与目标查询；numpy 未安装时退回逐单位实现
+    "numpy_units": settings.live_war.numpy_units and NUMPY_AVAILABLE,
+}
+
+AI_CONFIG = {
+    # 决策间隔：每个单位每隔多少个 tick 做一次完整决策（选目标、路径规划、避让），按单位 ID 错开到不同 tick；
+    # 其余 tick 只执行交付 / 采集 / 治疗等动作并沿上次决策的路点移动。1 表示每 tick 都决策
+    "decision_interval": 3,
+    # 每 tick AI 决策的 CPU 预算（秒）：超出后剩余单位的决策顺延到下一 tick（确定性模式下不启用）
+    "tick_budget": 0.02,
+    # 按类型查找最近单位时，候选分区（例如"敌方坦克"）不超过该数量就直接遍历分区，否则用空间索引按环搜索
+    "view_scan_limit": 32,
+}
+
+# 决策排序的单位优先级（越小越优先）：同样逾期时先保证战斗单位的决策
+AI_PRIORITY = {"heavy_tank": 0, "assault_tank": 0, "engineer": 1, "miner": 2}
+
+# 单位存储的分区视图（见 EntityStore）：阵营、(阵营, 类型)、所属玩家在单位存续期间不变
+UNIT_PARTITIONS = {
+    "team": attrgetter("team"),
+    "team_type": attrgetter("team", "type"),
+    "owner": attrgetter("owner_id"),
+}
+
+TANK_TYPES = ("heavy_tank", "assault_tank")
+
+MAP_CONFIG = {
+    "width": 60,
+    "height": 60,
+    "pool_size": 2,  # 每种尺寸保留的预生成地图数
+}
+
+REPLAY_CONFIG = {
+    # 确定性模式的全局种子（None 为正常模式：房间种子随机、地图取自预生成地图池）
+    "seed": settings.live_war.seed,
+    # 对局录像目录（空字符串表示不录制）
+    "record_dir": settings.live_war.record_dir,
+    # 录像每隔多少个 tick 记录一次状态校验和，回放时据此定位第一次出现分歧的位置
+    "checksum_interval": 50,
+}
+
+PROFILER_CONFIG = {
+    "window": 600,  # 每个房间保留最近多少个 tick 的分阶段耗时（10Hz 下约 1 分钟）
+    "sample_interval": 0.005,  # 采样剖析器的采样间隔（秒）
+    "max_sample_duration": 60.0,  # 采样剖析器单次最长运行时间（秒）
+}
+
+PATHFINDING_CONFIG = {
+    "path_cache_size": 512,  # 每个房间缓存的局部 A* 结果条数（LRU）
+}
+
 
 @dataclass
 class BaseState:
@@ -64,11 +169,11 @@ class BaseState:
     hp_max: int = 1000
 
 
-@dataclass
+@dataclass(slots=True)
 class UnitState:
     """完整的单位状态"""
 
-    id: str  # 改为字符串，使用 uuid
+    id: int  # 房间内单调递增，序列化时才转为字符串
     type: str  # "miner" / "engineer" / "heavy_tank" / "assault_tank"
     team: str  # "red" / "blue"
     owner_id: int
@@ -83,7 +188,7 @@ class UnitState:
     carrying_energy: int = 0
     target_x: Optional[float] = None
     target_y: Optional[float] = None
-    target_id: Optional[str] = None  # 攻击目标ID
+    target_id: Optional[int] = None  # 攻击目标ID
     last_attack_time: float = 0.0
     is_mining: bool = False
     # 路径规划相关
@@ -91,13 +196,22 @@ class UnitState:
     stuck_counter: int = 0  # 卡住计数器
     failed_target: Optional[Tuple[float, float]] = None  # 上次失败的目标位置
     last_path_time: float = 0.0  # 上次路径规划时间
-
-
-@dataclass
+    # AI 降频决策（见 AI_CONFIG）
+    next_decision_tick: int = 0  # 下次完整决策的 tick
+    ai_goal: object = field(default=None, compare=False, repr=False)  # 矿工决策选中的基地 / 矿场 / 能量掉落
+    waypoint: Optional[Tuple[float, float]] = None  # 上次决策得到的移动路点，非决策 tick 沿它移动
+    waypoint_as: str = ""  # 沿路点移动时占格检查使用的单位类型
+    waypoint_speed: float = 1.0  # 沿路点移动的速度倍率
+    # 最近一个 tick 的速度（格/秒），随状态下发供客户端在两次广播之间外推
+    vx: float = 0.0
+    vy: float = 0.0
+
+
+@dataclass(slots=True)
 class MineFieldState:
     """矿场状态"""
 
-    id: str
+    id: int
     x: float
     y: float
     energy: int
@@ -106,22 +220,22 @@ class MineFieldState:
     lifetime: float = 180.0
 
 
-@dataclass
+@dataclass(slots=True)
 class EnergyDrop:
     """掉落的能量"""
 
-    id: str
+    id: int
     x: float
     y: float
     energy: int
     drop_time: float
 
 
-@dataclass
+@dataclass(slots=True)
 class HealEffect:
-    """治疗特效"""
+    """治疗事件（一次性，只随发生后的第一次广播下发，动画时长由客户端按 lifetime 维护）"""
 
-    id: str
+    id: int
     x: float
     y: float
     created_time: float
@@ -129,11 +243,11 @@ class HealEffect:
     lifetime: float = 0.5
 
 
-@dataclass
+@dataclass(slots=True)
 class BulletEffect:
-    """子弹特效"""
+    """子弹事件（一次性，只随发生后的第一次广播下发，动画时长由客户端按 lifetime 维护）"""
 
-    id: str
+    id: int
     from_x: float
     from_y: float
     to_x: float
@@ -151,7 +265,11 @@ class RoomGameState:
     players: Dict[int, str] = field(default_factory=dict)  # user_id -> username
     # 已选择的阵营
     teams: Dict[int, str] = field(default_factory=dict)  # user_id -> "red"/"blue"
+    # 模拟 tick 数：只由 _process_tick 推进，模拟时钟（game_time）与广播节奏都由它推导；
+    # 命令回复的状态帧沿用当前 tick（以 frame_seq 区分）
     tick: int = 0
+    # 广播状态帧序号：每个发给整个房间的状态帧（周期广播与命令回复）递增，标识增量基线
+    frame_seq: int = 0
     game_started: bool = False
     game_start_time: float = 0.0
     game_time: float = 0.0
@@ -163,14 +281,28 @@ class RoomGameState:
     height: int = 60
     red_base: BaseState | None = None
     blue_base: BaseState | None = None
-    units: List[UnitState] = field(default_factory=list)
-    mine_fields: List[MineFieldState] = field(default_factory=list)
-    energy_drops: List[EnergyDrop] = field(default_factory=list)
+    # 按 id 索引（遍历顺序为 id 顺序），单位另有阵营 / 类型 / 所属玩家分区视图
+    units: EntityStore[UnitState] = field(default_factory=lambda: EntityStore(UNIT_PARTITIONS))
+    mine_fields: EntityStore[MineFieldState] = field(default_factory=EntityStore)
+    energy_drops: EntityStore[EnergyDrop] = field(default_factory=EntityStore)
+    # 自上次广播以来产生的一次性事件：只随一个广播状态帧（周期广播或命令回复）下发，构建该帧时取走
     heal_effects: List[HealEffect] = field(default_factory=list)
     bullet_effects: List[BulletEffect] = field(default_factory=list)
     walls: List[tuple[float, float]] = field(default_factory=list)  # (x, y) positions
     lakes: List[tuple[float, float]] = field(default_factory=list)  # (x, y) positions - 湖泊，单位不能进入
-    terrain: Dict[tuple[int, int], int] = field(default_factory=dict)  # (x, y) -> 0(草地) or 1(泥土)
+    # 地形网格：行优先（y * width + x），每格 0(草地) or 1(泥土)
+    terrain: bytearray = field(default_factory=bytearray)
+    # 静态地图版本：仅在 _generate_map 中变化，客户端据此判断是否需要新的地图快照
+    map_version: int = 0
+    # 当前地图的生成种子（generate_map 可据此复现地形和湖泊）
+    map_seed: int = 0
+    # 本 tick 局部 A* 展开的节点数（统计用，每 tick 结束时计入 RoomProfile 后清零）
+    astar_nodes: int = 0
+    # 房间随机数（出生偏移、矿场位置等），由 seed 初始化；同样的 seed + 同样的命令序列得到同样的对局
+    seed: int = 0
+    rng: random.Random = field(default_factory=random.Random)
+    # 下一个实体 ID：单位 / 矿场 / 掉落 / 特效共用，单调递增（重置游戏也不回退）
+    next_entity_id: int = 1
 
     # 玩家能量 & 选中的单位类型
     energies: Dict[int, int] = field(default_factory=dict)  # user_id -> energy
@@ -181,9 +313,36 @@ class RoomGameState:
     player_logs: Dict[int, List[str]] = field(default_factory=dict)  # user_id -> logs
     
     # 玩家主矿工跟踪（用于自动重生）
-    player_main_miner_id: Dict[int, str] = field(default_factory=dict)  # user_id -> unit_id (主矿工ID)
+    player_main_miner_id: Dict[int, int] = field(default_factory=dict)  # user_id -> unit_id (主矿工ID)
     player_miner_death_time: Dict[int, float] = field(default_factory=dict)  # user_id -> death_time (主矿工死亡时间)
 
+    # 单位空间索引（派生数据）：每 tick 开始时重建，单位出生/死亡/移动后增量维护
+    unit_index: SpatialHash = field(default_factory=SpatialHash)
+    # 占用网格（派生数据）：静态障碍在地图生成/矿场增删时更新，单位计数与 unit_index 同步维护
+    occupancy: OccupancyGrid = field(default_factory=OccupancyGrid)
+    # 湖泊格子集合（派生数据）：与 occupancy 一起在 _rebuild_obstacles 中重建，供矿场选址 O(1) 判断
+    lake_cells: Set[Tuple[int, int]] = field(default_factory=set)
+    # 基地 / 矿场目标的共享流场（派生数据）：随 occupancy 的障碍版本号失效
+    flow_fields: FlowFieldCache = field(default_factory=FlowFieldCache)
+    # 局部 A* 结果缓存（派生数据）：随 occupancy 的障碍版本号失效
+    path_cache: PathCache = field(
+        default_factory=lambda: PathCache(PATHFINDING_CONFIG["path_cache_size"])
+    )
+    # 单位列式镜像（派生数据，仅在启用 numpy_units 时存在）：与 unit_index 同步维护
+    unit_arrays: Optional[UnitArrays] = field(
+        default_factory=lambda: UnitArrays() if SIMULATION_CONFIG["numpy_units"] else None
+    )
+    # 攻击冷却队列（派生数据，逐单位战斗时使用）：单位出生 / 死亡 / 攻击时增量维护，不随 tick 重建
+    combat_queue: Optional[CooldownQueue] = field(
+        default_factory=lambda: None if SIMULATION_CONFIG["numpy_units"] else CooldownQueue(GAME_RULES["attack_cooldown"])
+    )
+
+    def new_entity_id(self) -> int:
+        """分配一个房间内唯一的实体 ID"""
+        entity_id = self.next_entity_id
+        self.next_entity_id += 1
+        return entity_id
+
 
 class LiveWarGameManager:
     """
@@ -192,30 +351,106 @@ class LiveWarGameManager:
     整合完整的游戏循环、AI、战斗、资源管理等系统
     """
 
-    def __init__(self) -> None:
+    def __init__(self, seed: Optional[int] = REPLAY_CONFIG["seed"], record: bool = bool(REPLAY_CONFIG["record_dir"])) -> None:
         # room_id -> RoomGameState
         self.room_states: Dict[int, RoomGameState] = {}
-        # room_id -> asyncio.Task (游戏循环任务)
-        self.game_tasks: Dict[int, Optional[asyncio.Task]] = {}
-        # 广播回调函数：room_id -> Callable[[game_pb2.GameMessage], Awaitable[None]]
-        self.broadcast_callbacks: Dict[int, Callable[[game_pb2.GameMessage], any]] = {}
-
-    def set_broadcast_callback(self, room_id: int, callback: Callable[[game_pb2.GameMessage], any]) -> None:
+        # 确定性模式：房间种子由 seed 和 room_id 推导，地图由房间随机数生成，对局时间从 0 开始
+        self.seed = seed
+        self._room_seeds = random.Random()
+        # 对局开始时间等墙上时间的来源（回放时由录像中的命令时间代替）
+        self.clock: Callable[[], float] = time.time if seed is None else (lambda: 0.0)
+        # 预先指定的房间种子（回放时使用）：room_id -> seed
+        self.room_seeds: Dict[int, int] = {}
+        # 对局录像：room_id -> MatchRecording（record 为 True 时每个新房间开始录制）
+        self.record = record
+        self.recordings: Dict[int, MatchRecording] = {}
+        # 回放时使用录像中的 AI 预算截断位置（room_id -> {tick 序号: 决策数}）代替 CPU 计时
+        self.replay_decision_cuts: Dict[int, Dict[int, int]] = {}
+        # 全局游戏循环：所有房间共用一个 asyncio.Task
+        self._scheduler_task: Optional[asyncio.Task] = None
+        # 正在运行的房间：room_id -> 所在子时隙
+        self.scheduled_rooms: Dict[int, int] = {}
+        # 从快照恢复、对局进行中但暂停的房间：有连接进入房间时（resume_room）才重新加入游戏循环
+        self.paused_rooms: Set[int] = set()
+        # 广播回调函数：room_id -> Callable[[game_pb2.GameMessage | StateFrame], Awaitable[None]]
+        self.broadcast_callbacks: Dict[int, Callable[[game_pb2.GameMessage | StateFrame], any]] = {}
+        # 全局递增的地图版本号（房间删除重建后也不会与旧版本冲突）
+        self._map_versions = itertools.count(1)
+        # 预生成地图池：重置 / 新房间直接取用，后台线程补充
+        self.map_pool = MapPool(MAP_CONFIG["pool_size"])
+        # room_id -> 增量编码器（记录上一次广播的实体，用于生成增量帧）
+        self.delta_encoders: Dict[int, StateDeltaEncoder] = {}
+        # room_id -> 房间内连接需要的状态编码（未设置时为 DEFAULT_ENCODINGS）
+        self.room_encodings: Dict[int, frozenset] = {}
+        # room_id -> 房间 tick 统计（tick 耗时、所在子时隙的超时次数）
+        self.tick_stats: Dict[int, TickStats] = {}
+        # 全局调度器统计：子时隙级别的超时 / 补帧 / 丢帧，以及每帧总 CPU
+        self.slot_stats = TickStats()
+        self.frame_stats = FrameStats()
+        # room_id -> 最近若干 tick 的分阶段耗时与计数
+        self.tick_profiles: Dict[int, RoomProfile] = {}
+        # 按需开启的采样剖析器（采样事件循环所在线程）
+        self.sampler = SamplingProfiler(PROFILER_CONFIG["sample_interval"])
+
+    def set_broadcast_callback(self, room_id: int, callback: Callable[[game_pb2.GameMessage | StateFrame], any]) -> None:
         """设置房间的广播回调函数（由 rooms.py 调用，可以是同步或异步）"""
         self.broadcast_callbacks[room_id] = callback
 
+    def warm_map_pool(self) -> None:
+        """在事件循环启动后调用：提前生成默认尺寸的地图，首个房间无需等待地图生成"""
+        self.map_pool.refill(MAP_CONFIG["width"], MAP_CONFIG["height"])
+
+    def set_room_encodings(self, room_id: int, encodings) -> None:
+        """设置房间内连接需要的状态编码（由 rooms.py 在连接能力变化时调用），广播时只构建这些编码"""
+        self.room_encodings[room_id] = frozenset(encodings)
+
     def _start_game_loop(self, room_id: int) -> None:
-        """启动房间的游戏循环（如果还没有启动）"""
-        if room_id in self.game_tasks and self.game_tasks[room_id] and not self.game_tasks[room_id].done():
-            return  # 已经在运行
+        """把房间加入全局游戏循环（如果还没有加入），必要时启动全局循环"""
+        if room_id not in self.scheduled_rooms:
+            # 分配到房间数最少的子时隙
+            load = [0] * SCHEDULER_CONFIG["sub_slots"]
+            for slot in self.scheduled_rooms.values():
+                load[slot] += 1
+            self.scheduled_rooms[room_id] = load.index(min(load))
+            self.tick_stats.setdefault(room_id, TickStats())
+
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self._scheduler_task = asyncio.create_task(self._game_loop())
 
-        async def game_loop():
-            try:
-                while room_id in self.room_states:
+    def _stop_game_loop(self, room_id: int) -> None:
+        """把房间移出全局游戏循环（没有房间时全局循环自行退出）"""
+        self.scheduled_rooms.pop(room_id, None)
+
+    async def _game_loop(self) -> None:
+        """
+        全局固定步长循环：一帧切分为 sub_slots 个子时隙，每个子时隙推进其中的房间。
+
+        子时隙超时按 SCHEDULER_CONFIG 的策略补帧或丢帧；丢帧时所有房间一起顺延，
+        不会只让某一个子时隙的房间少推进。
+        """
+        sub_slots = SCHEDULER_CONFIG["sub_slots"]
+        clock = FixedTimestepClock(
+            GAME_RULES["tick_interval"] / sub_slots,
+            self.slot_stats,
+            overrun_policy=SCHEDULER_CONFIG["overrun_policy"],
+            max_catch_up_ticks=SCHEDULER_CONFIG["max_catch_up_ticks"] * sub_slots,
+        )
+        slot = 0
+        frame_cpu = 0.0
+        try:
+            while self.scheduled_rooms:
+                started_at = clock.now()
+                ticked = []
+                for room_id, room_slot in list(self.scheduled_rooms.items()):
+                    if room_slot != slot:
+                        continue
                     state = self.room_states.get(room_id)
                     if not state or not state.players:
-                        break  # 房间已删除或没有玩家
+                        # 房间已删除或没有玩家：移出调度，有玩家重新开始游戏时再加入
+                        self._stop_game_loop(room_id)
+                        continue
 
+                    room_started_at = clock.now()
                     try:
                         await self._process_tick(room_id)
                     except Exception as e:
@@ -223,23 +458,352 @@ class LiveWarGameManager:
                         print(f"[GameLoop] Error in _process_tick for room {room_id}: {e}", flush=True)
                         import traceback
                         traceback.print_exc()
-                    
-                    await asyncio.sleep(GAME_RULES["tick_interval"])
-            except asyncio.CancelledError:
-                pass
+                    stats = self.tick_stats.setdefault(room_id, TickStats())
+                    stats.record(clock.now() - room_started_at)
+                    ticked.append(stats)
+
+                frame_cpu += clock.now() - started_at
+                slot = (slot + 1) % sub_slots
+                if slot == 0:
+                    self.frame_stats.record(frame_cpu, len(self.scheduled_rooms))
+                    frame_cpu = 0.0
+
+                overruns = self.slot_stats.overruns
+                delay = clock.finish_tick(started_at)
+                if self.slot_stats.overruns != overruns:
+                    # 本子时隙的房间没有在截止时间内处理完
+                    for stats in ticked:
+                        stats.overruns += 1
+                # 补帧时等待 0 秒，仍然让出事件循环处理网络消息
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # 记录严重错误
+            print(f"[GameLoop] Fatal error in global game loop: {e}", flush=True)
+            import traceback
+            traceback.print_exc()
+
+    def release_room(self, room_id: int) -> None:
+        """房间内已没有连接：停止游戏循环并清理该房间的全部游戏数据"""
+        self._stop_game_loop(room_id)
+        self.paused_rooms.discard(room_id)
+        self.room_states.pop(room_id, None)
+        self.broadcast_callbacks.pop(room_id, None)
+        self.delta_encoders.pop(room_id, None)
+        self.room_encodings.pop(room_id, None)
+        self.tick_stats.pop(room_id, None)
+        self.tick_profiles.pop(room_id, None)
+        recording = self.recordings.pop(room_id, None)
+        if recording is not None and REPLAY_CONFIG["record_dir"]:
+            try:
+                recording.save(REPLAY_CONFIG["record_dir"])
+            except OSError as e:
+                print(f"[Replay] Error saving recording for room {room_id}: {e}", flush=True)
+
+    def scheduler_stats(self) -> Dict[str, object]:
+        """全局调度统计（耗时单位：秒）：每帧总 CPU、子时隙超时情况以及各房间的 tick 耗时"""
+        return {
+            "frame": {**asdict(self.frame_stats), "avg_frame_cpu": self.frame_stats.avg_frame_cpu},
+            "slots": {**asdict(self.slot_stats), "avg_tick_duration": self.slot_stats.avg_tick_duration},
+            "rooms": {
+                room_id: {
+                    **asdict(stats),
+                    "avg_tick_duration": stats.avg_tick_duration,
+                    "slot": self.scheduled_rooms.get(room_id),
+                }
+                for room_id, stats in self.tick_stats.items()
+            },
+        }
+
+    def tick_metrics(self) -> Dict[str, object]:
+        """
+        性能指标：调度统计、各房间最近若干 tick 的分阶段耗时（毫秒）与计数、
+        局部 A* 缓存命中、地图池状态以及采样剖析器的结果
+        """
+        scheduler = self.scheduler_stats()
+        path_cache = self.path_cache_stats()
+        return {
+            "frame": scheduler["frame"],
+            "slots": scheduler["slots"],
+            "rooms": {
+                room_id: {
+                    **profile.snapshot(),
+                    "scheduler": scheduler["rooms"].get(room_id),
+                    "path_cache": path_cache.get(room_id),
+                }
+                for room_id, profile in self.tick_profiles.items()
+            },
+            "map_pool": self.map_pool.stats(),
+            "sampler": self.sampler.report(),
+        }
+
+    def set_sampling_profiler(self, enabled: bool, duration: float = 30.0) -> Dict[str, object]:
+        """开启（最长 max_sample_duration 秒）或停止采样剖析器；需要在事件循环所在线程调用"""
+        if enabled:
+            self.sampler.start(min(max(duration, 0.0), PROFILER_CONFIG["max_sample_duration"]))
+        else:
+            self.sampler.stop()
+        return self.sampler.report()
+
+    # ========== 快照（重启恢复） ==========
+
+    def checkpoint_rooms(self) -> Dict[int, bytes]:
+        """全部房间的快照数据（格式见 service.checkpoint）：room_id -> 分区数据"""
+        return {room_id: self._checkpoint_room(state) for room_id, state in self.room_states.items()}
+
+    def restore_rooms(self, sections: Dict[int, bytes]) -> List[int]:
+        """
+        从快照恢复房间（已存在的房间跳过），返回恢复的 room_id；需要在事件循环中调用。
+
+        派生数据（空间索引、占用网格、冷却队列等）按恢复的实体重建。对局进行中的房间恢复为暂停状态，
+        有连接重新进入房间（resume_room）时才继续，避免没有玩家在线时对局照常推进。
+        恢复的房间不继续录像（录像需要从房间创建开始的全部命令）。
+        """
+        restored = []
+        for room_id, data in sections.items():
+            if room_id in self.room_states:
+                continue
+            try:
+                state = self._restore_room(data)
             except Exception as e:
-                # 记录严重错误
-                print(f"[GameLoop] Fatal error in game loop for room {room_id}: {e}", flush=True)
-                import traceback
-                traceback.print_exc()
+                print(f"[Checkpoint] Error restoring room {room_id}: {e}", flush=True)
+                continue
+            self.room_states[room_id] = state
+            restored.append(room_id)
+            if state.game_started and state.players:
+                self.paused_rooms.add(room_id)
+        return restored
+
+    def resume_room(self, room_id: int) -> None:
+        """有连接进入房间：恢复后暂停的对局重新加入游戏循环（其他房间不受影响）"""
+        if room_id not in self.paused_rooms:
+            return
+        self.paused_rooms.discard(room_id)
+        state = self.room_states.get(room_id)
+        if state and state.game_started and state.players:
+            self._start_game_loop(room_id)
 
-        self.game_tasks[room_id] = asyncio.create_task(game_loop())
+    def _checkpoint_room(self, state: RoomGameState) -> bytes:
+        """
+        单个房间的快照：标量 / 玩家字典写入 JSON 元数据，实体按列写入定长数组。
 
-    def _stop_game_loop(self, room_id: int) -> None:
-        """停止房间的游戏循环"""
-        if room_id in self.game_tasks and self.game_tasks[room_id]:
-            self.game_tasks[room_id].cancel()
-            self.game_tasks[room_id] = None
+        一次性特效不保存；单位的 ai_goal 按 (类型, id) 保存，恢复后 AI 从中断处继续。
+        """
+        rng_version, rng_internal, rng_gauss = state.rng.getstate()
+        writer = BlockWriter()
+        writer.meta("room", {
+            "players": state.players,
+            "teams": state.teams,
+            "tick": state.tick,
+            "game_started": state.game_started,
+            "game_start_time": state.game_start_time,
+            "game_time": state.game_time,
+            "winner": state.winner,
+            "game_over_time": state.game_over_time,
+            "width": state.width,
+            "height": state.height,
+            "bases": [
+                None if base is None else [base.x, base.y, base.hp, base.hp_max]
+                for base in (state.red_base, state.blue_base)
+            ],
+            "map_seed": state.map_seed,
+            "seed": state.seed,
+            "rng": [rng_version, rng_gauss],
+            "next_entity_id": state.next_entity_id,
+            "energies": state.energies,
+            "selected_unit_type": state.selected_unit_type,
+            "last_mine_spawn_time": state.last_mine_spawn_time,
+            "player_logs": state.player_logs,
+            "player_main_miner_id": state.player_main_miner_id,
+            "player_miner_death_time": state.player_miner_death_time,
+        })
+        writer.column("rng_state", "q", rng_internal)
+        writer.raw("terrain", state.terrain)
+        writer.column("lakes", "i", itertools.chain.from_iterable(state.lakes))
+        writer.column("walls", "d", itertools.chain.from_iterable(state.walls))
+
+        nan = float("nan")
+        units = list(state.units)
+        goal_kinds = []
+        goal_ids = []
+        for unit in units:
+            goal = unit.ai_goal
+            if isinstance(goal, MineFieldState):
+                goal_kinds.append(2)
+                goal_ids.append(goal.id)
+            elif isinstance(goal, EnergyDrop):
+                goal_kinds.append(3)
+                goal_ids.append(goal.id)
+            else:
+                goal_kinds.append(0 if goal is None else 1)  # 1：己方基地
+                goal_ids.append(-1)
+        writer.column("unit_id", "q", (u.id for u in units))
+        writer.column("unit_type", "b", (TYPE_CODES[u.type] for u in units))
+        writer.column("unit_team", "b", (TEAM_CODES[u.team] for u in units))
+        writer.column("unit_owner", "q", (u.owner_id for u in units))
+        writer.column("unit_x", "d", (u.x for u in units))
+        writer.column("unit_y", "d", (u.y for u in units))
+        writer.column("unit_hp", "i", (u.hp for u in units))
+        writer.column("unit_hp_max", "i", (u.hp_max for u in units))
+        writer.column("unit_attack", "i", (u.attack for u in units))
+        writer.column("unit_speed", "d", (u.speed for u in units))
+        writer.column("unit_range", "d", (u.attack_range for u in units))
+        writer.column("unit_carrying", "i", (u.carrying_energy for u in units))
+        writer.column("unit_mining", "b", (u.is_mining for u in units))
+        writer.column("unit_target_x", "d", (nan if u.target_x is None else u.target_x for u in units))
+        writer.column("unit_target_y", "d", (nan if u.target_y is None else u.target_y for u in units))
+        writer.column("unit_target_id", "q", (-1 if u.target_id is None else u.target_id for u in units))
+        writer.column("unit_attack_at", "d", (u.last_attack_time for u in units))
+        writer.column("unit_last_pos", "d", itertools.chain.from_iterable(u.last_position for u in units))
+        writer.column("unit_stuck", "i", (u.stuck_counter for u in units))
+        writer.column("unit_failed", "d", itertools.chain.from_iterable(
+            (nan, nan) if u.failed_target is None else u.failed_target for u in units
+        ))
+        writer.column("unit_path_at", "d", (u.last_path_time for u in units))
+        writer.column("unit_decide_at", "q", (u.next_decision_tick for u in units))
+        writer.column("unit_goal_kind", "b", goal_kinds)
+        writer.column("unit_goal_id", "q", goal_ids)
+        writer.column("unit_waypoint", "d", itertools.chain.from_iterable(
+            (nan, nan) if u.waypoint is None else u.waypoint for u in units
+        ))
+        writer.column("unit_wp_type", "b", (TYPE_CODES.get(u.waypoint_as, -1) for u in units))
+        writer.column("unit_wp_speed", "d", (u.waypoint_speed for u in units))
+        writer.column("unit_velocity", "d", itertools.chain.from_iterable((u.vx, u.vy) for u in units))
+
+        mines = list(state.mine_fields)
+        writer.column("mine_id", "q", (m.id for m in mines))
+        writer.column("mine_pos", "d", itertools.chain.from_iterable((m.x, m.y) for m in mines))
+        writer.column("mine_energy", "i", itertools.chain.from_iterable((m.energy, m.energy_max) for m in mines))
+        writer.column("mine_time", "d", itertools.chain.from_iterable((m.created_time, m.lifetime) for m in mines))
+
+        drops = list(state.energy_drops)
+        writer.column("drop_id", "q", (d.id for d in drops))
+        writer.column("drop_pos", "d", itertools.chain.from_iterable((d.x, d.y) for d in drops))
+        writer.column("drop_energy", "i", (d.energy for d in drops))
+        writer.column("drop_time", "d", (d.drop_time for d in drops))
+        return writer.getvalue()
+
+    def _restore_room(self, data) -> RoomGameState:
+        """由 _checkpoint_room 的数据重建房间状态（含派生数据）"""
+        blocks = columns = read_blocks(data)
+        meta = blocks["room"]
+
+        def int_keys(mapping: dict) -> dict:
+            return {int(key): value for key, value in mapping.items()}
+
+        state = RoomGameState(
+            players=int_keys(meta["players"]),
+            teams=int_keys(meta["teams"]),
+            tick=meta["tick"],
+            game_started=meta["game_started"],
+            game_start_time=meta["game_start_time"],
+            game_time=meta["game_time"],
+            winner=meta["winner"],
+            game_over_time=meta["game_over_time"],
+            width=meta["width"],
+            height=meta["height"],
+            map_seed=meta["map_seed"],
+            seed=meta["seed"],
+            next_entity_id=meta["next_entity_id"],
+            energies=int_keys(meta["energies"]),
+            selected_unit_type=int_keys(meta["selected_unit_type"]),
+            last_mine_spawn_time=meta["last_mine_spawn_time"],
+            player_logs=int_keys(meta["player_logs"]),
+            player_main_miner_id=int_keys(meta["player_main_miner_id"]),
+            player_miner_death_time=int_keys(meta["player_miner_death_time"]),
+        )
+        red_base, blue_base = (None if base is None else BaseState(*base) for base in meta["bases"])
+        state.red_base = red_base
+        state.blue_base = blue_base
+        rng_version, rng_gauss = meta["rng"]
+        state.rng.setstate((rng_version, tuple(blocks["rng_state"]), rng_gauss))
+        state.terrain = bytearray(blocks["terrain"])
+        lakes = blocks["lakes"]
+        state.lakes = [(lakes[i], lakes[i + 1]) for i in range(0, len(lakes), 2)]
+        walls = blocks["walls"]
+        state.walls = [(walls[i], walls[i + 1]) for i in range(0, len(walls), 2)]
+
+        mine_pos, mine_energy, mine_time = blocks["mine_pos"], blocks["mine_energy"], blocks["mine_time"]
+        for row, mine_id in enumerate(blocks["mine_id"]):
+            state.mine_fields.add(MineFieldState(
+                id=mine_id,
+                x=mine_pos[2 * row],
+                y=mine_pos[2 * row + 1],
+                energy=mine_energy[2 * row],
+                energy_max=mine_energy[2 * row + 1],
+                created_time=mine_time[2 * row],
+                lifetime=mine_time[2 * row + 1],
+            ))
+
+        drop_pos = blocks["drop_pos"]
+        for row, drop_id in enumerate(blocks["drop_id"]):
+            state.energy_drops.add(EnergyDrop(
+                id=drop_id,
+                x=drop_pos[2 * row],
+                y=drop_pos[2 * row + 1],
+                energy=blocks["drop_energy"][row],
+                drop_time=blocks["drop_time"][row],
+            ))
+
+        # 障碍网格依赖矿场，先于单位重建；单位随后逐个加入空间索引 / 占用网格 / 冷却队列
+        self._rebuild_obstacles(state)
+        type_names = {code: name for name, code in TYPE_CODES.items()}
+        team_names = {code: name for name, code in TEAM_CODES.items()}
+        nan = float("nan")
+        for row, unit_id in enumerate(columns["unit_id"]):
+            team = team_names[columns["unit_team"][row]]
+            goal_kind = columns["unit_goal_kind"][row]
+            if goal_kind == 1:
+                goal = state.red_base if team == "red" else state.blue_base
+            elif goal_kind == 2:
+                goal_id = columns["unit_goal_id"][row]
+                # 目标已消失时用不在存储中的占位对象，矿工与保存前一样在下一次检查时换目标
+                goal = state.mine_fields.get(goal_id) or MineFieldState(goal_id, nan, nan, 0, 0)
+            elif goal_kind == 3:
+                goal_id = columns["unit_goal_id"][row]
+                goal = state.energy_drops.get(goal_id) or EnergyDrop(goal_id, nan, nan, 0, 0.0)
+            else:
+                goal = None
+            failed_x = optional(columns["unit_failed"][2 * row])
+            waypoint_x = optional(columns["unit_waypoint"][2 * row])
+            target_id = columns["unit_target_id"][row]
+            unit = UnitState(
+                id=unit_id,
+                type=type_names[columns["unit_type"][row]],
+                team=team,
+                owner_id=columns["unit_owner"][row],
+                x=columns["unit_x"][row],
+                y=columns["unit_y"][row],
+                hp=columns["unit_hp"][row],
+                hp_max=columns["unit_hp_max"][row],
+                attack=columns["unit_attack"][row],
+                speed=columns["unit_speed"][row],
+                attack_range=columns["unit_range"][row],
+                carrying_energy=columns["unit_carrying"][row],
+                target_x=optional(columns["unit_target_x"][row]),
+                target_y=optional(columns["unit_target_y"][row]),
+                target_id=None if target_id < 0 else target_id,
+                last_attack_time=columns["unit_attack_at"][row],
+                is_mining=bool(columns["unit_mining"][row]),
+                last_position=(columns["unit_last_pos"][2 * row], columns["unit_last_pos"][2 * row + 1]),
+                stuck_counter=columns["unit_stuck"][row],
+                failed_target=None if failed_x is None else (failed_x, columns["unit_failed"][2 * row + 1]),
+                last_path_time=columns["unit_path_at"][row],
+                next_decision_tick=columns["unit_decide_at"][row],
+                ai_goal=goal,
+                waypoint=None if waypoint_x is None else (waypoint_x, columns["unit_waypoint"][2 * row + 1]),
+                waypoint_as=type_names.get(columns["unit_wp_type"][row], ""),
+                waypoint_speed=columns["unit_wp_speed"][row],
+                vx=columns["unit_velocity"][2 * row],
+                vy=columns["unit_velocity"][2 * row + 1],
+            )
+            state.units.add(unit)
+            self._track_unit(state, unit)
+
+        # 地图版本号只在本进程内唯一：重新分配，重连的客户端会收到新的地图快照
+        state.map_version = next(self._map_versions)
+        return state
 
     # ========== 对外主入口 ==========
 
@@ -249,16 +813,24 @@ class LiveWarGameManager:
         user_id: Optional[int],
         username: str,
         msg: game_pb2.GameMessage,
-    ) -> list[game_pb2.GameMessage]:
+        now: Optional[float] = None,
+    ) -> list[game_pb2.GameMessage | StateFrame]:
         """
-        处理客户端发来的 GameMessage，返回需要广播给整个房间的 GameMessage 列表。
+        处理客户端发来的 GameMessage，返回需要广播给整个房间的消息列表。
 
         注意：
         - user_id 可能为 None（未登录匿名观战），这类用户只能观战，不能 join_game。
+        - 状态广播以 StateFrame 形式返回，由房间服务按连接取出对应视角的字节。
+        - now 为命令到达时间（默认取 self.clock()），只用于对局开始时间；回放时传入录像中的时间。
         """
         state = self._ensure_room(room_id)
+        if now is None:
+            now = self.clock()
+        recording = self.recordings.get(room_id)
+        if recording is not None:
+            recording.record_command(now, user_id, username, msg.SerializeToString())
 
-        outgoing: list[game_pb2.GameMessage] = []
+        outgoing: list[game_pb2.GameMessage | StateFrame] = []
 
         if msg.type == game_pb2.GameMessage.JOIN_GAME:
             if user_id is None:
@@ -292,10 +864,9 @@ class LiveWarGameManager:
             )
             outgoing.append(join_evt)
 
-            # 检查游戏是否刚结束（10秒内），如果是则禁止开始新游戏
-            current_time = time.time()
+            # 检查游戏是否刚结束（10秒内），如果是则禁止开始新游戏（按模拟时钟计时）
             if state.winner and state.game_over_time > 0:
-                time_since_game_over = current_time - state.game_over_time
+                time_since_game_over = state.game_start_time + state.game_time - state.game_over_time
                 if time_since_game_over < 10:
                     err = game_pb2.GameMessage(
                         type=game_pb2.GameMessage.ERROR,
@@ -315,24 +886,18 @@ class LiveWarGameManager:
             # 只有当红蓝双方都有至少一名玩家时，才自动开始游戏
             if not state.game_started and has_red_player and has_blue_player:
                 state.game_started = True
-                state.game_start_time = time.time()
-                state.last_mine_spawn_time = time.time()
+                state.game_start_time = now
+                state.last_mine_spawn_time = now
                 # 确保游戏开始时生成初始矿场（如果还没有）
                 if not state.mine_fields:
-                    self._spawn_initial_mine_fields(room_id)
+                    self._spawn_initial_mine_fields(room_id, now)
                 started_msg = game_pb2.GameMessage(type=game_pb2.GameMessage.GAME_STARTED)
                 outgoing.append(started_msg)
                 # 启动游戏循环
                 self._start_game_loop(room_id)
 
             # 广播一次完整状态
-            state.tick += 1
-            outgoing.append(
-                game_pb2.GameMessage(
-                    type=game_pb2.GameMessage.GAME_STATE,
-                    game_state=self._build_state_for_room(room_id),
-                )
-            )
+            outgoing.append(self.build_state_frame(room_id))
 
         elif msg.type == game_pb2.GameMessage.LEAVE_GAME:
             if user_id is None:
@@ -355,9 +920,11 @@ class LiveWarGameManager:
                 state.selected_unit_type.pop(user_id, None)
                 # 移除玩家的主矿工（如果存在）
                 if user_id in state.player_main_miner_id:
-                    miner_id = state.player_main_miner_id.pop(user_id)
+                    miner = state.units.get(state.player_main_miner_id.pop(user_id))
                     # 从单位列表中移除该矿工
-                    state.units = [u for u in state.units if u.id != miner_id]
+                    if miner is not None:
+                        self._untrack_unit(state, miner)
+                        state.units.remove(miner)
                 if user_id in state.player_miner_death_time:
                     state.player_miner_death_time.pop(user_id)
                 
@@ -371,13 +938,7 @@ class LiveWarGameManager:
                 )
                 outgoing.append(leave_evt)
 
-                state.tick += 1
-                outgoing.append(
-                    game_pb2.GameMessage(
-                        type=game_pb2.GameMessage.GAME_STATE,
-                        game_state=self._build_state_for_room(room_id),
-                    )
-                )
+                outgoing.append(self.build_state_frame(room_id))
 
         elif msg.type == game_pb2.GameMessage.SELECT_UNIT:
             if user_id is None or user_id not in state.players:
@@ -385,13 +946,7 @@ class LiveWarGameManager:
             unit_type = msg.select_unit.unit_type or "miner"
             state.selected_unit_type[user_id] = unit_type
             # 仅广播新的状态（前端可以用 player.selected_unit_type）
-            state.tick += 1
-            outgoing.append(
-                game_pb2.GameMessage(
-                    type=game_pb2.GameMessage.GAME_STATE,
-                    game_state=self._build_state_for_room(room_id),
-                )
-            )
+            outgoing.append(self.build_state_frame(room_id))
 
         elif msg.type == game_pb2.GameMessage.SPAWN_UNIT:
             if user_id is None or user_id not in state.players:
@@ -419,13 +974,7 @@ class LiveWarGameManager:
             self._spawn_basic_unit_for_player(room_id, user_id, state.teams.get(user_id, "red"), unit_type)
             # 注意：不再在生成时立即采集，让矿工在游戏循环中自动采集
 
-            state.tick += 1
-            outgoing.append(
-                game_pb2.GameMessage(
-                    type=game_pb2.GameMessage.GAME_STATE,
-                    game_state=self._build_state_for_room(room_id),
-                )
-            )
+            outgoing.append(self.build_state_frame(room_id))
 
         # 其他 SELECT_TEAM / SELECT_UNIT / SPAWN_UNIT 等逻辑，后续可从 live_war 中迁移
 
@@ -438,129 +987,64 @@ class LiveWarGameManager:
         if room_id not in self.room_states:
             state = RoomGameState()
             # 简单地图：宽60高60，红方在左下角，蓝方在右上角
-            state.width = 60
-            state.height = 60
-            state.red_base = BaseState(x=8, y=state.height - 8, hp=1000, hp_max=1000)  # 左下角
-            state.blue_base = BaseState(x=state.width - 8, y=8, hp=1000, hp_max=1000)  # 右上角
-            # 生成随机地图（包含湖泊）
-            self._generate_map(room_id)
-            # 初始矿场会在 _spawn_initial_mine_fields 中生成，这里不生成
-            state.last_mine_spawn_time = time.time()
+            state.width = MAP_CONFIG["width"]
+            state.height = MAP_CONFIG["height"]
+            (red_x, red_y), (blue_x, blue_y) = default_bases(state.width, state.height)
+            state.red_base = BaseState(x=red_x, y=red_y, hp=1000, hp_max=1000)  # 左下角
+            state.blue_base = BaseState(x=blue_x, y=blue_y, hp=1000, hp_max=1000)  # 右上角
+            # 初始矿场会在 _spawn_initial_mine_fields 中生成，这里不生成（矿场计时在游戏开始时设置）
+            seed = self.room_seeds.pop(room_id, None)
+            if seed is None:
+                seed = self._new_room_seed(room_id)
+            state.seed = seed
+            state.rng = random.Random(seed)
             self.room_states[room_id] = state
+            if self.record:
+                self.recordings[room_id] = MatchRecording(
+                    room_id=room_id,
+                    seed=seed,
+                    base_seed=self.seed,
+                    tick_rate=settings.live_war.tick_rate,
+                    numpy_units=SIMULATION_CONFIG["numpy_units"],
+                )
+            # 生成随机地图（包含湖泊），需要在房间状态注册之后调用
+            self._generate_map(room_id)
         return self.room_states[room_id]
 
+    def _new_room_seed(self, room_id: int) -> int:
+        """新房间的随机数种子：确定性模式下由全局种子和 room_id 推导，否则随机"""
+        if self.seed is None:
+            return self._room_seeds.getrandbits(32)
+        return random.Random(f"{self.seed}:{room_id}").getrandbits(32)
+
     def _generate_map(self, room_id: int) -> None:
-        """随机生成地图，包含地形（草地/泥土）和湖泊（单位不能进入）"""
+        """
+        更换地图：取一张地形（草地/泥土）+ 湖泊（单位不能进入）的地图。
+
+        正常模式从预生成地图池取；确定性模式下第一张地图的种子取自房间随机数，之后每张由上一张的种子推导，
+        取走当前地图时就在后台生成下一张，重置游戏时不需要在事件循环里生成。
+        """
         state = self.room_states.get(room_id)
         if not state:
             return
-        
-        state.lakes.clear()
-        state.terrain.clear()
-        
-        # 1. 生成地形（草地和泥土）
-        # 初始化所有格子为随机值
-        terrain = {}
-        for x in range(state.width):
-            for y in range(state.height):
-                terrain[(x, y)] = 0 if random.random() < 0.5 else 1  # 0=草地, 1=泥土
-        
-        # 使用简单的平滑算法生成大块区域
-        # 多次迭代，让相邻格子更可能相同
-        for iteration in range(3):
-            new_terrain = {}
-            for x in range(state.width):
-                for y in range(state.height):
-                    # 统计周围8个格子的类型
-                    grass_count = 0
-                    dirt_count = 0
-                    
-                    for dx in range(-1, 2):
-                        for dy in range(-1, 2):
-                            nx, ny = x + dx, y + dy
-                            if 0 <= nx < state.width and 0 <= ny < state.height:
-                                if terrain.get((nx, ny), 0) == 0:
-                                    grass_count += 1
-                                else:
-                                    dirt_count += 1
-                    
-                    # 如果周围同类型格子多，则保持或改变为该类型
-                    if grass_count > dirt_count:
-                        new_terrain[(x, y)] = 0
-                    elif dirt_count > grass_count:
-                        new_terrain[(x, y)] = 1
-                    else:
-                        new_terrain[(x, y)] = terrain.get((x, y), 0)
-            
-            terrain = new_terrain
-        
-        state.terrain = terrain
-        
-        # 2. 生成3-5个湖泊，每个湖泊由多个格子组成
-        num_lakes = random.randint(3, 5)
-        
-        for _ in range(num_lakes):
-            # 随机选择湖泊中心位置（避免在基地附近）
-            attempts = 0
-            while attempts < 50:
-                center_x = random.randint(10, state.width - 10)
-                center_y = random.randint(10, state.height - 10)
-                
-                # 确保不在基地附近（至少距离基地8格）
-                too_close_to_base = False
-                if state.red_base:
-                    dist_to_red = self._distance(center_x, center_y, state.red_base.x, state.red_base.y)
-                    if dist_to_red < 8:
-                        too_close_to_base = True
-                if state.blue_base:
-                    dist_to_blue = self._distance(center_x, center_y, state.blue_base.x, state.blue_base.y)
-                    if dist_to_blue < 8:
-                        too_close_to_base = True
-                
-                if too_close_to_base:
-                    attempts += 1
-                    continue
-                
-                # 生成湖泊（不规则形状，3-6格大小）
-                lake_size = random.randint(3, 6)
-                lake_cells = []
-                
-                # 使用简单的洪水填充算法生成不规则湖泊
-                visited = set()
-                queue = [(center_x, center_y)]
-                
-                while queue and len(lake_cells) < lake_size:
-                    x, y = queue.pop(0)
-                    if (x, y) in visited:
-                        continue
-                    if x < 0 or x >= state.width or y < 0 or y >= state.height:
-                        continue
-                    
-                    # 确保不在基地上
-                    if state.red_base and int(state.red_base.x) == x and int(state.red_base.y) == y:
-                        continue
-                    if state.blue_base and int(state.blue_base.x) == x and int(state.blue_base.y) == y:
-                        continue
-                    
-                    visited.add((x, y))
-                    lake_cells.append((x, y))
-                    
-                    # 随机添加相邻格子（70%概率）
-                    neighbors = [
-                        (x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1),
-                        (x + 1, y + 1), (x - 1, y - 1), (x + 1, y - 1), (x - 1, y + 1)
-                    ]
-                    random.shuffle(neighbors)
-                    for nx, ny in neighbors[:random.randint(2, 4)]:
-                        if (nx, ny) not in visited and random.random() < 0.7:
-                            queue.append((nx, ny))
-                
-                # 添加到湖泊列表
-                if lake_cells:  # 确保生成了至少一个格子
-                    state.lakes.extend(lake_cells)
-                    break  # 成功生成湖泊，跳出 while 循环
-            
-            attempts += 1
+
+        if self.seed is None:
+            map_data = self.map_pool.take(state.width, state.height)
+        else:
+            seed = next_map_seed(state.map_seed) if state.map_version else state.rng.getrandbits(32)
+            map_data = self.map_pool.take(state.width, state.height, seed)
+            self.map_pool.prefetch(state.width, state.height, next_map_seed(map_data.seed))
+        state.map_seed = map_data.seed
+        recording = self.recordings.get(room_id)
+        if recording is not None:
+            recording.map_seeds.append(map_data.seed)
+        state.terrain = map_data.terrain
+        state.lakes = list(map_data.lakes)
+
+        # 地图已变化：重建障碍网格，更新版本号并推送新的地图快照
+        self._rebuild_obstacles(state)
+        state.map_version = next(self._map_versions)
+        self._broadcast_map_snapshot(room_id)
 
     def _spawn_basic_unit_for_player(self, room_id: int, user_id: int, team: str, unit_type: str = "miner") -> None:
         """为玩家生成一个单位，靠近己方基地"""
@@ -571,10 +1055,10 @@ class LiveWarGameManager:
 
         # 使用配置获取单位属性
         unit_config = UNIT_TYPES.get(unit_type, UNIT_TYPES["miner"])
-        unit_id = str(uuid.uuid4())[:8]
+        unit_id = state.new_entity_id()
 
         # 在基地附近随机一点
-        offset_y = random.uniform(-2, 2)
+        offset_y = state.rng.uniform(-2, 2)
         spawn_x = base.x + (2 if team == "red" else -2)
         spawn_y = base.y + offset_y
 
@@ -594,7 +1078,8 @@ class LiveWarGameManager:
             target_y=spawn_y,
             last_position=(spawn_x, spawn_y),  # 初始化位置记录
         )
-        state.units.append(unit)
+        state.units.add(unit)
+        self._track_unit(state, unit)
         
         # 如果这是玩家的主矿工（初始单位），记录其ID
         if unit_type == "miner":
@@ -612,7 +1097,7 @@ class LiveWarGameManager:
         best: MineFieldState | None = None
         best_dist = 1e9
         # 取玩家最近单位位置作为参考
-        units = [u for u in state.units if u.owner_id == user_id and not u.is_dead]
+        units = [u for u in state.units.view("owner", user_id) if not u.is_dead]
         if not units:
             return
         ux, uy = units[-1].x, units[-1].y
@@ -630,9 +1115,15 @@ class LiveWarGameManager:
         best.energy -= harvest
         state.energies[user_id] = state.energies.get(user_id, 0) + harvest
 
-    def _build_state_for_room(self, room_id: int) -> game_pb2.GameStatePayload:
+    def _build_state_for_room(
+        self, room_id: int, include_entities: bool = True, include_effects: bool = True
+    ) -> game_pb2.GameStatePayload:
         """
         当前简化版：构造玩家列表 + 基础地图（宽高/基地/单位）+ 阵营人数。
+
+        Args:
+            include_entities: 是否在 room 中填充单位 / 矿场 / 能量掉落（build_state_frame 按编码另行填充）
+            include_effects: 是否在 room 中填充尚未下发的治疗 / 子弹特效
         """
         state = self._ensure_room(room_id)
 
@@ -648,8 +1139,8 @@ class LiveWarGameManager:
             )
 
         # 阵营统计：按单位数量
-        red_count = sum(1 for u in state.units if u.team == "red" and not u.is_dead)
-        blue_count = sum(1 for u in state.units if u.team == "blue" and not u.is_dead)
+        red_count = sum(1 for u in state.units.view("team", "red") if not u.is_dead)
+        blue_count = sum(1 for u in state.units.view("team", "blue") if not u.is_dead)
 
         team_stats = game_pb2.TeamStatsMap(
             red=game_pb2.TeamStats(units=red_count),
@@ -678,55 +1169,23 @@ class LiveWarGameManager:
             room_msg.blue_base.hp = int(state.blue_base.hp)  # 确保是整数
             room_msg.blue_base.hp_max = int(state.blue_base.hp_max)  # 确保是整数
 
-        # 矿场
-        for m in state.mine_fields:
-            mine_msg = room_msg.mine_fields.add()
-            mine_msg.id = m.id
-            mine_msg.x = m.x
-            mine_msg.y = m.y
-            mine_msg.energy = int(m.energy)  # 确保是整数
-            mine_msg.energy_max = int(m.energy_max)  # 确保是整数
+        if include_entities:
+            self._add_room_entities(room_msg, state.units, state.mine_fields, state.energy_drops)
 
-        # 单位
-        for u in state.units:
-            unit_msg = room_msg.units.add()
-            unit_msg.id = u.id
-            unit_msg.type = u.type
-            unit_msg.team = u.team
-            unit_msg.owner_id = str(u.owner_id)
-            unit_msg.x = u.x
-            unit_msg.y = u.y
-            unit_msg.hp = int(u.hp)  # 确保是整数
-            unit_msg.hp_max = int(u.hp_max)  # 确保是整数
-            unit_msg.attack = u.attack
-            unit_msg.speed = u.speed
-            unit_msg.is_dead = u.is_dead
-            unit_msg.carrying_energy = u.carrying_energy
-            unit_msg.target_x = u.target_x or 0.0
-            unit_msg.target_y = u.target_y or 0.0
-
-        # 能量掉落
-        for drop in state.energy_drops:
-            drop_msg = room_msg.energy_drops.add()
-            drop_msg.id = drop.id
-            drop_msg.x = drop.x
-            drop_msg.y = drop.y
-            drop_msg.energy = drop.energy
-
-        # 治疗特效
-        for heal in state.heal_effects:
+        # 治疗事件（自上次广播以来新产生的）
+        for heal in state.heal_effects if include_effects else ():
             heal_msg = room_msg.heal_effects.add()
-            heal_msg.id = heal.id
+            heal_msg.id = str(heal.id)
             heal_msg.x = heal.x
             heal_msg.y = heal.y
             heal_msg.created_time = heal.created_time
             heal_msg.lifetime = heal.lifetime
             heal_msg.team = heal.team
 
-        # 子弹特效
-        for bullet in state.bullet_effects:
+        # 子弹事件（自上次广播以来新产生的）
+        for bullet in state.bullet_effects if include_effects else ():
             bullet_msg = room_msg.bullet_effects.add()
-            bullet_msg.id = bullet.id
+            bullet_msg.id = str(bullet.id)
             bullet_msg.from_x = bullet.from_x
             bullet_msg.from_y = bullet.from_y
             bullet_msg.to_x = bullet.to_x
@@ -735,23 +1194,7 @@ class LiveWarGameManager:
             bullet_msg.lifetime = bullet.lifetime
             bullet_msg.team = bullet.team
 
-        # 湖泊
-        for lake in state.lakes:
-            lake_msg = room_msg.lakes.add()
-            lake_x, lake_y = lake
-            lake_msg.x = float(lake_x)
-            lake_msg.y = float(lake_y)
-
-        # 地形数据（草地/泥土）
-        # 如果地形数据为空，先生成地图
-        if len(state.terrain) == 0:
-            self._generate_map(room_id)
-        
-        for (x, y), terrain_type in state.terrain.items():
-            terrain_msg = room_msg.terrain.add()
-            terrain_msg.x = int(x)
-            terrain_msg.y = int(y)
-            terrain_msg.type = int(terrain_type)  # 0=草地, 1=泥土
+        # 湖泊 / 地形 / 墙壁属于静态地图，通过 build_map_snapshot 单独下发，这里只带版本号
 
         # 构造日志（取所有玩家的最新日志）
         all_logs = []
@@ -769,9 +1212,210 @@ class LiveWarGameManager:
             logs=all_logs,
             team_stats=team_stats,
             players=player_summaries,
+            map_version=state.map_version,
+            tick_interval=GAME_RULES["tick_interval"],
+            broadcast_every=SCHEDULER_CONFIG["broadcast_every"],
         )
         return payload
 
+    def _add_room_entities(
+        self,
+        room_msg: game_pb2.Room,
+        units: Iterable[UnitState],
+        mine_fields: Iterable[MineFieldState],
+        energy_drops: Iterable[EnergyDrop],
+    ) -> None:
+        """按旧版格式填充房间实体（单位 / 矿场 / 能量掉落）"""
+        # 矿场
+        for m in mine_fields:
+            mine_msg = room_msg.mine_fields.add()
+            mine_msg.id = str(m.id)
+            mine_msg.x = m.x
+            mine_msg.y = m.y
+            mine_msg.energy = int(m.energy)  # 确保是整数
+            mine_msg.energy_max = int(m.energy_max)  # 确保是整数
+
+        # 单位（owner_id 在同一房间内只有少数几种取值，字符串按玩家缓存）
+        owner_ids: Dict[int, str] = {}
+        for u in units:
+            unit_msg = room_msg.units.add()
+            unit_msg.id = str(u.id)
+            unit_msg.type = u.type
+            unit_msg.team = u.team
+            owner_id = owner_ids.get(u.owner_id)
+            if owner_id is None:
+                owner_id = owner_ids[u.owner_id] = str(u.owner_id)
+            unit_msg.owner_id = owner_id
+            unit_msg.x = u.x
+            unit_msg.y = u.y
+            unit_msg.hp = int(u.hp)  # 确保是整数
+            unit_msg.hp_max = int(u.hp_max)  # 确保是整数
+            unit_msg.attack = u.attack
+            unit_msg.speed = u.speed
+            unit_msg.is_dead = u.is_dead
+            unit_msg.carrying_energy = u.carrying_energy
+            unit_msg.target_x = u.target_x or 0.0
+            unit_msg.target_y = u.target_y or 0.0
+            unit_msg.vx = u.vx
+            unit_msg.vy = u.vy
+            waypoint_x, waypoint_y = u.waypoint or (u.x, u.y)
+            unit_msg.waypoint_x = waypoint_x
+            unit_msg.waypoint_y = waypoint_y
+
+        # 能量掉落
+        for drop in energy_drops:
+            drop_msg = room_msg.energy_drops.add()
+            drop_msg.id = str(drop.id)
+            drop_msg.x = drop.x
+            drop_msg.y = drop.y
+            drop_msg.energy = drop.energy
+
+    def _add_packed_entities(
+        self,
+        packed: game_pb2.PackedEntities,
+        units: Collection[UnitState],
+        mines: Collection[MineFieldState],
+        drops: Collection[EnergyDrop],
+    ) -> None:
+        """按列填充紧凑编码的实体：整数 id、枚举类型 / 阵营、定点坐标"""
+        scale = PACKED_CONFIG["position_scale"]
+        packed.position_scale = scale
+
+        columns = packed.units
+        columns.ids.extend([u.id for u in units])
+        columns.types.extend([TYPE_CODES[u.type] for u in units])
+        columns.teams.extend([TEAM_CODES[u.team] for u in units])
+        columns.owner_ids.extend([u.owner_id for u in units])
+        columns.x.extend([round(u.x * scale) for u in units])
+        columns.y.extend([round(u.y * scale) for u in units])
+        columns.hp.extend([int(u.hp) for u in units])
+        columns.hp_max.extend([int(u.hp_max) for u in units])
+        columns.is_dead.extend([u.is_dead for u in units])
+        columns.carrying_energy.extend([u.carrying_energy for u in units])
+        columns.target_x.extend([round((u.target_x or 0.0) * scale) for u in units])
+        columns.target_y.extend([round((u.target_y or 0.0) * scale) for u in units])
+        columns.vx.extend([round(u.vx * scale) for u in units])
+        columns.vy.extend([round(u.vy * scale) for u in units])
+        waypoints = [u.waypoint or (u.x, u.y) for u in units]
+        columns.waypoint_x.extend([round(x * scale) for x, _ in waypoints])
+        columns.waypoint_y.extend([round(y * scale) for _, y in waypoints])
+
+        columns = packed.mine_fields
+        columns.ids.extend([m.id for m in mines])
+        columns.x.extend([round(m.x * scale) for m in mines])
+        columns.y.extend([round(m.y * scale) for m in mines])
+        columns.energy.extend([int(m.energy) for m in mines])
+        columns.energy_max.extend([int(m.energy_max) for m in mines])
+
+        columns = packed.energy_drops
+        columns.ids.extend([d.id for d in drops])
+        columns.x.extend([round(d.x * scale) for d in drops])
+        columns.y.extend([round(d.y * scale) for d in drops])
+        columns.energy.extend([d.energy for d in drops])
+
+    def _build_aoi_frame(
+        self, state: RoomGameState, payload: game_pb2.GameStatePayload, room_cells: bool, packed_cells: bool
+    ) -> AoiFrame:
+        """
+        按空间索引的桶把单位 / 矿场 / 能量掉落分组并逐桶序列化，供各视野拼接。
+
+        payload 此时尚未填充实体；返回前恢复原样。
+        """
+        index = state.unit_index
+        groups: Dict[tuple[int, int], tuple[list, list, list]] = {}
+        for cell, units in index.cells():
+            groups[cell] = (list(units), [], [])
+        for mine in state.mine_fields:
+            groups.setdefault(index.cell_of(mine.x, mine.y), ([], [], []))[1].append(mine)
+        for drop in state.energy_drops:
+            groups.setdefault(index.cell_of(drop.x, drop.y), ([], [], []))[2].append(drop)
+
+        # 公共部分：不含 room 的 payload（附带小地图）+ 不含实体的 room
+        room_common = payload.room.SerializeToString()
+        payload.ClearField("room")
+        self._add_minimap(state, payload.minimap)
+        payload_common = payload.SerializeToString()
+        payload.ClearField("minimap")
+        payload.room.MergeFromString(room_common)
+
+        room_bytes = None
+        if room_cells:
+            room_bytes = {}
+            for cell, (units, mines, drops) in groups.items():
+                room_msg = game_pb2.Room()
+                self._add_room_entities(room_msg, units, mines, drops)
+                room_bytes[cell] = room_msg.SerializeToString()
+
+        packed_bytes = None
+        if packed_cells:
+            packed_bytes = {}
+            for cell, (units, mines, drops) in groups.items():
+                packed = game_pb2.PackedEntities()
+                self._add_packed_entities(packed, units, mines, drops)
+                packed_bytes[cell] = (
+                    packed.units.SerializeToString(),
+                    packed.mine_fields.SerializeToString(),
+                    packed.energy_drops.SerializeToString(),
+                )
+
+        return AoiFrame(
+            index.cell_size,
+            AOI_CONFIG["margin"],
+            payload_common,
+            room_common,
+            room_bytes,
+            PACKED_CONFIG["position_scale"],
+            packed_bytes,
+        )
+
+    def _add_minimap(self, state: RoomGameState, minimap: game_pb2.MinimapSummary) -> None:
+        """全图单位分布概览：每个小地图格子内双方的单位数"""
+        size = AOI_CONFIG["minimap_cell_size"]
+        columns = -(-state.width // size)
+        rows = -(-state.height // size)
+        counts = {"red": bytearray(columns * rows), "blue": bytearray(columns * rows)}
+        for u in state.units.views("team", counts):
+            grid = counts[u.team]
+            cx = min(columns - 1, max(0, int(u.x) // size))
+            cy = min(rows - 1, max(0, int(u.y) // size))
+            idx = cy * columns + cx
+            if grid[idx] < 255:
+                grid[idx] += 1
+        minimap.cell_size = size
+        minimap.columns = columns
+        minimap.rows = rows
+        minimap.red_units = bytes(counts["red"])
+        minimap.blue_units = bytes(counts["blue"])
+
+    def build_map_snapshot(self, room_id: int) -> Optional[game_pb2.MapSnapshotPayload]:
+        """构造静态地图快照（地形/湖泊/墙壁），只在加入房间和地图重新生成时发送"""
+        state = self.room_states.get(room_id)
+        if not state:
+            return None
+
+        snapshot = game_pb2.MapSnapshotPayload(
+            map_version=state.map_version,
+            width=state.width,
+            height=state.height,
+        )
+
+        # 墙壁
+        for wall_x, wall_y in state.walls:
+            wall_msg = snapshot.walls.add()
+            wall_msg.x = float(wall_x)
+            wall_msg.y = float(wall_y)
+
+        # 湖泊
+        for lake_x, lake_y in state.lakes:
+            lake_msg = snapshot.lakes.add()
+            lake_msg.x = float(lake_x)
+            lake_msg.y = float(lake_y)
+
+        # 地形数据（草地/泥土）：整张网格按位打包为一个 bytes 字段
+        snapshot.terrain_bits = pack_bits(state.terrain)
+
+        return snapshot
+
     def build_state_for_user(
         self,
         room_id: int,
@@ -793,20 +1437,79 @@ class LiveWarGameManager:
             return base
 
         # 玩家视角
-        name = self.room_states[room_id].players[user_id]
-        team = self.room_states[room_id].teams.get(user_id, "")
-        energy = self.room_states[room_id].energies.get(user_id, 0)
-        selected_type = self.room_states[room_id].selected_unit_type.get(user_id, "miner")
-        base.player.CopyFrom(
-            game_pb2.Player(
-                id=str(user_id),
-                name=name,
-                team=team,
-                selected_unit_type=selected_type,
-                energy=energy,
+        base.player.CopyFrom(self._build_player(self.room_states[room_id], user_id))
+        return base
+
+    def build_state_frame(self, room_id: int, for_broadcast: bool = True) -> Optional[StateFrame]:
+        """
+        构建共享状态帧：房间公共部分只构建、序列化一次，
+        每个玩家只额外拼接自己的 Player 字段，观战者共享同一份字节。
+
+        Args:
+            for_broadcast: 是否发给整个房间。只有广播帧会推进增量基线并附带增量 / 紧凑 / 视野裁剪版本，
+                且只构建房间内连接需要的编码；单独发给新连接的帧（send_initial_state）总是完整状态。
+        """
+        state = self.room_states.get(room_id)
+        if not state:
+            return None
+        encodings = self.room_encodings.get(room_id, DEFAULT_ENCODINGS) if for_broadcast else {ENCODING_FULL}
+        # 一次性特效只放入广播帧并随之清空；单独发给新连接的帧不带特效（之后的广播帧也会发给它）
+        payload = self._build_state_for_room(room_id, include_entities=False, include_effects=for_broadcast)
+        players = {uid: self._build_player(state, uid) for uid in state.players}
+        seq = 0
+        if for_broadcast:
+            state.frame_seq += 1
+            seq = payload.frame_seq = state.frame_seq
+            state.heal_effects.clear()
+            state.bullet_effects.clear()
+
+        aoi = None
+        if ENCODING_AOI in encodings or ENCODING_AOI_PACKED in encodings:
+            aoi = self._build_aoi_frame(
+                state, payload, ENCODING_AOI in encodings, ENCODING_AOI_PACKED in encodings
             )
+
+        packed_body = None
+        if ENCODING_PACKED in encodings:
+            self._add_packed_entities(payload.packed, state.units, state.mine_fields, state.energy_drops)
+            packed_body = payload.SerializeToString()
+            payload.ClearField("packed")
+
+        body = None
+        delta_body = None
+        base_seq = None
+        if ENCODING_FULL in encodings or ENCODING_DELTA in encodings:
+            self._add_room_entities(payload.room, state.units, state.mine_fields, state.energy_drops)
+            body = payload.SerializeToString()
+        if for_broadcast:
+            encoder = self.delta_encoders.get(room_id)
+            if body is None or ENCODING_DELTA not in encodings:
+                # 没有连接需要增量：不维护基线，下一次需要时从关键帧重新开始
+                if encoder:
+                    encoder.reset()
+            else:
+                if encoder is None:
+                    encoder = StateDeltaEncoder(DELTA_CONFIG["keyframe_interval"])
+                    self.delta_encoders[room_id] = encoder
+                encoded = encoder.encode(seq, payload.room)
+                if encoded is not None:
+                    base_seq, room_delta = encoded
+                    payload.ClearField("room")
+                    payload.base_frame_seq = base_seq
+                    payload.delta.CopyFrom(room_delta)
+                    delta_body = payload.SerializeToString()
+
+        return StateFrame(room_id, state.tick, body, players, delta_body, packed_body, aoi, seq, base_seq)
+
+    def _build_player(self, state: RoomGameState, user_id: int) -> game_pb2.Player:
+        """构建玩家私有的 Player 信息（能量等仅对本人可见）"""
+        return game_pb2.Player(
+            id=str(user_id),
+            name=state.players[user_id],
+            team=state.teams.get(user_id, ""),
+            selected_unit_type=state.selected_unit_type.get(user_id, "miner"),
+            energy=state.energies.get(user_id, 0),
         )
-        return base
 
     def has_active_players(self, room_id: int) -> bool:
         state = self.room_states.get(room_id)
@@ -820,38 +1523,77 @@ class LiveWarGameManager:
         if not state or not state.game_started:
             return
 
-        # 游戏已结束，检查是否需要重置（10秒后重置）
+        recording = self.recordings.get(room_id)
+        if recording is not None:
+            recording.steps += 1
+
+        state.tick += 1
+        # 模拟时钟按 tick 数推进：补帧时各 tick 的时间仍然间隔 tick_interval，不随处理耗时漂移；
+        # 所有游戏逻辑只使用这里推导出的 current_time，不读取墙上时间
+        state.game_time = state.tick * GAME_RULES["tick_interval"]
+        current_time = state.game_start_time + state.game_time
+
+        # 游戏已结束：模拟时钟继续走，10秒后重置
         if state.winner:
-            current_time = time.time()
             if state.game_over_time > 0 and current_time - state.game_over_time >= 10:
                 self._reset_game(room_id)
             return
 
-        state.tick += 1
-        state.game_time = time.time() - state.game_start_time
-        current_time = time.time()
+        # 分阶段计时（只写入环形缓冲区，读取时才汇总）
+        profile = self.tick_profiles.get(room_id)
+        if profile is None:
+            profile = self.tick_profiles[room_id] = RoomProfile(PROFILER_CONFIG["window"])
+        started = time.perf_counter()
+
+        # 重建单位空间索引与格子计数（tick 内由出生/死亡/移动增量维护）
+        state.unit_index.rebuild(state.units)
+        state.occupancy.rebuild_units(state.units)
+        if state.unit_arrays is not None:
+            state.unit_arrays.rebuild(state.units)
+        started = profile.phase("index", started)
 
         # 1. 处理矿场刷新
         self._process_mine_field_refresh(room_id, current_time)
+        started = profile.phase("mine_refresh", started)
 
         # 2. 处理单位AI行为
-        self._process_unit_ai(room_id, current_time)
+        state.astar_nodes = 0
+        decisions, deferred = self._process_unit_ai(room_id, current_time)
+        started = profile.phase("unit_ai", started)
 
         # 3. 处理战斗
-        self._process_combat(room_id, current_time)
+        if state.unit_arrays is not None:
+            self._process_combat_vectorized(room_id, current_time)
+        else:
+            self._process_combat(room_id, current_time)
+        started = profile.phase("combat", started)
 
-        # 4. 清理过期的能量掉落和特效
+        # 4. 清理过期的能量掉落
         self._cleanup_energy_drops(room_id, current_time)
-        self._cleanup_effects(room_id, current_time)
 
         # 5. 检查并重生玩家的主矿工（死亡5秒后自动重生）
         self._check_and_respawn_player_miners(room_id, current_time)
 
         # 6. 检查游戏结束条件
         await self._check_game_over(room_id)
+        profile.phase("cleanup", started)
 
-        # 7. 广播状态（每 tick 都广播）
-        self._broadcast_state(room_id)
+        profile.count("units", len(state.units))
+        profile.count("mine_fields", len(state.mine_fields))
+        profile.count("energy_drops", len(state.energy_drops))
+        profile.count("astar_nodes", state.astar_nodes)
+        profile.count("ai_decisions", decisions)
+        profile.count("ai_deferred", deferred)
+
+        # 7. 广播状态（按 broadcast_every 降频广播，增量基于上一次广播）
+        if state.tick % SCHEDULER_CONFIG["broadcast_every"] == 0:
+            self._broadcast_state(room_id, profile)
+            # 特效已随本次广播帧取走；房间没有广播回调（未构建状态帧）时同样丢弃，避免累积
+            state.heal_effects.clear()
+            state.bullet_effects.clear()
+
+        if recording is not None and recording.steps % REPLAY_CONFIG["checksum_interval"] == 0:
+            recording.record_checksum(self._build_state_for_room(room_id).SerializeToString(deterministic=True))
 
     def _reset_game(self, room_id: int) -> None:
         """重置游戏状态，使其可以重新开始游戏"""
@@ -877,6 +1619,14 @@ class LiveWarGameManager:
         
         # 清空所有游戏实体
         state.units.clear()
+        state.unit_index.clear()
+        state.occupancy.rebuild_units(())
+        if state.unit_arrays is not None:
+            state.unit_arrays.rebuild(())
+        if state.combat_queue is not None:
+            state.combat_queue.clear()
+        state.flow_fields.clear()
+        state.path_cache.clear()
         state.mine_fields.clear()
         state.energy_drops.clear()
         state.heal_effects.clear()
@@ -896,29 +1646,68 @@ class LiveWarGameManager:
         state.player_miner_death_time.clear()
         
         # 注意：不在这里生成矿场，矿场只在游戏真正开始时生成（在 handle_envelope_from_client 中）
+
+        # 重置后的第一帧强制为关键帧
+        encoder = self.delta_encoders.get(room_id)
+        if encoder:
+            encoder.reset()
         
         # 广播重置后的状态，让前端知道游戏已重置
         self._broadcast_state(room_id)
 
-    def _broadcast_state(self, room_id: int) -> None:
-        """广播游戏状态给所有连接"""
+    def _broadcast_state(self, room_id: int, profile: Optional[RoomProfile] = None) -> None:
+        """广播游戏状态给所有连接；profile 不为 None 时记录构建 / 分发耗时和序列化字节数"""
         callback = self.broadcast_callbacks.get(room_id)
         if callback:
             try:
-                msg = game_pb2.GameMessage(
-                    type=game_pb2.GameMessage.GAME_STATE,
-                    game_state=self._build_state_for_room(room_id),
-                )
+                started = time.perf_counter()
+                frame = self.build_state_frame(room_id)
+                if frame is None:
+                    return
+                if profile is not None:
+                    started = profile.phase("state_build", started)
+                    profile.count("state_bytes", frame.encoded_size())
                 # 调用回调（可能是同步或异步）
-                result = callback(msg)
-                # 如果是协程，创建任务执行（不等待）
+                result = callback(frame)
+                # 如果是协程，创建任务执行（不等待）；broadcast 阶段记录协程实际发送完所有连接的耗时
                 if asyncio.iscoroutine(result):
+                    if profile is not None:
+                        result = self._timed_broadcast(result, profile)
                     asyncio.create_task(result)
+                elif profile is not None:
+                    profile.phase("broadcast", started)
             except Exception as e:
                 # 广播失败不应该影响游戏循环
                 print(f"[GameLoop] Error broadcasting state for room {room_id}: {e}", flush=True)
                 # 不打印完整 traceback，避免日志过多
 
+    @staticmethod
+    async def _timed_broadcast(send: Awaitable[None], profile: RoomProfile) -> None:
+        """等待广播协程完成，把从开始发送到发送完毕的耗时计入 broadcast 阶段"""
+        started = time.perf_counter()
+        try:
+            await send
+        finally:
+            profile.phase("broadcast", started)
+
+    def _broadcast_map_snapshot(self, room_id: int) -> None:
+        """地图重新生成后广播新的地图快照"""
+        callback = self.broadcast_callbacks.get(room_id)
+        if callback:
+            try:
+                snapshot = self.build_map_snapshot(room_id)
+                if snapshot is None:
+                    return
+                msg = game_pb2.GameMessage(
+                    type=game_pb2.GameMessage.MAP_SNAPSHOT,
+                    map_snapshot=snapshot,
+                )
+                result = callback(msg)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception as e:
+                print(f"[GameLoop] Error broadcasting map snapshot for room {room_id}: {e}", flush=True)
+
     # ========== 矿场和资源管理 ==========
 
     def _process_mine_field_refresh(self, room_id: int, current_time: float) -> None:
@@ -930,7 +1719,7 @@ class LiveWarGameManager:
         # 移除过期的矿场
         expired = [m for m in state.mine_fields if current_time - m.created_time >= m.lifetime]
         for m in expired:
-            state.mine_fields.remove(m)
+            self._remove_mine_field(state, m)
 
         # 矿场每秒恢复30能量
         regen_per_tick = MINE_FIELD_CONFIG["regen_rate"] * GAME_RULES["tick_interval"]
@@ -948,7 +1737,7 @@ class LiveWarGameManager:
                     self._spawn_mine_field(room_id, current_time)
             state.last_mine_spawn_time = current_time
 
-    def _spawn_initial_mine_fields(self, room_id: int) -> None:
+    def _spawn_initial_mine_fields(self, room_id: int, current_time: float) -> None:
         """游戏开始时生成初始矿场（前面几个距离基地更近）"""
         state = self._ensure_room(room_id)
         # 确保游戏已开始
@@ -957,7 +1746,6 @@ class LiveWarGameManager:
         if state.mine_fields:
             return  # 已经有矿场了
         
-        current_time = time.time()
         energy_max = MINE_FIELD_CONFIG["energy_max"]
         red_base = state.red_base
         blue_base = state.blue_base
@@ -967,8 +1755,8 @@ class LiveWarGameManager:
         for i in range(2):
             attempts = 0
             while attempts < 20:
-                angle = random.uniform(0, 2 * math.pi)
-                distance = random.uniform(8, 12)  # 距离基地8-12格
+                angle = state.rng.uniform(0, 2 * math.pi)
+                distance = state.rng.uniform(8, 12)  # 距离基地8-12格
                 mine_x = red_base.x + math.cos(angle) * distance
                 mine_y = red_base.y + math.sin(angle) * distance
                 mine_x = max(5, min(state.width - 5, mine_x))
@@ -977,9 +1765,10 @@ class LiveWarGameManager:
                 # 确保不在基地上，也不在湖泊上
                 if (self._distance(mine_x, mine_y, red_base.x, red_base.y) > 5 and
                     not self._is_position_in_lake(room_id, mine_x, mine_y)):
-                    state.mine_fields.append(
+                    self._add_mine_field(
+                        state,
                         MineFieldState(
-                            id=f"mine_{uuid.uuid4().hex[:6]}",
+                            id=state.new_entity_id(),
                             x=mine_x,
                             y=mine_y,
                             energy=energy_max,
@@ -994,8 +1783,8 @@ class LiveWarGameManager:
         for i in range(2):
             attempts = 0
             while attempts < 20:
-                angle = random.uniform(0, 2 * math.pi)
-                distance = random.uniform(8, 12)  # 距离基地8-12格
+                angle = state.rng.uniform(0, 2 * math.pi)
+                distance = state.rng.uniform(8, 12)  # 距离基地8-12格
                 mine_x = blue_base.x + math.cos(angle) * distance
                 mine_y = blue_base.y + math.sin(angle) * distance
                 mine_x = max(5, min(state.width - 5, mine_x))
@@ -1004,9 +1793,10 @@ class LiveWarGameManager:
                 # 确保不在基地上，也不在湖泊上
                 if (self._distance(mine_x, mine_y, blue_base.x, blue_base.y) > 5 and
                     not self._is_position_in_lake(room_id, mine_x, mine_y)):
-                    state.mine_fields.append(
+                    self._add_mine_field(
+                        state,
                         MineFieldState(
-                            id=f"mine_{uuid.uuid4().hex[:6]}",
+                            id=state.new_entity_id(),
                             x=mine_x,
                             y=mine_y,
                             energy=energy_max,
@@ -1031,20 +1821,20 @@ class LiveWarGameManager:
         
         # 随机选择在红方区域、蓝方区域或中场区域生成
         # 避免过于集中在中线
-        zone = random.choice(["red", "blue", "center"])
+        zone = state.rng.choice(["red", "blue", "center"])
         
         attempts = 0
         while attempts < 30:
             if zone == "red":
                 # 红方区域（地图左侧）
-                angle = random.uniform(0, 2 * math.pi)
-                distance = random.uniform(8, 20)
+                angle = state.rng.uniform(0, 2 * math.pi)
+                distance = state.rng.uniform(8, 20)
                 x = red_base.x + math.cos(angle) * distance
                 y = red_base.y + math.sin(angle) * distance
             elif zone == "blue":
                 # 蓝方区域（地图右侧）
-                angle = random.uniform(0, 2 * math.pi)
-                distance = random.uniform(8, 20)
+                angle = state.rng.uniform(0, 2 * math.pi)
+                distance = state.rng.uniform(8, 20)
                 x = blue_base.x + math.cos(angle) * distance
                 y = blue_base.y + math.sin(angle) * distance
             else:
@@ -1052,12 +1842,12 @@ class LiveWarGameManager:
                 center_x = state.width / 2
                 center_y = state.height / 2
                 # 在中场区域随机，但避免x坐标过于接近中线
-                offset_x = random.uniform(-15, 15)
+                offset_x = state.rng.uniform(-15, 15)
                 # 如果太接近中线，增加偏移
                 if abs(offset_x) < 3:
                     offset_x = offset_x * 2 if offset_x >= 0 else offset_x * 2
                 x = center_x + offset_x
-                y = center_y + random.uniform(-8, 8)
+                y = center_y + state.rng.uniform(-8, 8)
             
             # 边界检查
             x = max(5, min(state.width - 5, x))
@@ -1082,14 +1872,14 @@ class LiveWarGameManager:
                 
                 if not too_close:
                     mine = MineFieldState(
-                        id=f"mine_{uuid.uuid4().hex[:6]}",
+                        id=state.new_entity_id(),
                         x=x,
                         y=y,
                         energy=energy_max,
                         energy_max=energy_max,
                         created_time=current_time,
                     )
-                    state.mine_fields.append(mine)
+                    self._add_mine_field(state, mine)
                     return
             
             attempts += 1
@@ -1100,15 +1890,14 @@ class LiveWarGameManager:
         if not state:
             return
         lifetime = ENERGY_CONFIG["drop_lifetime"]
-        state.energy_drops = [d for d in state.energy_drops if current_time - d.drop_time < lifetime]
-
-    def _cleanup_effects(self, room_id: int, current_time: float) -> None:
-        """清理过期的特效"""
-        state = self.room_states.get(room_id)
-        if not state:
-            return
-        state.heal_effects = [e for e in state.heal_effects if current_time - e.created_time < e.lifetime]
-        state.bullet_effects = [e for e in state.bullet_effects if current_time - e.created_time < e.lifetime]
+        # 掉落按 id 即掉落时间顺序存放，遇到第一个未过期的掉落即可停止
+        expired = []
+        for drop in state.energy_drops:
+            if current_time - drop.drop_time < lifetime:
+                break
+            expired.append(drop)
+        for drop in expired:
+            state.energy_drops.remove(drop)
 
     def _check_and_respawn_player_miners(self, room_id: int, current_time: float) -> None:
         """检查并重生玩家的主矿工（死亡5秒后自动重生）"""
@@ -1132,29 +1921,161 @@ class LiveWarGameManager:
             team = state.teams.get(user_id, "red")
             # 重新生成主矿工
             self._spawn_basic_unit_for_player(room_id, user_id, team, "miner")
-            # 清除死亡时间记录
-            del state.player_miner_death_time[user_id]
+            # 清除死亡时间记录（生成主矿工时通常已清除）
+            state.player_miner_death_time.pop(user_id, None)
 
     # ========== 单位AI行为 ==========
 
-    def _process_unit_ai(self, room_id: int, current_time: float) -> None:
-        """处理所有单位的AI行为"""
+    def _process_unit_ai(self, room_id: int, current_time: float) -> Tuple[int, int]:
+        """
+        处理所有单位的AI行为。
+
+        完整决策按 AI_CONFIG["decision_interval"] 降频并按单位 ID 错开；到期的单位按
+        (逾期程度, 单位优先级) 排序后依次决策，超出本 tick 的 CPU 预算时剩余单位顺延到下一 tick。
+        本 tick 不决策的单位只执行每 tick 必须的动作，并沿上次决策的路点做运动学移动。
+
+        Returns:
+            (本 tick 决策的单位数, 因预算顺延的单位数)
+        """
         state = self.room_states.get(room_id)
         if not state:
+            return 0, 0
+
+        tick = state.tick
+        interval = AI_CONFIG["decision_interval"]
+        due = [u for u in state.units if not u.is_dead and u.next_decision_tick <= tick]
+        due.sort(key=lambda u: (u.next_decision_tick, AI_PRIORITY.get(u.type, 0), u.id))
+
+        # 预算截断的位置依赖 CPU 计时：录像中记录截断位置，回放时按记录截断而不读取时钟
+        recording = self.recordings.get(room_id)
+        replay_cuts = self.replay_decision_cuts.get(room_id)
+        limit = len(due)
+        budget = None
+        if replay_cuts is not None:
+            if recording is not None:
+                limit = replay_cuts.get(recording.steps, limit)
+        elif self.seed is None:
+            budget = AI_CONFIG["tick_budget"]
+
+        started = time.perf_counter()
+        decided = set()
+        for unit in due:
+            if len(decided) >= limit:
+                break
+            if budget is not None and decided and time.perf_counter() - started > budget:
+                break
+            from_x, from_y = unit.x, unit.y
+            self._decide_unit(room_id, unit, current_time)
+            # 下一个满足 (tick + id) % interval == 0 的 tick，使各单位的决策均匀分布
+            unit.next_decision_tick = tick + interval - (tick + unit.id) % interval
+            decided.add(unit.id)
+            self._sync_unit_position(state, unit, from_x, from_y)
+
+        deferred = len(due) - len(decided)
+        if deferred and recording is not None and replay_cuts is None:
+            recording.decision_cuts[recording.steps] = len(decided)
+
+        for unit in list(state.units):
+            if unit.is_dead or unit.id in decided:
+                continue
+            from_x, from_y = unit.x, unit.y
+            self._unit_upkeep(room_id, state, unit, current_time)
+            self._sync_unit_position(state, unit, from_x, from_y)
+        return len(decided), deferred
+
+    def _decide_unit(self, room_id: int, unit: UnitState, current_time: float) -> None:
+        """完整决策：按单位类型执行 AI（选目标、路径规划、避让移动），并记录新的路点"""
+        unit.waypoint = None  # 本次决策不移动时（已在攻击范围内 / 正在治疗等）不保留旧路点
+        if unit.type == "miner":
+            self._ai_miner(room_id, unit, current_time)
+        elif unit.type == "engineer":
+            self._ai_engineer(room_id, unit, current_time)
+        elif unit.type == "heavy_tank":
+            self._ai_heavy_tank(room_id, unit, current_time)
+        elif unit.type == "assault_tank":
+            self._ai_assault_tank(room_id, unit, current_time)
+
+    def _sync_unit_position(self, state: RoomGameState, unit: UnitState, from_x: float, from_y: float) -> None:
+        """单位本 tick 可能已从 (from_x, from_y) 移动：更新速度，同步空间索引与格子计数"""
+        unit.vx = (unit.x - from_x) / GAME_RULES["tick_interval"]
+        unit.vy = (unit.y - from_y) / GAME_RULES["tick_interval"]
+        state.unit_index.update(unit)
+        state.occupancy.move_unit(unit)
+        if state.unit_arrays is not None:
+            state.unit_arrays.move(unit)
+        if state.combat_queue is not None and (unit.x != from_x or unit.y != from_y):
+            state.combat_queue.moved(unit)
+
+    def _unit_upkeep(self, room_id: int, state: RoomGameState, unit: UnitState, current_time: float) -> None:
+        """非决策 tick：执行每 tick 必须的动作（交付 / 采集 / 拾取 / 治疗光环），并沿上次的路点移动"""
+        base = state.red_base if unit.team == "red" else state.blue_base
+        if not base:
             return
 
-        for unit in state.units[:]:
-            if unit.is_dead:
-                continue
+        if unit.type == "engineer":
+            if not self._engineer_heal_nearby(state, unit, base, current_time):
+                self._follow_waypoint(room_id, state, unit)
+            return
+
+        if unit.type != "miner":
+            self._follow_waypoint(room_id, state, unit)
+            return
+
+        # 矿工：目标消失或携带量变化需要换目标时，提前到下一 tick 重新决策
+        goal = unit.ai_goal
+        if isinstance(goal, EnergyDrop) and goal not in state.energy_drops:
+            unit.next_decision_tick = state.tick + 1
+            return
+        if isinstance(goal, MineFieldState) and goal not in state.mine_fields:
+            unit.next_decision_tick = state.tick + 1
+            return
+        self._follow_waypoint(room_id, state, unit)
+        if goal is base:
+            if self._miner_try_deliver(state, unit, base):
+                unit.next_decision_tick = state.tick + 1
+        elif isinstance(goal, EnergyDrop):
+            if self._miner_try_pickup(state, unit, goal):
+                unit.next_decision_tick = state.tick + 1
+        elif isinstance(goal, MineFieldState):
+            if self._miner_try_harvest(unit, goal) and unit.carrying_energy >= 30:
+                unit.next_decision_tick = state.tick + 1
+
+    def _follow_waypoint(self, room_id: int, state: RoomGameState, unit: UnitState) -> None:
+        """
+        沿上次决策的路点做运动学移动（不做路径规划和避让）。
+
+        到达路点或下一步被阻挡时，提前到下一 tick 重新决策。
+        """
+        waypoint = unit.waypoint
+        if waypoint is None:
+            return
+        speed = unit.speed * GAME_RULES["tick_interval"] * unit.waypoint_speed
+        if unit.is_mining:
+            speed *= GAME_RULES["mining_speed_penalty"]
+        if speed <= 0:
+            return
+
+        dx = waypoint[0] - unit.x
+        dy = waypoint[1] - unit.y
+        dist = math.sqrt(dx * dx + dy * dy)
+        arrived = dist <= speed
+        if arrived:
+            next_x, next_y = waypoint
+        else:
+            next_x = unit.x + dx / dist * speed
+            next_y = unit.y + dy / dist * speed
+        next_x = max(2, min(state.width - 3, next_x))
+        next_y = max(2, min(state.height - 3, next_y))
 
-            if unit.type == "miner":
-                self._ai_miner(room_id, unit, current_time)
-            elif unit.type == "engineer":
-                self._ai_engineer(room_id, unit, current_time)
-            elif unit.type == "heavy_tank":
-                self._ai_heavy_tank(room_id, unit, current_time)
-            elif unit.type == "assault_tank":
-                self._ai_assault_tank(room_id, unit, current_time)
+        if self._is_position_blocked(room_id, next_x, next_y, unit.id, unit.waypoint_as or unit.type):
+            unit.next_decision_tick = state.tick + 1
+            return
+        unit.x = next_x
+        unit.y = next_y
+        unit.last_position = (next_x, next_y)
+        if arrived:
+            unit.waypoint = None
+            unit.next_decision_tick = state.tick + 1
 
     def _ai_miner(self, room_id: int, unit: UnitState, current_time: float) -> None:
         """矿工AI：采集矿场、收集能量掉落、送回基地、攻击敌人"""
@@ -1168,12 +2089,9 @@ class LiveWarGameManager:
 
         # 如果携带了足够能量，送回基地
         if unit.carrying_energy >= 30:
+            unit.ai_goal = base
             self._orca_move_to(room_id, unit, base.x, base.y)
-            if self._distance(unit.x, unit.y, base.x, base.y) < 4:
-                # 能量给玩家
-                if unit.owner_id in state.energies:
-                    state.energies[unit.owner_id] += unit.carrying_energy
-                unit.carrying_energy = 0
+            self._miner_try_deliver(state, unit, base)
             return
 
         # 优先采集掉落能量
@@ -1187,24 +2105,22 @@ class LiveWarGameManager:
                 mine_dist = self._distance(unit.x, unit.y, nearest_mine.x, nearest_mine.y)
 
             if drop_dist < mine_dist:
+                unit.ai_goal = nearest_drop
                 self._orca_move_to(room_id, unit, nearest_drop.x, nearest_drop.y)
+                # 按移动前的距离判断是否拾取
                 if drop_dist < 1.5:
-                    unit.carrying_energy += nearest_drop.energy
-                    heal = int(unit.hp_max * ENERGY_CONFIG["hp_restore_percent"])
-                    unit.hp = int(min(unit.hp_max, unit.hp + heal))
-                    state.energy_drops.remove(nearest_drop)
+                    self._miner_pickup(state, unit, nearest_drop)
                 return
 
         # 去最近的矿场采集
         if nearest_mine:
+            unit.ai_goal = nearest_mine
             self._orca_move_to(room_id, unit, nearest_mine.x, nearest_mine.y)
-            if self._distance(unit.x, unit.y, nearest_mine.x, nearest_mine.y) < 2:
-                harvest = min(MINE_FIELD_CONFIG["energy_per_harvest"], nearest_mine.energy)
-                nearest_mine.energy -= harvest
-                unit.carrying_energy += harvest
+            self._miner_try_harvest(unit, nearest_mine)
             return
 
         # 没有能量可采集时，攻击附近的敌人
+        unit.ai_goal = None
         enemy = self._find_nearest_enemy(room_id, unit)
         if enemy:
             unit.target_id = enemy.id
@@ -1214,6 +2130,37 @@ class LiveWarGameManager:
             if base:
                 self._orca_move_to(room_id, unit, base.x, base.y)
 
+    def _miner_try_deliver(self, state: RoomGameState, unit: UnitState, base: BaseState) -> bool:
+        """矿工在基地附近时把携带的能量交给玩家"""
+        if self._distance(unit.x, unit.y, base.x, base.y) >= 4:
+            return False
+        if unit.owner_id in state.energies:
+            state.energies[unit.owner_id] += unit.carrying_energy
+        unit.carrying_energy = 0
+        return True
+
+    def _miner_pickup(self, state: RoomGameState, unit: UnitState, drop: EnergyDrop) -> None:
+        """拾取能量掉落：携带能量并恢复血量"""
+        unit.carrying_energy += drop.energy
+        heal = int(unit.hp_max * ENERGY_CONFIG["hp_restore_percent"])
+        unit.hp = int(min(unit.hp_max, unit.hp + heal))
+        state.energy_drops.remove(drop)
+
+    def _miner_try_pickup(self, state: RoomGameState, unit: UnitState, drop: EnergyDrop) -> bool:
+        if self._distance(unit.x, unit.y, drop.x, drop.y) >= 1.5:
+            return False
+        self._miner_pickup(state, unit, drop)
+        return True
+
+    def _miner_try_harvest(self, unit: UnitState, mine: MineFieldState) -> bool:
+        """矿工在矿场附近时采集一次"""
+        if self._distance(unit.x, unit.y, mine.x, mine.y) >= 2:
+            return False
+        harvest = min(MINE_FIELD_CONFIG["energy_per_harvest"], mine.energy)
+        mine.energy -= harvest
+        unit.carrying_energy += harvest
+        return True
+
     def _ai_engineer(self, room_id: int, unit: UnitState, current_time: float) -> None:
         """工程师AI：只寻找残血单位，无残血单位回基地"""
         state = self.room_states.get(room_id)
@@ -1224,11 +2171,44 @@ class LiveWarGameManager:
         if not base:
             return
 
+        # 1. 持续治疗身边3格内的残血友方单位和基地；正在治疗时保持当前位置
+        if self._engineer_heal_nearby(state, unit, base, current_time):
+            return
+
+        # 2. 寻找残血单位（按血量百分比排序，优先最残血的）
+        injured_allies = []
+        for ally in state.units.view("team", unit.team):
+            if ally.is_dead or ally.id == unit.id:
+                continue
+            if ally.hp < ally.hp_max:
+                dist = self._distance(unit.x, unit.y, ally.x, ally.y)
+                hp_percent = ally.hp / ally.hp_max if ally.hp_max > 0 else 1.0
+                injured_allies.append((ally, dist, hp_percent))
+        
+        # 按血量百分比排序（最残血的优先），然后按距离排序
+        injured_allies.sort(key=lambda x: (x[2], x[1]))  # 先按血量百分比，再按距离
+        
+        if injured_allies:
+            # 优先选择最残血的单位
+            needs_heal = injured_allies[0][0]
+            dist_to_ally = injured_allies[0][1]
+
+            if dist_to_ally > 3:
+                # 使用 ORCA 风格寻路靠近伤员
+                self._orca_move_to(room_id, unit, needs_heal.x, needs_heal.y, allow_engineer_sharing=True)
+        else:
+            # 没有残血单位，返回基地（速度减半）
+            self._orca_move_to(room_id, unit, base.x, base.y, allow_engineer_sharing=True, speed_multiplier=0.5)
+
+    def _engineer_heal_nearby(
+        self, state: RoomGameState, unit: UnitState, base: BaseState, current_time: float
+    ) -> bool:
+        """工程师持续治疗身边3格内的残血友方单位和己方基地，返回本 tick 是否治疗了任何目标"""
         heal_per_tick = 10 * GAME_RULES["tick_interval"]  # 每秒10，转换为每tick
         
         # 1. 持续治疗身边3格内的所有残血友方单位
         healed_any = False
-        for ally in state.units:
+        for ally in state.unit_index.query_radius(unit.x, unit.y, 3):
             if ally.is_dead or ally.team != unit.team or ally.id == unit.id:
                 continue
             if ally.hp < ally.hp_max:
@@ -1240,7 +2220,7 @@ class LiveWarGameManager:
                         # 在受伤单位位置添加治疗特效
                         state.heal_effects.append(
                             HealEffect(
-                                id=f"heal_{uuid.uuid4().hex[:6]}",
+                                id=state.new_entity_id(),
                                 x=ally.x,
                                 y=ally.y,
                                 created_time=current_time,
@@ -1258,7 +2238,7 @@ class LiveWarGameManager:
                     base.hp = int(min(base.hp_max, base.hp + heal))
                 state.heal_effects.append(
                     HealEffect(
-                        id=f"heal_{uuid.uuid4().hex[:6]}",
+                        id=state.new_entity_id(),
                         x=base.x,
                         y=base.y,
                         created_time=current_time,
@@ -1271,40 +2251,15 @@ class LiveWarGameManager:
         if healed_any:
             state.heal_effects.append(
                 HealEffect(
-                    id=f"heal_engineer_{uuid.uuid4().hex[:6]}",
+                    id=state.new_entity_id(),
                     x=unit.x,
                     y=unit.y,
                     created_time=current_time,
                     team=unit.team,
                 )
             )
-            # 如果身边3格内有需要治疗的单位，保持当前位置（持续治疗）
-            return
-
-        # 2. 寻找残血单位（按血量百分比排序，优先最残血的）
-        injured_allies = []
-        for ally in state.units:
-            if ally.is_dead or ally.team != unit.team or ally.id == unit.id:
-                continue
-            if ally.hp < ally.hp_max:
-                dist = self._distance(unit.x, unit.y, ally.x, ally.y)
-                hp_percent = ally.hp / ally.hp_max if ally.hp_max > 0 else 1.0
-                injured_allies.append((ally, dist, hp_percent))
-        
-        # 按血量百分比排序（最残血的优先），然后按距离排序
-        injured_allies.sort(key=lambda x: (x[2], x[1]))  # 先按血量百分比，再按距离
-        
-        if injured_allies:
-            # 优先选择最残血的单位
-            needs_heal = injured_allies[0][0]
-            dist_to_ally = injured_allies[0][1]
-
-            if dist_to_ally > 3:
-                # 使用 ORCA 风格寻路靠近伤员
-                self._orca_move_to(room_id, unit, needs_heal.x, needs_heal.y, allow_engineer_sharing=True)
-        else:
-            # 没有残血单位，返回基地（速度减半）
-            self._orca_move_to(room_id, unit, base.x, base.y, allow_engineer_sharing=True, speed_multiplier=0.5)
+            return True
+        return False
 
     def _ai_heavy_tank(self, room_id: int, unit: UnitState, current_time: float) -> None:
         """重装坦克AI：远程攻击，智能路径规划，实现包围效果"""
@@ -1313,18 +2268,10 @@ class LiveWarGameManager:
             return
 
         # 优先寻找敌方坦克
-        enemy_tank = None
-        min_dist = float('inf')
-        for target in state.units:
-            if target.is_dead or target.team == unit.team:
-                continue
-            if target.type in ["heavy_tank", "assault_tank"]:
-                dist = self._distance(unit.x, unit.y, target.x, target.y)
-                if dist < min_dist:
-                    min_dist = dist
-                    enemy_tank = target
+        enemy_tank = self._find_nearest_enemy_tank(room_id, unit)
 
         if enemy_tank:
+            min_dist = self._distance(unit.x, unit.y, enemy_tank.x, enemy_tank.y)
             unit.target_id = enemy_tank.id
             # 如果在攻击范围内，不移动（战斗系统会处理攻击）
             if min_dist <= unit.attack_range:
@@ -1357,18 +2304,10 @@ class LiveWarGameManager:
             return
 
         # 1. 优先寻找敌方坦克
-        enemy_tank = None
-        min_dist = float('inf')
-        for target in state.units:
-            if target.is_dead or target.team == unit.team:
-                continue
-            if target.type in ["heavy_tank", "assault_tank"]:
-                dist = self._distance(unit.x, unit.y, target.x, target.y)
-                if dist < min_dist:
-                    min_dist = dist
-                    enemy_tank = target
+        enemy_tank = self._find_nearest_enemy_tank(room_id, unit)
 
         if enemy_tank:
+            min_dist = self._distance(unit.x, unit.y, enemy_tank.x, enemy_tank.y)
             unit.target_id = enemy_tank.id
             # 如果在攻击范围内，不移动
             if min_dist <= unit.attack_range:
@@ -1410,107 +2349,115 @@ class LiveWarGameManager:
     # ========== 战斗系统 ==========
 
     def _process_combat(self, room_id: int, current_time: float) -> None:
-        """处理战斗"""
+        """处理战斗：只访问冷却已结束、未挂起的单位（见 CooldownQueue），在攻击范围内按桶查找目标"""
         state = self.room_states.get(room_id)
-        if not state:
+        if not state or state.combat_queue is None:
             return
 
-        for unit in state.units[:]:
+        index = state.unit_index
+        for unit in state.combat_queue.pop_ready(current_time):
             if unit.is_dead:
                 continue
 
-            # 检查攻击冷却
-            if current_time - unit.last_attack_time < GAME_RULES["attack_cooldown"]:
-                continue
-
-            # 根据单位类型决定攻击目标
-            if unit.type == "assault_tank":
-                # 突击坦克：优先坦克，其次工程师，然后矿工
-                attacked = False
-                for target in state.units[:]:
-                    if target.is_dead or target.team == unit.team:
-                        continue
-                    if target.type not in ["heavy_tank", "assault_tank", "engineer", "miner"]:
-                        continue
-                    # 优先级：坦克 > 工程师 > 矿工
-                    priority = {"heavy_tank": 1, "assault_tank": 1, "engineer": 2, "miner": 3}.get(target.type, 99)
-                    if priority > 3:
-                        continue
-
-                    dist = self._distance(unit.x, unit.y, target.x, target.y)
-                    if dist <= unit.attack_range:
-                        self._attack_unit(room_id, unit, target, current_time)
-                        attacked = True
-                        break
-
-            elif unit.type == "heavy_tank":
-                # 重装坦克：优先攻击坦克，如果没有坦克或坦克不在范围内，攻击基地
-                attacked = False
-                # 先尝试攻击敌方坦克（在攻击范围内的）
-                for target in state.units[:]:
-                    if target.is_dead or target.team == unit.team:
-                        continue
-                    if target.type not in ["heavy_tank", "assault_tank"]:
-                        continue
+            # 根据单位类型决定攻击目标：
+            # 突击坦克攻击坦克、工程师、矿工，不攻击基地；重装坦克只攻击坦克，范围内没有坦克时攻击基地；
+            # 其他单位（矿工、工程师）可以攻击所有敌人和基地
+            target_types = COMBAT_TARGET_TYPES.get(unit.type)
+            range_sq = unit.attack_range * unit.attack_range
+            target = None
+            for candidate in index.iter_radius(unit.x, unit.y, unit.attack_range):
+                if candidate.is_dead or candidate.team == unit.team:
+                    continue
+                if target_types is not None and candidate.type not in target_types:
+                    continue
+                if (candidate.x - unit.x) ** 2 + (candidate.y - unit.y) ** 2 <= range_sq:
+                    target = candidate
+                    break
 
-                    dist = self._distance(unit.x, unit.y, target.x, target.y)
+            if target is not None:
+                # 攻击可能击杀目标并修改空间索引，因此在遍历结束后再结算
+                self._attack_unit(room_id, unit, target, current_time)
+                continue
+            if unit.type != "assault_tank":
+                enemy_base = state.blue_base if unit.team == "red" else state.red_base
+                if enemy_base and enemy_base.hp > 0:
+                    dist = self._distance(unit.x, unit.y, enemy_base.x, enemy_base.y)
                     if dist <= unit.attack_range:
-                        self._attack_unit(room_id, unit, target, current_time)
-                        attacked = True
-                        break
-
-                # 如果没有攻击坦克，攻击基地（无论是否有坦克，只要基地在范围内就攻击）
-                if not attacked:
-                    enemy_base = state.blue_base if unit.team == "red" else state.red_base
-                    if enemy_base and enemy_base.hp > 0:
-                        dist = self._distance(unit.x, unit.y, enemy_base.x, enemy_base.y)
-                        if dist <= unit.attack_range:
-                            self._attack_base(room_id, unit, enemy_base, current_time)
-
-            else:
-                # 其他单位（矿工、工程师）：可以攻击所有敌人和基地
-                attacked = False
-                for target in state.units[:]:
-                    if target.is_dead or target.team == unit.team:
+                        self._attack_base(room_id, unit, enemy_base, current_time)
                         continue
+            # 范围内没有目标且本 tick 没有移动：挂起到自己移动或有敌方单位靠近为止
+            # （移动中的单位每 tick 都可能进入范围，留在待命集合中逐 tick 查找）
+            if unit.vx == 0 and unit.vy == 0:
+                state.combat_queue.park(unit)
 
-                    dist = self._distance(unit.x, unit.y, target.x, target.y)
-                    if dist <= unit.attack_range:
-                        self._attack_unit(room_id, unit, target, current_time)
-                        attacked = True
-                        break
-
-                # 如果没有攻击单位，攻击基地
-                if not attacked:
-                    enemy_base = state.blue_base if unit.team == "red" else state.red_base
-                    if enemy_base and enemy_base.hp > 0:
-                        dist = self._distance(unit.x, unit.y, enemy_base.x, enemy_base.y)
-                        if dist <= unit.attack_range:
-                            self._attack_base(room_id, unit, enemy_base, current_time)
+    def _process_combat_vectorized(self, room_id: int, current_time: float) -> None:
+        """
+        处理战斗（NumPy 版）：所有冷却完毕的单位同时选择目标、同时结算伤害。
 
-    def _attack_unit(self, room_id: int, attacker: UnitState, target: UnitState, current_time: float) -> None:
-        """单位攻击单位"""
+        与逐单位版本的区别：同一 tick 内先后顺序不再影响结果（本 tick 被击杀的单位仍会完成本次攻击）。
+        """
         state = self.room_states.get(room_id)
-        if not state:
+        if not state or state.unit_arrays is None:
             return
 
-        # 添加子弹特效（只有坦克才显示）
+        arrays = state.unit_arrays
+        attackers, targets = arrays.select_targets(current_time, GAME_RULES["attack_cooldown"])
+        if not attackers.size:
+            return
+        hit_rows = arrays.apply_damage(attackers, targets, current_time)
+
+        for attacker_row, target_row in zip(attackers.tolist(), targets.tolist()):
+            attacker = arrays.units[attacker_row]
+            if target_row >= 0:
+                target = arrays.units[target_row]
+                self._add_bullet_effect(state, attacker, target.x, target.y, current_time)
+                attacker.last_attack_time = current_time
+            elif attacker.type != "assault_tank":
+                # 范围内没有可攻击的单位：重装坦克、矿工、工程师攻击范围内的敌方基地
+                enemy_base = state.blue_base if attacker.team == "red" else state.red_base
+                if enemy_base and enemy_base.hp > 0:
+                    dist = self._distance(attacker.x, attacker.y, enemy_base.x, enemy_base.y)
+                    if dist <= attacker.attack_range:
+                        self._attack_base(room_id, attacker, enemy_base, current_time)
+                        arrays.last_attack[attacker_row] = current_time
+
+        # 写回血量并处理死亡
+        for row in hit_rows.tolist():
+            target = arrays.units[row]
+            target.hp = int(arrays.hp[row])
+            if target.hp <= 0:
+                self._handle_unit_death(room_id, target, current_time)
+
+    def _add_bullet_effect(
+        self, state: RoomGameState, attacker: UnitState, to_x: float, to_y: float, current_time: float
+    ) -> None:
+        """添加子弹特效（只有坦克才显示）"""
         if attacker.type in ["heavy_tank", "assault_tank"]:
             state.bullet_effects.append(
                 BulletEffect(
-                    id=f"bullet_{uuid.uuid4().hex[:6]}",
+                    id=state.new_entity_id(),
                     from_x=attacker.x,
                     from_y=attacker.y,
-                    to_x=target.x,
-                    to_y=target.y,
+                    to_x=to_x,
+                    to_y=to_y,
                     created_time=current_time,
                     team=attacker.team,
                 )
             )
 
+    def _attack_unit(self, room_id: int, attacker: UnitState, target: UnitState, current_time: float) -> None:
+        """单位攻击单位"""
+        state = self.room_states.get(room_id)
+        if not state:
+            return
+
+        self._add_bullet_effect(state, attacker, target.x, target.y, current_time)
+
         # 造成伤害
         target.hp = int(max(0, target.hp - attacker.attack))
         attacker.last_attack_time = current_time
+        if state.combat_queue is not None:
+            state.combat_queue.cooled_down(attacker)
 
         # 检查是否死亡
         if target.hp <= 0:
@@ -1522,22 +2469,12 @@ class LiveWarGameManager:
         if not state:
             return
 
-        # 添加子弹特效（只有坦克才显示）
-        if attacker.type in ["heavy_tank", "assault_tank"]:
-            state.bullet_effects.append(
-                BulletEffect(
-                    id=f"bullet_{uuid.uuid4().hex[:6]}",
-                    from_x=attacker.x,
-                    from_y=attacker.y,
-                    to_x=base.x,
-                    to_y=base.y,
-                    created_time=current_time,
-                    team=attacker.team,
-                )
-            )
+        self._add_bullet_effect(state, attacker, base.x, base.y, current_time)
 
         base.hp = int(max(0, base.hp - attacker.attack))
         attacker.last_attack_time = current_time
+        if state.combat_queue is not None:
+            state.combat_queue.cooled_down(attacker)
 
     def _handle_unit_death(self, room_id: int, unit: UnitState, current_time: float) -> None:
         """处理单位死亡"""
@@ -1553,9 +2490,9 @@ class LiveWarGameManager:
         # 掉落能量
         energy_drop = unit.carrying_energy + UNIT_TYPES.get(unit.type, {}).get("energy_drop", 10)
         if energy_drop > 0:
-            state.energy_drops.append(
+            state.energy_drops.add(
                 EnergyDrop(
-                    id=f"drop_{uuid.uuid4().hex[:8]}",
+                    id=state.new_entity_id(),
                     x=unit.x,
                     y=unit.y,
                     energy=energy_drop,
@@ -1574,8 +2511,8 @@ class LiveWarGameManager:
                 del state.player_main_miner_id[unit.owner_id]
 
         # 从列表中移除
-        if unit in state.units:
-            state.units.remove(unit)
+        self._untrack_unit(state, unit)
+        state.units.remove(unit)
 
     async def _check_game_over(self, room_id: int) -> None:
         """检查游戏结束条件"""
@@ -1592,7 +2529,7 @@ class LiveWarGameManager:
         
         if winner:
             state.winner = winner
-            state.game_over_time = time.time()
+            state.game_over_time = state.game_start_time + state.game_time
             
             # 构建胜利方队员列表
             winner_team_players = []
@@ -1633,19 +2570,91 @@ class LiveWarGameManager:
         state = self.room_states.get(room_id)
         if not state:
             return False
-        
-        grid_x = int(math.floor(x))
-        grid_y = int(math.floor(y))
-        
-        for lake in state.lakes:
-            lake_x, lake_y = lake
-            if lake_x == grid_x and lake_y == grid_y:
-                return True
-        
-        return False
+        return OccupancyGrid.cell_of(x, y) in state.lake_cells
+
+    def _track_unit(self, state: RoomGameState, unit: UnitState) -> None:
+        """新单位加入空间索引与格子计数"""
+        state.unit_index.insert(unit)
+        state.occupancy.add_unit(unit)
+        if state.unit_arrays is not None:
+            state.unit_arrays.add(unit)
+        if state.combat_queue is not None:
+            state.combat_queue.add(unit)
+
+    def _untrack_unit(self, state: RoomGameState, unit: UnitState) -> None:
+        """单位移除时同步空间索引与格子计数"""
+        state.unit_index.remove(unit)
+        state.occupancy.remove_unit(unit)
+        if state.unit_arrays is not None:
+            state.unit_arrays.remove(unit)
+        if state.combat_queue is not None:
+            state.combat_queue.remove(unit)
+
+    def _add_mine_field(self, state: RoomGameState, mine: MineFieldState) -> None:
+        """添加矿场并标记占用格子（矿场有碰撞体积）"""
+        state.mine_fields.add(mine)
+        state.occupancy.add_obstacle(*OccupancyGrid.cell_of(mine.x, mine.y))
+
+    def _remove_mine_field(self, state: RoomGameState, mine: MineFieldState) -> None:
+        """移除矿场并释放占用格子"""
+        state.mine_fields.remove(mine)
+        state.occupancy.remove_obstacle(*OccupancyGrid.cell_of(mine.x, mine.y))
+
+    def _rebuild_obstacles(self, state: RoomGameState) -> None:
+        """按墙壁、湖泊、矿场和基地整体重建障碍网格"""
+        cells = [(int(wall_x), int(wall_y)) for wall_x, wall_y in state.walls]
+        state.lake_cells = {(int(lake_x), int(lake_y)) for lake_x, lake_y in state.lakes}
+        cells.extend(state.lake_cells)
+        cells.extend(OccupancyGrid.cell_of(m.x, m.y) for m in state.mine_fields)
+        for base in (state.red_base, state.blue_base):
+            if base:
+                cells.append(OccupancyGrid.cell_of(base.x, base.y))
+        state.occupancy.rebuild_obstacles(state.width, state.height, cells)
 
     # ========== ORCA 风格多单位避让移动 ==========
 
+    def _flow_field_goal(self, state: RoomGameState, target_x: float, target_y: float) -> Tuple[int, int] | None:
+        """目标落在基地或存活矿场的格子上时返回该格子（可使用共享流场），否则返回 None"""
+        goal = OccupancyGrid.cell_of(target_x, target_y)
+        for base in (state.red_base, state.blue_base):
+            if base and OccupancyGrid.cell_of(base.x, base.y) == goal:
+                return goal
+        for mine in state.mine_fields:
+            if OccupancyGrid.cell_of(mine.x, mine.y) == goal:
+                return goal
+        return None
+
+    def _next_step_on_flow_field(
+        self,
+        room_id: int,
+        unit: UnitState,
+        target_x: float,
+        target_y: float,
+        unit_type: str,
+    ) -> Tuple[float, float] | None:
+        """
+        沿共享流场取下一步（格子中心）。
+
+        只对基地 / 矿场这类静态目标生效；目标不是静态目标、已经贴近目标或
+        下降方向的格子都被单位占用时返回 None，由调用方退回局部 A*。
+        """
+        state = self.room_states.get(room_id)
+        if not state:
+            return None
+
+        goal = self._flow_field_goal(state, target_x, target_y)
+        if goal is None:
+            return None
+
+        flow = state.flow_fields.get(state.occupancy, goal)
+        grid_x, grid_y = OccupancyGrid.cell_of(unit.x, unit.y)
+        for cell_x, cell_y in flow.next_cells(grid_x, grid_y):
+            if (cell_x, cell_y) == goal:
+                return None
+            if not self._is_position_blocked(room_id, cell_x + 0.5, cell_y + 0.5, unit.id, unit_type):
+                return (cell_x + 0.5, cell_y + 0.5)
+        return None
+
     def _find_path_around_obstacles(
         self,
         room_id: int,
@@ -1653,7 +2662,54 @@ class LiveWarGameManager:
         start_y: float,
         target_x: float,
         target_y: float,
-        unit_id: str,
+        unit_id: int,
+        unit_type: str,
+        max_search_radius: int = 15,
+        max_nodes: int = 200,
+    ) -> Tuple[float, float] | None:
+        """
+        带缓存的局部寻路：相同 (起点格子, 目标格子, 单位类别) 在障碍不变时复用上次的 A* 结果。
+
+        缓存的下一步当前若被单位占住则视为未命中并重新搜索。
+        """
+        state = self.room_states.get(room_id)
+        if not state:
+            return None
+
+        start_grid = (int(math.floor(start_x)), int(math.floor(start_y)))
+        target_grid = (int(math.floor(target_x)), int(math.floor(target_y)))
+        if start_grid == target_grid:
+            return (target_x, target_y)
+
+        cache = state.path_cache
+        cache.sync_version(state.occupancy.version)
+        key = (start_grid, target_grid, unit_type, max_search_radius, max_nodes)
+        next_pos = cache.get(key)
+        if next_pos is not None:
+            if not self._is_position_blocked(room_id, next_pos[0], next_pos[1], unit_id, unit_type):
+                return next_pos
+            cache.discard(key)
+
+        next_pos = self._search_path_around_obstacles(
+            room_id, start_x, start_y, target_x, target_y,
+            unit_id, unit_type, max_search_radius, max_nodes,
+        )
+        if next_pos is not None:
+            cache.put(key, next_pos)
+        return next_pos
+
+    def path_cache_stats(self) -> Dict[int, Dict[str, float]]:
+        """各房间局部 A* 缓存的命中统计（用于调整 PATHFINDING_CONFIG["path_cache_size"]）"""
+        return {room_id: state.path_cache.stats() for room_id, state in self.room_states.items()}
+
+    def _search_path_around_obstacles(
+        self,
+        room_id: int,
+        start_x: float,
+        start_y: float,
+        target_x: float,
+        target_y: float,
+        unit_id: int,
         unit_type: str,
         max_search_radius: int = 15,
         max_nodes: int = 200,
@@ -1708,6 +2764,7 @@ class LiveWarGameManager:
             
             closed_set.add(current)
             nodes_explored += 1
+            state.astar_nodes += 1
             
             # 如果到达目标，重建路径
             if current == target_grid:
@@ -1961,10 +3018,13 @@ class LiveWarGameManager:
         # 如果直接路径被阻挡或强制路径规划，使用路径规划
         path_planned = False
         if direct_path_blocked or force_pathfinding:
-            next_pos = self._find_path_around_obstacles(
-                room_id, unit.x, unit.y, target_x, target_y,
-                unit.id, unit_type_for_block, max_search_radius=12, max_nodes=150
-            )
+            # 基地 / 矿场目标优先查共享流场，其余目标（或流场走不通时）使用局部 A*
+            next_pos = self._next_step_on_flow_field(room_id, unit, target_x, target_y, unit_type_for_block)
+            if next_pos is None:
+                next_pos = self._find_path_around_obstacles(
+                    room_id, unit.x, unit.y, target_x, target_y,
+                    unit.id, unit_type_for_block, max_search_radius=12, max_nodes=150
+                )
             if next_pos:
                 # 使用路径规划找到的下一个点作为目标
                 target_x, target_y = next_pos
@@ -1984,6 +3044,11 @@ class LiveWarGameManager:
                     dist_to_target = self._distance(unit.x, unit.y, target_x, target_y)
                     path_planned = True
 
+        # 记录路点：非决策 tick 沿它做运动学移动
+        unit.waypoint = (target_x, target_y)
+        unit.waypoint_as = unit_type_for_block
+        unit.waypoint_speed = speed_multiplier
+
         # 期望速度：朝向目标（可能是路径规划后的目标点）
         dir_x = (target_x - unit.x) / max(dist_to_target, 0.1)
         dir_y = (target_y - unit.y) / max(dist_to_target, 0.1)
@@ -1999,7 +3064,7 @@ class LiveWarGameManager:
         avoid_vx = 0.0
         avoid_vy = 0.0
 
-        for other in state.units:
+        for other in state.unit_index.query_radius(unit.x, unit.y, neighbor_radius):
             if other.is_dead or other.id == unit.id:
                 continue
 
@@ -2146,8 +3211,8 @@ class LiveWarGameManager:
 
         # 计算包围角度：统计有多少个友方单位正在接近同一个目标
         allies_approaching = 0
-        for other_unit in state.units:
-            if other_unit.is_dead or other_unit.team != unit.team or other_unit.id == unit.id:
+        for other_unit in state.units.view("team", unit.team):
+            if other_unit.is_dead or other_unit.id == unit.id:
                 continue
             # 检查其他单位是否也在接近同一个目标（通过目标ID或目标位置判断）
             is_approaching_same_target = False
@@ -2547,7 +3612,7 @@ class LiveWarGameManager:
                             unit.y = try_y
                             return
 
-    def _is_position_blocked(self, room_id: int, x: float, y: float, exclude_unit_id: str, unit_type: str = None) -> bool:
+    def _is_position_blocked(self, room_id: int, x: float, y: float, exclude_unit_id: int, unit_type: str = None) -> bool:
         """检查位置是否被占用
         
         Args:
@@ -2563,78 +3628,19 @@ class LiveWarGameManager:
         # 将坐标转换为格子坐标（向下取整）
         grid_x = int(math.floor(x))
         grid_y = int(math.floor(y))
+        occupancy = state.occupancy
 
         # 工程师特殊规则：不占用其他单位的2格限制，但每格最多2个工程师
         if unit_type == "engineer":
-            engineers_in_cell = 0
-            for other_unit in state.units:
-                if other_unit.is_dead or other_unit.id == exclude_unit_id:
-                    continue
-                
-                other_grid_x = int(math.floor(other_unit.x))
-                other_grid_y = int(math.floor(other_unit.y))
-                
-                # 如果其他工程师在同一格子
-                if other_grid_x == grid_x and other_grid_y == grid_y:
-                    if other_unit.type == "engineer":
-                        engineers_in_cell += 1
-                        # 如果已经有2个工程师，则被阻挡
-                        if engineers_in_cell >= 2:
-                            return True
             # 工程师可以和其他单位共享格子，不检查其他单位数量
-            return False
-        
-        # 其他单位：每个格子最多2个单位
-        units_in_cell = 0
-        for other_unit in state.units:
-            if other_unit.is_dead or other_unit.id == exclude_unit_id:
-                continue
-            
-            other_grid_x = int(math.floor(other_unit.x))
-            other_grid_y = int(math.floor(other_unit.y))
-            
-            # 如果其他单位在同一格子
-            if other_grid_x == grid_x and other_grid_y == grid_y:
-                # 工程师不占用其他单位的2格限制
-                if other_unit.type != "engineer":
-                    units_in_cell += 1
-                    # 如果已经有2个单位（不包括工程师），则被阻挡
-                    if units_in_cell >= 2:
-                        return True
-
-        # 检查是否在墙壁上
-        for wall in state.walls:
-            wall_x, wall_y = wall
-            if int(wall_x) == grid_x and int(wall_y) == grid_y:
-                return True
-
-        # 检查是否在湖泊上（不能进入湖泊）
-        for lake in state.lakes:
-            lake_x, lake_y = lake
-            if lake_x == grid_x and lake_y == grid_y:
-                return True
-
-        # 检查是否在矿场上（矿场有碰撞体积）
-        for mine in state.mine_fields:
-            mine_grid_x = int(math.floor(mine.x))
-            mine_grid_y = int(math.floor(mine.y))
-            if mine_grid_x == grid_x and mine_grid_y == grid_y:
-                return True
-
-        # 检查是否在基地上（不能穿过基地）
-        if state.red_base:
-            base_grid_x = int(math.floor(state.red_base.x))
-            base_grid_y = int(math.floor(state.red_base.y))
-            if base_grid_x == grid_x and base_grid_y == grid_y:
-                return True
+            return occupancy.engineers_in_cell(grid_x, grid_y, exclude_unit_id) >= 2
 
-        if state.blue_base:
-            base_grid_x = int(math.floor(state.blue_base.x))
-            base_grid_y = int(math.floor(state.blue_base.y))
-            if base_grid_x == grid_x and base_grid_y == grid_y:
-                return True
+        # 其他单位：每个格子最多2个单位（工程师不占用其他单位的2格限制）
+        if occupancy.units_in_cell(grid_x, grid_y, exclude_unit_id) >= 2:
+            return True
 
-        return False
+        # 墙壁、湖泊（不能进入）、矿场（有碰撞体积）、基地（不能穿过）
+        return occupancy.is_obstacle(grid_x, grid_y)
 
     def _move_engineer_towards(self, room_id: int, unit: UnitState, target_x: float, target_y: float) -> None:
         """工程师专用的移动方法，带智能路径规划（检测前方阻塞并提前绕路）"""
@@ -2807,24 +3813,72 @@ class LiveWarGameManager:
                             unit.y = try_y
                             return
 
+    def _nearest_unit_of(
+        self,
+        state: RoomGameState,
+        unit: UnitState,
+        team: str,
+        types: Iterable[str],
+        exclude_id: Optional[int] = None,
+    ) -> Optional[UnitState]:
+        """
+        寻找离 unit 最近的 team 阵营、types 类型的存活单位。
+
+        按 (阵营, 类型) 分区计数：分区为空时直接返回；分区较小时遍历分区，否则用空间索引按环搜索。
+        """
+        units = state.units
+        keys = [(team, unit_type) for unit_type in types]
+        total = sum(units.count("team_type", key) for key in keys)
+        if not total:
+            return None
+        if total > AI_CONFIG["view_scan_limit"]:
+            type_set = frozenset(types)
+            return state.unit_index.nearest(
+                unit.x, unit.y,
+                lambda target: (
+                    not target.is_dead
+                    and target.team == team
+                    and target.type in type_set
+                    and target.id != exclude_id
+                ),
+            )
+
+        nearest = None
+        min_dist_sq = float("inf")
+        for target in units.views("team_type", keys):
+            if target.is_dead or target.id == exclude_id:
+                continue
+            dist_sq = (target.x - unit.x) ** 2 + (target.y - unit.y) ** 2
+            if dist_sq < min_dist_sq:
+                min_dist_sq = dist_sq
+                nearest = target
+        return nearest
+
+    @staticmethod
+    def _enemy_team(team: str) -> str:
+        return "blue" if team == "red" else "red"
+
     def _find_nearest_enemy(self, room_id: int, unit: UnitState) -> Optional[UnitState]:
         """寻找最近的敌人"""
         state = self.room_states.get(room_id)
         if not state:
             return None
 
-        nearest = None
-        min_dist = float('inf')
+        if state.unit_arrays is not None:
+            return state.unit_arrays.nearest(unit.x, unit.y, unit.team, enemy=True)
 
-        for target in state.units:
-            if target.is_dead or target.team == unit.team:
-                continue
-            dist = self._distance(unit.x, unit.y, target.x, target.y)
-            if dist < min_dist:
-                min_dist = dist
-                nearest = target
+        return self._nearest_unit_of(state, unit, self._enemy_team(unit.team), UNIT_TYPES)
 
-        return nearest
+    def _find_nearest_enemy_tank(self, room_id: int, unit: UnitState) -> Optional[UnitState]:
+        """寻找最近的敌方坦克（重装/突击）"""
+        state = self.room_states.get(room_id)
+        if not state:
+            return None
+
+        if state.unit_arrays is not None:
+            return state.unit_arrays.nearest(unit.x, unit.y, unit.team, enemy=True, types=TANK_TYPES)
+
+        return self._nearest_unit_of(state, unit, self._enemy_team(unit.team), TANK_TYPES)
 
     def _find_nearest_enemy_of_type(self, room_id: int, unit: UnitState, target_type: str) -> Optional[UnitState]:
         """寻找指定类型的最近敌人"""
@@ -2832,18 +3886,10 @@ class LiveWarGameManager:
         if not state:
             return None
 
-        nearest = None
-        min_dist = float('inf')
+        if state.unit_arrays is not None:
+            return state.unit_arrays.nearest(unit.x, unit.y, unit.team, enemy=True, types=(target_type,))
 
-        for target in state.units:
-            if target.is_dead or target.team == unit.team or target.type != target_type:
-                continue
-            dist = self._distance(unit.x, unit.y, target.x, target.y)
-            if dist < min_dist:
-                min_dist = dist
-                nearest = target
-
-        return nearest
+        return self._nearest_unit_of(state, unit, self._enemy_team(unit.team), (target_type,))
 
     def _find_nearest_mine_field(self, room_id: int, unit: UnitState) -> Optional[MineFieldState]:
         """寻找最近的有能量的矿场"""
@@ -2870,32 +3916,16 @@ class LiveWarGameManager:
         if not state:
             return None
 
-        # 优先寻找重装坦克
-        nearest_heavy = None
-        min_dist_heavy = float('inf')
-        
-        nearest_assault = None
-        min_dist_assault = float('inf')
-
-        for ally in state.units:
-            if ally.is_dead or ally.team != unit.team or ally.id == unit.id:
-                continue
-            
-            if ally.type == "heavy_tank":
-                dist = self._distance(unit.x, unit.y, ally.x, ally.y)
-                if dist < min_dist_heavy:
-                    min_dist_heavy = dist
-                    nearest_heavy = ally
-            elif ally.type == "assault_tank":
-                dist = self._distance(unit.x, unit.y, ally.x, ally.y)
-                if dist < min_dist_assault:
-                    min_dist_assault = dist
-                    nearest_assault = ally
-
-        # 优先返回重装坦克
-        if nearest_heavy:
-            return nearest_heavy
-        return nearest_assault
+        for tank_type in TANK_TYPES:
+            if state.unit_arrays is not None:
+                nearest = state.unit_arrays.nearest(
+                    unit.x, unit.y, unit.team, enemy=False, types=(tank_type,), exclude_id=unit.id
+                )
+            else:
+                nearest = self._nearest_unit_of(state, unit, unit.team, (tank_type,), exclude_id=unit.id)
+            if nearest:
+                return nearest
+        return None
 
     def _find_nearest_energy_drop(self, room_id: int, unit: UnitState) -> Optional[EnergyDrop]:
         """寻找最近的能量掉落"""
@@ -0,0 +1,427 @@
+"""
+LiveWar 多进程模拟
+
+说明：
+- 每个工作进程运行自己的 LiveWarGameManager 和全局游戏循环，房间按 room_id 哈希固定分配到某个工作进程
+- 主进程只负责转发客户端命令，并把工作进程返回 / 广播的消息交给房间服务发送
+- 进程之间只传递 protobuf 序列化后的字节（StateFrame 拆成 body / delta_body / 各玩家 Player 字节，
+  视野裁剪数据 AoiFrame 本身只包含字节）
+- 每个连接（Pipe）在两端各有一个读线程和一个写线程：收到的消息通过 call_soon_threadsafe 回到事件循环，
+  发送的消息在调用方序列化后交给写线程（管道写满时阻塞的是写线程，而不是事件循环）
+- 工作进程处理请求出错时只返回 (异常类型名, 消息)，主进程以 GameWorkerError 抛给调用方
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+from multiprocessing.reduction import ForkingPickler
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from config.settings import settings
+from protos import game_pb2
+from service.state_frame import StateFrame
+
+# 进程间消息格式：(op, request_id, room_id, payload)
+_OP_COMMAND = "command"
+_OP_INITIAL_STATE = "initial_state"
+_OP_RELEASE = "release"
+_OP_RESUME = "resume"
+_OP_ENCODINGS = "encodings"
+_OP_METRICS = "metrics"
+_OP_PROFILER = "profiler"
+_OP_CHECKPOINT = "checkpoint"
+_OP_RESTORE = "restore"
+_OP_REPLY = "reply"
+_OP_ERROR = "error"  # 请求处理失败，payload 为 (异常类型名, 消息)
+_OP_BROADCAST = "broadcast"
+
+_KIND_MESSAGE = 0
+_KIND_FRAME = 1
+
+
+def _pack(item: game_pb2.GameMessage | StateFrame | None):
+    """GameMessage / StateFrame -> 可跨进程传递的元组"""
+    if item is None:
+        return None
+    if isinstance(item, StateFrame):
+        players = {uid: player.SerializeToString() for uid, player in item.players.items()}
+        return _KIND_FRAME, (
+            item.room_id, item.tick, item.body, players, item.delta_body, item.packed_body, item.aoi,
+            item.seq, item.base_seq,
+        )
+    return _KIND_MESSAGE, item.SerializeToString()
+
+
+def _unpack(packed) -> game_pb2.GameMessage | StateFrame | None:
+    if packed is None:
+        return None
+    kind, data = packed
+    if kind == _KIND_FRAME:
+        room_id, tick, body, players, delta_body, packed_body, aoi, seq, base_seq = data
+        players = {uid: game_pb2.Player.FromString(raw) for uid, raw in players.items()}
+        return StateFrame(room_id, tick, body, players, delta_body, packed_body, aoi, seq, base_seq)
+    return game_pb2.GameMessage.FromString(data)
+
+
+def _start_reader(conn, on_item: Callable, on_closed: Callable) -> threading.Thread:
+    """后台线程阻塞读取 Pipe，每条消息交给 on_item；连接关闭时调用 on_closed"""
+
+    def run() -> None:
+        while True:
+            try:
+                item = conn.recv()
+            except (EOFError, OSError):
+                break
+            on_item(item)
+        on_closed()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class _PipeWriter:
+    """
+    后台线程写 Pipe：conn.send 在管道写满时阻塞，不能在事件循环线程中调用。
+
+    消息在调用方线程中序列化（序列化错误直接抛给调用方），写线程只负责按顺序写出字节。
+    """
+
+    _STOP = object()
+
+    def __init__(self, conn) -> None:
+        self._conn = conn
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, item) -> None:
+        if self._closed:
+            raise BrokenPipeError("LiveWar worker pipe closed")
+        self._queue.put(bytes(ForkingPickler.dumps(item)))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """写完已排队的消息后停止写线程"""
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is self._STOP:
+                return
+            try:
+                self._conn.send_bytes(data)
+            except (OSError, ValueError):
+                self._closed = True  # 对端已退出或连接已关闭
+                return
+
+
+class GameWorkerError(RuntimeError):
+    """工作进程处理请求时出错（异常对象不跨进程传递，只带回类型名和消息）"""
+
+    def __init__(self, type_name: str, message: str) -> None:
+        super().__init__(f"{type_name}: {message}")
+        self.type_name = type_name
+
+
+# ========== 工作进程 ==========
+
+def _worker_main(conn) -> None:
+    """工作进程入口"""
+    try:
+        asyncio.run(_worker_loop(conn))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(conn) -> None:
+    from service.game_manager import LiveWarGameManager
+
+    gm = LiveWarGameManager()
+    gm.warm_map_pool()
+    loop = asyncio.get_running_loop()
+    writer = _PipeWriter(conn)
+    inbox: asyncio.Queue = asyncio.Queue()
+    _start_reader(
+        conn,
+        lambda item: loop.call_soon_threadsafe(inbox.put_nowait, item),
+        lambda: loop.call_soon_threadsafe(inbox.put_nowait, None),
+    )
+
+    def broadcast_to_main(room_id: int) -> Callable:
+        def callback(msg: game_pb2.GameMessage | StateFrame) -> None:
+            writer.send((_OP_BROADCAST, None, room_id, _pack(msg)))
+        return callback
+
+    while True:
+        item = await inbox.get()
+        if item is None:
+            break  # 主进程要求退出或关闭了连接
+        op, request_id, room_id, payload = item
+        try:
+            if op == _OP_COMMAND:
+                if room_id not in gm.broadcast_callbacks:
+                    gm.set_broadcast_callback(room_id, broadcast_to_main(room_id))
+                user_id, username, data = payload
+                outgoing = gm.handle_envelope_from_client(
+                    room_id=room_id,
+                    user_id=user_id,
+                    username=username,
+                    msg=game_pb2.GameMessage.FromString(data),
+                )
+                writer.send((_OP_REPLY, request_id, room_id, [_pack(m) for m in outgoing]))
+            elif op == _OP_INITIAL_STATE:
+                if room_id not in gm.broadcast_callbacks:
+                    gm.set_broadcast_callback(room_id, broadcast_to_main(room_id))
+                snapshot = gm.build_map_snapshot(room_id)
+                frame = gm.build_state_frame(room_id, for_broadcast=False)
+                writer.send((
+                    _OP_REPLY,
+                    request_id,
+                    room_id,
+                    (snapshot.SerializeToString() if snapshot else None, _pack(frame)),
+                ))
+            elif op == _OP_RELEASE:
+                gm.release_room(room_id)
+            elif op == _OP_RESUME:
+                gm.resume_room(room_id)
+            elif op == _OP_ENCODINGS:
+                gm.set_room_encodings(room_id, payload)
+            elif op == _OP_METRICS:
+                writer.send((_OP_REPLY, request_id, room_id, gm.tick_metrics()))
+            elif op == _OP_PROFILER:
+                enabled, duration = payload
+                writer.send((_OP_REPLY, request_id, room_id, gm.set_sampling_profiler(enabled, duration)))
+            elif op == _OP_CHECKPOINT:
+                writer.send((_OP_REPLY, request_id, room_id, gm.checkpoint_rooms()))
+            elif op == _OP_RESTORE:
+                restored = gm.restore_rooms(payload)
+                for restored_id in restored:
+                    gm.set_broadcast_callback(restored_id, broadcast_to_main(restored_id))
+                writer.send((_OP_REPLY, request_id, room_id, restored))
+        except Exception as e:
+            print(f"[GameWorker] Error handling {op} for room {room_id}: {e}", flush=True)
+            import traceback
+            traceback.print_exc()
+            if request_id is not None:
+                writer.send((_OP_ERROR, request_id, room_id, (type(e).__name__, str(e))))
+    writer.close(timeout=2)
+
+
+# ========== 主进程 ==========
+
+class GameWorkerPool:
+    """
+    主进程一侧的工作进程池，对房间服务暴露与 LiveWarGameManager 对应的接口。
+
+    命令类接口是协程（需要等待工作进程返回），广播回调与进程内模式相同。
+    """
+
+    def __init__(self, num_workers: int) -> None:
+        self.num_workers = num_workers
+        # 广播回调函数：room_id -> Callable[[game_pb2.GameMessage | StateFrame], Awaitable[None]]
+        self.broadcast_callbacks: Dict[int, Callable[[game_pb2.GameMessage | StateFrame], any]] = {}
+        self._workers: List[Tuple[multiprocessing.Process, object]] = []
+        self._writers: List[_PipeWriter] = []
+        # 工作进程序号 -> 尚未返回的请求 request_id -> Future（工作进程退出时移除，只让它自己的请求失败）
+        self._pending: Dict[int, Dict[int, asyncio.Future]] = {}
+        self._request_ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing = False
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        # spawn：不复制主进程的事件循环和网络连接
+        ctx = multiprocessing.get_context("spawn")
+        for index in range(self.num_workers):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_worker_main, args=(child_conn,), name=f"livewar-worker-{index}", daemon=True)
+            process.start()
+            child_conn.close()
+            _start_reader(
+                parent_conn,
+                lambda item, index=index: self._call_in_loop(self._dispatch, index, item),
+                lambda index=index: self._call_in_loop(self._on_worker_closed, index),
+            )
+            self._workers.append((process, parent_conn))
+            self._writers.append(_PipeWriter(parent_conn))
+            self._pending[index] = {}
+
+    def _call_in_loop(self, fn: Callable, *args) -> None:
+        """从读线程切回事件循环；事件循环已关闭（进程退出中）时丢弃"""
+        try:
+            self._loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass
+
+    def _worker_index(self, room_id: int) -> int:
+        """房间按 room_id 哈希固定分配到某个工作进程"""
+        return hash(room_id) % len(self._workers)
+
+    def _send(self, index: int, item) -> None:
+        """交给工作进程的写线程发送（不阻塞事件循环）"""
+        self._writers[index].send(item)
+
+    def _notify(self, index: int, item) -> None:
+        """发送不需要回复的通知；工作进程已退出时丢弃，不让异常传到连接处理中"""
+        op, _, room_id, _ = item
+        if index not in self._pending:
+            print(f"[GameWorker] Worker {index} exited, dropping {op} for room {room_id}", flush=True)
+            return
+        try:
+            self._send(index, item)
+        except BrokenPipeError:
+            # 工作进程刚退出、_on_worker_closed 尚未执行
+            print(f"[GameWorker] Worker {index} pipe closed, dropping {op} for room {room_id}", flush=True)
+
+    def _dispatch(self, index: int, item) -> None:
+        op, request_id, room_id, payload = item
+        if op in (_OP_REPLY, _OP_ERROR):
+            future = self._pending.get(index, {}).pop(request_id, None)
+            if future is None or future.done():
+                return
+            if op == _OP_ERROR:
+                future.set_exception(GameWorkerError(*payload))
+            else:
+                future.set_result(payload)
+        elif op == _OP_BROADCAST:
+            callback = self.broadcast_callbacks.get(room_id)
+            if callback:
+                try:
+                    result = callback(_unpack(payload))
+                    if asyncio.iscoroutine(result):
+                        asyncio.create_task(result)
+                except Exception as e:
+                    # 广播失败不应该影响其他房间
+                    print(f"[GameWorker] Error in broadcast for room {room_id}: {e}", flush=True)
+
+    def _on_worker_closed(self, index: int) -> None:
+        """工作进程退出：只让发给它的请求失败，其他工作进程上的房间不受影响"""
+        if not self._closing:
+            print(f"[GameWorker] Worker {index} exited unexpectedly", flush=True)
+        for future in self._pending.pop(index, {}).values():
+            if not future.done():
+                future.set_exception(RuntimeError(f"LiveWar worker {index} exited"))
+
+    async def _request(self, op: str, room_id: int, payload=None):
+        self._ensure_started()
+        return await self._send_request(self._worker_index(room_id), op, room_id, payload)
+
+    async def _send_request(self, index: int, op: str, room_id: Optional[int], payload=None):
+        pending = self._pending.get(index)
+        if pending is None:
+            raise RuntimeError(f"LiveWar worker {index} exited")
+        request_id = next(self._request_ids)
+        self._send(index, (op, request_id, room_id, payload))
+        # 回复只在事件循环中处理，发送之后再登记不会错过
+        future = self._loop.create_future()
+        pending[request_id] = future
+        return await future
+
+    async def _request_all(self, op: str, payload=None) -> list:
+        """向每个工作进程发送同一请求，按工作进程顺序返回结果"""
+        self._ensure_started()
+        return list(await asyncio.gather(
+            *(self._send_request(index, op, None, payload) for index in range(len(self._workers)))
+        ))
+
+    def set_broadcast_callback(self, room_id: int, callback: Callable[[game_pb2.GameMessage | StateFrame], any]) -> None:
+        self.broadcast_callbacks[room_id] = callback
+
+    async def handle_envelope_from_client(
+        self,
+        room_id: int,
+        user_id: Optional[int],
+        username: str,
+        msg: game_pb2.GameMessage,
+    ) -> list[game_pb2.GameMessage | StateFrame]:
+        """转发客户端命令到房间所在的工作进程，返回需要广播的消息"""
+        outgoing = await self._request(_OP_COMMAND, room_id, (user_id, username, msg.SerializeToString()))
+        return [_unpack(m) for m in outgoing]
+
+    async def build_initial_state(
+        self, room_id: int
+    ) -> Tuple[Optional[game_pb2.MapSnapshotPayload], Optional[StateFrame]]:
+        """新连接需要的地图快照和完整状态帧"""
+        snapshot, frame = await self._request(_OP_INITIAL_STATE, room_id)
+        if snapshot is not None:
+            snapshot = game_pb2.MapSnapshotPayload.FromString(snapshot)
+        return snapshot, _unpack(frame)
+
+    def release_room(self, room_id: int) -> None:
+        """房间内已没有连接：通知工作进程清理该房间"""
+        self.broadcast_callbacks.pop(room_id, None)
+        if self._workers:
+            self._notify(self._worker_index(room_id), (_OP_RELEASE, None, room_id, None))
+
+    def resume_room(self, room_id: int) -> None:
+        """有连接进入房间：通知工作进程继续恢复后暂停的对局"""
+        self._ensure_started()
+        self._notify(self._worker_index(room_id), (_OP_RESUME, None, room_id, None))
+
+    def set_room_encodings(self, room_id: int, encodings: FrozenSet[str]) -> None:
+        """房间内连接协商的编码变化：通知工作进程只构建需要的编码"""
+        self._ensure_started()
+        self._notify(self._worker_index(room_id), (_OP_ENCODINGS, None, room_id, frozenset(encodings)))
+
+    async def tick_metrics(self) -> Dict[str, object]:
+        """各工作进程的性能指标（格式同 LiveWarGameManager.tick_metrics）"""
+        return {"workers": await self._request_all(_OP_METRICS)}
+
+    async def set_sampling_profiler(self, enabled: bool, duration: float = 30.0) -> Dict[str, object]:
+        """在所有工作进程中开启或停止采样剖析器"""
+        return {"workers": await self._request_all(_OP_PROFILER, (enabled, duration))}
+
+    async def checkpoint_rooms(self) -> Dict[int, bytes]:
+        """所有工作进程中房间的快照数据（格式同 LiveWarGameManager.checkpoint_rooms）"""
+        if not self._workers:
+            return {}
+        sections: Dict[int, bytes] = {}
+        for worker_sections in await self._request_all(_OP_CHECKPOINT):
+            sections.update(worker_sections)
+        return sections
+
+    async def restore_rooms(self, sections: Dict[int, bytes]) -> List[int]:
+        """把快照中的房间恢复到各自哈希对应的工作进程，返回恢复的 room_id"""
+        if not sections:
+            return []
+        self._ensure_started()
+        by_worker: Dict[int, Dict[int, bytes]] = {}
+        for room_id, data in sections.items():
+            by_worker.setdefault(self._worker_index(room_id), {})[room_id] = data
+        results = await asyncio.gather(*(
+            self._send_request(index, _OP_RESTORE, None, worker_sections)
+            for index, worker_sections in by_worker.items()
+        ))
+        return [room_id for restored in results for room_id in restored]
+
+    def shutdown(self) -> None:
+        """通知工作进程退出并等待，然后关闭连接"""
+        self._closing = True
+        for writer in self._writers:
+            try:
+                writer.send(None)
+            except OSError:
+                pass  # 工作进程已退出
+            writer.close(timeout=2)
+        for process, conn in self._workers:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        for index in list(self._pending):
+            self._on_worker_closed(index)
+        self._workers.clear()
+        self._writers.clear()
+
+
+# 全局实例：LIVEWAR_WORKERS > 0 时启用多进程模拟，否则为 None（进程内模拟）
+game_worker_pool: Optional[GameWorkerPool] = (
+    GameWorkerPool(settings.live_war.workers) if settings.live_war.workers > 0 else None
+)
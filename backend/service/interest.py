@@ -0,0 +1,123 @@
+"""
+LiveWar 视野裁剪（Area of Interest）
+
+说明：
+- 客户端通过 SET_VIEWPORT 上报视野矩形，广播时只下发视野外扩 margin 格范围内的单位 / 矿场 / 能量掉落
+- 实体按空间索引的桶分组，每个桶的实体每 tick 只序列化一次；每个视野拼接所覆盖桶的字节
+  （repeated 字段和 packed 列在线格式上可以直接拼接，解析时按出现顺序合并）
+- 基地、特效等公共字段对所有视野相同；视野裁剪帧另附 MinimapSummary 全图概览
+- 覆盖相同桶范围的视野共享同一份字节
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+from protos import game_pb2
+from service.state_frame import encode_length_delimited, encode_tag, encode_varint
+
+Cell = Tuple[int, int]
+CellRange = Tuple[int, int, int, int]  # (min_cx, min_cy, max_cx, max_cy)
+Viewport = Tuple[float, float, float, float]  # (x, y, width, height)
+
+_WIRE_VARINT = 0
+_ROOM_FIELD = game_pb2.GameStatePayload.DESCRIPTOR.fields_by_name["room"].number
+_PACKED_FIELD = game_pb2.GameStatePayload.DESCRIPTOR.fields_by_name["packed"].number
+_PACKED_FIELDS = game_pb2.PackedEntities.DESCRIPTOR.fields_by_name
+_PACKED_SCALE_FIELD = _PACKED_FIELDS["position_scale"].number
+_PACKED_UNITS_FIELD = _PACKED_FIELDS["units"].number
+_PACKED_MINE_FIELDS_FIELD = _PACKED_FIELDS["mine_fields"].number
+_PACKED_ENERGY_DROPS_FIELD = _PACKED_FIELDS["energy_drops"].number
+
+
+class AoiFrame:
+    """
+    一个 tick 的视野裁剪数据。
+
+    payload_common 为不含 room / packed 的 GameStatePayload（含 minimap）；
+    room_common 为不含单位 / 矿场 / 能量掉落的 Room；
+    room_cells 为桶 -> 该桶实体的 Room 字段字节（旧版格式）；
+    packed_cells 为桶 -> 该桶实体的 (PackedUnits, PackedMineFields, PackedEnergyDrops) 字节。
+    房间内没有对应格式的视野时，room_cells / packed_cells 为 None。
+    """
+
+    __slots__ = (
+        "cell_size", "margin", "payload_common", "room_common", "room_cells", "position_scale", "packed_cells",
+        "_bodies",
+    )
+
+    def __init__(
+        self,
+        cell_size: int,
+        margin: float,
+        payload_common: bytes,
+        room_common: bytes,
+        room_cells: Optional[Dict[Cell, bytes]],
+        position_scale: int,
+        packed_cells: Optional[Dict[Cell, Tuple[bytes, bytes, bytes]]],
+    ) -> None:
+        self.cell_size = cell_size
+        self.margin = margin
+        self.payload_common = payload_common
+        self.room_common = room_common
+        self.room_cells = room_cells
+        self.position_scale = position_scale
+        self.packed_cells = packed_cells
+        self._bodies: Dict[Tuple[CellRange, bool], bytes] = {}
+
+    def encoded_size(self) -> int:
+        """公共部分与各桶实体已序列化的字节数"""
+        size = len(self.payload_common) + len(self.room_common)
+        if self.room_cells is not None:
+            size += sum(len(data) for data in self.room_cells.values())
+        if self.packed_cells is not None:
+            size += sum(len(units) + len(mines) + len(drops) for units, mines, drops in self.packed_cells.values())
+        return size
+
+    def cell_range(self, viewport: Viewport) -> CellRange:
+        """视野（外扩 margin）覆盖的桶范围"""
+        x, y, width, height = viewport
+        size, margin = self.cell_size, self.margin
+        return (
+            math.floor((x - margin) / size),
+            math.floor((y - margin) / size),
+            math.floor((x + width + margin) / size),
+            math.floor((y + height + margin) / size),
+        )
+
+    def body(self, cell_range: CellRange, packed: bool) -> bytes:
+        """桶范围内实体组成的 GameStatePayload 字节（不含 player 字段）"""
+        # 房间内只构建了一种格式时退回另一种（连接能力刚变化、房间编码尚未更新）
+        packed = self.packed_cells is not None and (packed or self.room_cells is None)
+        key = (cell_range, packed)
+        data = self._bodies.get(key)
+        if data is None:
+            data = self._packed_body(cell_range) if packed else self._room_body(cell_range)
+            self._bodies[key] = data
+        return data
+
+    @staticmethod
+    def _select(cells: Dict[Cell, object], cell_range: CellRange) -> list:
+        min_cx, min_cy, max_cx, max_cy = cell_range
+        return [
+            data for (cx, cy), data in cells.items()
+            if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy
+        ]
+
+    def _room_body(self, cell_range: CellRange) -> bytes:
+        entities = b"".join(self._select(self.room_cells, cell_range))
+        return self.payload_common + encode_length_delimited(_ROOM_FIELD, self.room_common + entities)
+
+    def _packed_body(self, cell_range: CellRange) -> bytes:
+        selected = self._select(self.packed_cells, cell_range)
+        packed = (
+            encode_tag(_PACKED_SCALE_FIELD, _WIRE_VARINT)
+            + encode_varint(self.position_scale)
+            + encode_length_delimited(_PACKED_UNITS_FIELD, b"".join(cell[0] for cell in selected))
+            + encode_length_delimited(_PACKED_MINE_FIELDS_FIELD, b"".join(cell[1] for cell in selected))
+            + encode_length_delimited(_PACKED_ENERGY_DROPS_FIELD, b"".join(cell[2] for cell in selected))
+        )
+        return (
+            self.payload_common
+            + encode_length_delimited(_ROOM_FIELD, self.room_common)
+            + encode_length_delimited(_PACKED_FIELD, packed)
+        )
@@ -0,0 +1,284 @@
+"""
+LiveWar 地图生成与预生成地图池
+
+说明：
+- generate_map 是纯函数：同样的 (宽, 高, 基地位置, seed) 总是得到同样的地形和湖泊
+- 安装了 numpy 时，初始噪声由 np.random.default_rng(seed) 一次生成整张网格，地形平滑（3 轮元胞自动机）
+  按整张网格向量化计算；否则用 random.Random(seed) 逐格生成噪声并逐格平滑。
+  两种实现的随机数序列不同：同一个 seed 在有无 numpy 时得到的地图不同（同一环境内可复现）
+- MapPool 按地图尺寸保留少量已生成的地图，取走后在线程池中补充，
+  重置游戏 / 首次加入房间时不需要在事件循环里生成地图。
+  确定性模式下地图种子由 next_map_seed 逐张推导，下一张可以提前在后台按种子生成（prefetch）
+"""
+
+import asyncio
+import math
+import random
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from service.terrain import TERRAIN_DIRT, TERRAIN_GRASS
+
+try:
+    import numpy as np
+except ImportError:  # numpy 未安装时逐格平滑
+    np = None
+
+Point = Tuple[float, float]
+
+_SMOOTH_ITERATIONS = 3
+_LAKE_BASE_CLEARANCE = 8  # 湖泊中心与基地的最小距离
+_PREFETCH_LIMIT = 32  # 按种子预生成的地图最多保留的张数（房间释放后未取走的会被淘汰）
+
+
+@dataclass(slots=True)
+class MapData:
+    """一张生成好的静态地图"""
+
+    seed: int
+    width: int
+    height: int
+    terrain: bytearray  # 行优先（y * width + x），每格 0(草地) or 1(泥土)
+    lakes: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def default_bases(width: int, height: int) -> Tuple[Point, Point]:
+    """默认基地位置：红方左下角，蓝方右上角"""
+    return (8, height - 8), (width - 8, 8)
+
+
+def next_map_seed(seed: int) -> int:
+    """确定性模式下一张地图的种子（由当前地图种子推导，可以提前知道）"""
+    return random.Random(seed).getrandbits(32)
+
+
+def generate_map(width: int, height: int, seed: int, bases: Sequence[Point] = ()) -> MapData:
+    """生成地形（草地 / 泥土）和 3-5 个湖泊；湖泊避开 bases 中的基地"""
+    rng = random.Random(seed)
+
+    # 1. 初始随机地形，然后平滑：多次迭代，让相邻格子更可能相同
+    if np is not None:
+        noise = np.random.default_rng(seed).random((height, width))
+        grid = np.where(noise < 0.5, TERRAIN_GRASS, TERRAIN_DIRT).astype(np.int16)
+        terrain = _smooth_numpy(grid)
+    else:
+        # 按列遍历，与原逐格实现的随机数顺序一致
+        terrain = bytearray(width * height)
+        for x in range(width):
+            for y in range(height):
+                terrain[y * width + x] = TERRAIN_GRASS if rng.random() < 0.5 else TERRAIN_DIRT
+        terrain = _smooth_python(terrain, width, height)
+
+    # 2. 湖泊
+    lakes = _generate_lakes(rng, width, height, bases)
+    return MapData(seed=seed, width=width, height=height, terrain=terrain, lakes=lakes)
+
+
+def _smooth_python(terrain: bytearray, width: int, height: int) -> bytearray:
+    for _ in range(_SMOOTH_ITERATIONS):
+        new_terrain = bytearray(width * height)
+        for y in range(height):
+            for x in range(width):
+                # 统计周围8个格子（含自身）中泥土的数量
+                dirt_count = 0
+                total = 0
+                for ny in range(max(0, y - 1), min(height, y + 2)):
+                    row = ny * width
+                    for nx in range(max(0, x - 1), min(width, x + 2)):
+                        dirt_count += terrain[row + nx]
+                        total += 1
+                grass_count = total - dirt_count
+
+                # 如果周围同类型格子多，则保持或改变为该类型
+                if grass_count > dirt_count:
+                    new_terrain[y * width + x] = TERRAIN_GRASS
+                elif dirt_count > grass_count:
+                    new_terrain[y * width + x] = TERRAIN_DIRT
+                else:
+                    new_terrain[y * width + x] = terrain[y * width + x]
+        terrain = new_terrain
+    return terrain
+
+
+def _window_sum(grid: "np.ndarray") -> "np.ndarray":
+    """每格 3x3 邻域（含自身，越界部分不计）的和"""
+    height, width = grid.shape
+    padded = np.pad(grid, 1)
+    total = np.zeros_like(grid)
+    for dy in range(3):
+        for dx in range(3):
+            total += padded[dy:dy + height, dx:dx + width]
+    return total
+
+
+def _smooth_numpy(grid: "np.ndarray") -> bytearray:
+    total = _window_sum(np.ones_like(grid))
+    for _ in range(_SMOOTH_ITERATIONS):
+        dirt = _window_sum(grid)
+        grass = total - dirt
+        grid = np.where(grass > dirt, TERRAIN_GRASS, np.where(dirt > grass, TERRAIN_DIRT, grid))
+    return bytearray(grid.astype(np.uint8).tobytes())
+
+
+def _generate_lakes(
+    rng: random.Random, width: int, height: int, bases: Sequence[Point]
+) -> List[Tuple[int, int]]:
+    """生成3-5个湖泊，每个湖泊由多个格子组成"""
+    lakes: List[Tuple[int, int]] = []
+    base_cells = {(int(bx), int(by)) for bx, by in bases}
+    num_lakes = rng.randint(3, 5)
+
+    for _ in range(num_lakes):
+        # 随机选择湖泊中心位置（避免在基地附近）
+        attempts = 0
+        while attempts < 50:
+            center_x = rng.randint(10, width - 10)
+            center_y = rng.randint(10, height - 10)
+
+            # 确保不在基地附近（至少距离基地8格）
+            if any(math.hypot(center_x - bx, center_y - by) < _LAKE_BASE_CLEARANCE for bx, by in bases):
+                attempts += 1
+                continue
+
+            # 生成湖泊（不规则形状，3-6格大小），使用简单的洪水填充算法
+            lake_size = rng.randint(3, 6)
+            lake_cells = []
+            visited: Set[Tuple[int, int]] = set()
+            queue = [(center_x, center_y)]
+
+            while queue and len(lake_cells) < lake_size:
+                x, y = queue.pop(0)
+                if (x, y) in visited:
+                    continue
+                if x < 0 or x >= width or y < 0 or y >= height:
+                    continue
+                # 确保不在基地上
+                if (x, y) in base_cells:
+                    continue
+
+                visited.add((x, y))
+                lake_cells.append((x, y))
+
+                # 随机添加相邻格子（70%概率）
+                neighbors = [
+                    (x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1),
+                    (x + 1, y + 1), (x - 1, y - 1), (x + 1, y - 1), (x - 1, y + 1)
+                ]
+                rng.shuffle(neighbors)
+                for nx, ny in neighbors[:rng.randint(2, 4)]:
+                    if (nx, ny) not in visited and rng.random() < 0.7:
+                        queue.append((nx, ny))
+
+            if lake_cells:  # 确保生成了至少一个格子
+                lakes.extend(lake_cells)
+                break  # 成功生成湖泊
+
+    return lakes
+
+
+class MapPool:
+    """按地图尺寸保留若干张预生成地图，取走后在后台线程补充"""
+
+    def __init__(self, size: int = 2) -> None:
+        self.size = size
+        self._ready: Dict[Tuple[int, int], Deque[MapData]] = {}
+        self._pending: Dict[Tuple[int, int], int] = {}
+        # 按种子提前生成的地图：(宽, 高, seed) -> 后台生成的 Future
+        self._prefetched: "OrderedDict[Tuple[int, int, int], asyncio.Future[MapData]]" = OrderedDict()
+        self._seeds = random.Random()
+        self.hits = 0
+        self.misses = 0
+
+    def _new_seed(self) -> int:
+        return self._seeds.getrandbits(32)
+
+    def take(self, width: int, height: int, seed: Optional[int] = None) -> MapData:
+        """
+        取一张地图。
+
+        指定 seed 时返回该 seed 的地图（用于复现）：已通过 prefetch 在后台生成好时直接使用，否则同步生成。
+        不指定时优先使用池中的地图，池为空时同步生成一张，并触发后台补充。
+        """
+        if seed is not None:
+            result = self._take_prefetched(width, height, seed)
+            if result is not None:
+                self.hits += 1
+                return result
+            self.misses += 1
+            return generate_map(width, height, seed, default_bases(width, height))
+        ready = self._ready.get((width, height))
+        if ready:
+            self.hits += 1
+            result = ready.popleft()
+        else:
+            self.misses += 1
+            result = generate_map(width, height, self._new_seed(), default_bases(width, height))
+        self.refill(width, height)
+        return result
+
+    def refill(self, width: int, height: int) -> None:
+        """在默认线程池中补充到 size 张；没有运行中的事件循环时不做任何事（下次取用时同步生成）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        key = (width, height)
+        ready = self._ready.setdefault(key, deque())
+        missing = self.size - len(ready) - self._pending.get(key, 0)
+        for _ in range(missing):
+            self._pending[key] = self._pending.get(key, 0) + 1
+            future = loop.run_in_executor(
+                None, generate_map, width, height, self._new_seed(), default_bases(width, height)
+            )
+            future.add_done_callback(lambda f, key=key: self._on_generated(key, f))
+
+    def prefetch(self, width: int, height: int, seed: int) -> None:
+        """在默认线程池中提前按 seed 生成一张地图，供之后的 take(width, height, seed) 使用"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        key = (width, height, seed)
+        if key in self._prefetched:
+            return
+        self._prefetched[key] = loop.run_in_executor(
+            None, generate_map, width, height, seed, default_bases(width, height)
+        )
+        while len(self._prefetched) > _PREFETCH_LIMIT:
+            self._prefetched.popitem(last=False)[1].cancel()
+
+    def _take_prefetched(self, width: int, height: int, seed: int) -> Optional[MapData]:
+        """取出已生成好的预取地图；还在生成中或生成失败时返回 None（由调用方同步生成）"""
+        future = self._prefetched.pop((width, height, seed), None)
+        if future is None:
+            return None
+        if not future.done():
+            future.cancel()
+            return None
+        if future.cancelled():
+            return None
+        error = future.exception()
+        if error is not None:
+            print(f"[MapPool] Error generating map {(width, height)} seed {seed}: {error}", flush=True)
+            return None
+        return future.result()
+
+    def _on_generated(self, key: Tuple[int, int], future: "asyncio.Future[MapData]") -> None:
+        self._pending[key] -= 1
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"[MapPool] Error generating map {key}: {error}", flush=True)
+            return
+        self._ready.setdefault(key, deque()).append(future.result())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "ready": sum(len(ready) for ready in self._ready.values()),
+            "pending": sum(self._pending.values()),
+            "prefetched": len(self._prefetched),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,136 @@
+"""
+LiveWar 占用网格
+
+说明：
+- obstacles：每个格子的静态 / 半静态障碍计数（墙壁、湖泊、矿场、基地），按 y * width + x 索引
+- 单位计数：每个格子中的普通单位数和工程师数，替代"每格最多 2 个单位 / 2 个工程师"的线性扫描
+- 障碍变化时 version 递增，供寻路缓存等派生数据判断是否失效
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+
+class OccupancyGrid:
+    """按格子索引的障碍与单位占用计数"""
+
+    def __init__(self, width: int = 60, height: int = 60) -> None:
+        self.width = width
+        self.height = height
+        self.obstacles = bytearray(width * height)
+        self.unit_counts = array("H", bytes(2 * width * height))
+        self.engineer_counts = array("H", bytes(2 * width * height))
+        # unit_id -> (格子索引, 是否工程师)；越界单位不计入
+        self._unit_cells: Dict[int, Tuple[int, bool]] = {}
+        # 障碍版本号：任何障碍增删都会递增
+        self.version = 0
+
+    def _index(self, grid_x: int, grid_y: int) -> Optional[int]:
+        if 0 <= grid_x < self.width and 0 <= grid_y < self.height:
+            return grid_y * self.width + grid_x
+        return None
+
+    @staticmethod
+    def cell_of(x: float, y: float) -> Cell:
+        return int(math.floor(x)), int(math.floor(y))
+
+    # ========== 障碍 ==========
+
+    def rebuild_obstacles(self, width: int, height: int, cells: Iterable[Cell]) -> None:
+        """按给定尺寸和障碍格子整体重建（地图生成 / 重置时调用）"""
+        if width != self.width or height != self.height:
+            self.width = width
+            self.height = height
+            self.unit_counts = array("H", bytes(2 * width * height))
+            self.engineer_counts = array("H", bytes(2 * width * height))
+            self._unit_cells.clear()
+        self.obstacles = bytearray(width * height)
+        for grid_x, grid_y in cells:
+            idx = self._index(grid_x, grid_y)
+            if idx is not None and self.obstacles[idx] < 255:
+                self.obstacles[idx] += 1
+        self.version += 1
+
+    def add_obstacle(self, grid_x: int, grid_y: int) -> None:
+        idx = self._index(grid_x, grid_y)
+        if idx is None:
+            return
+        if self.obstacles[idx] < 255:
+            self.obstacles[idx] += 1
+        self.version += 1
+
+    def remove_obstacle(self, grid_x: int, grid_y: int) -> None:
+        idx = self._index(grid_x, grid_y)
+        if idx is None or self.obstacles[idx] == 0:
+            return
+        self.obstacles[idx] -= 1
+        self.version += 1
+
+    def is_obstacle(self, grid_x: int, grid_y: int) -> bool:
+        idx = self._index(grid_x, grid_y)
+        return idx is not None and self.obstacles[idx] > 0
+
+    # ========== 单位计数 ==========
+
+    def rebuild_units(self, units: Iterable) -> None:
+        self.unit_counts = array("H", bytes(2 * self.width * self.height))
+        self.engineer_counts = array("H", bytes(2 * self.width * self.height))
+        self._unit_cells.clear()
+        for unit in units:
+            self.add_unit(unit)
+
+    def add_unit(self, unit) -> None:
+        grid_x, grid_y = self.cell_of(unit.x, unit.y)
+        idx = self._index(grid_x, grid_y)
+        if idx is None:
+            return
+        is_engineer = unit.type == "engineer"
+        if is_engineer:
+            self.engineer_counts[idx] += 1
+        else:
+            self.unit_counts[idx] += 1
+        self._unit_cells[unit.id] = (idx, is_engineer)
+
+    def remove_unit(self, unit) -> None:
+        entry = self._unit_cells.pop(unit.id, None)
+        if entry is None:
+            return
+        idx, is_engineer = entry
+        if is_engineer:
+            self.engineer_counts[idx] -= 1
+        else:
+            self.unit_counts[idx] -= 1
+
+    def move_unit(self, unit) -> None:
+        """单位移动后调用：格子变化时更新计数"""
+        entry = self._unit_cells.get(unit.id)
+        grid_x, grid_y = self.cell_of(unit.x, unit.y)
+        if entry is not None and entry[0] == self._index(grid_x, grid_y):
+            return
+        self.remove_unit(unit)
+        self.add_unit(unit)
+
+    def units_in_cell(self, grid_x: int, grid_y: int, exclude_unit_id: Optional[int] = None) -> int:
+        """格子中的非工程师单位数（可排除自身）"""
+        idx = self._index(grid_x, grid_y)
+        if idx is None:
+            return 0
+        count = self.unit_counts[idx]
+        entry = self._unit_cells.get(exclude_unit_id)
+        if entry is not None and entry[0] == idx and not entry[1]:
+            count -= 1
+        return count
+
+    def engineers_in_cell(self, grid_x: int, grid_y: int, exclude_unit_id: Optional[int] = None) -> int:
+        """格子中的工程师数（可排除自身）"""
+        idx = self._index(grid_x, grid_y)
+        if idx is None:
+            return 0
+        count = self.engineer_counts[idx]
+        entry = self._unit_cells.get(exclude_unit_id)
+        if entry is not None and entry[0] == idx and entry[1]:
+            count -= 1
+        return count
@@ -0,0 +1,73 @@
+"""
+LiveWar 局部 A* 结果缓存
+
+说明：
+- 键为 (起点格子, 目标格子, 单位阻挡类别, 搜索参数)，值为 A* 返回的下一步
+- 找不到路径（None）不缓存：失败通常由临时的单位拥堵造成，下次应重新搜索
+- 有界 LRU：超过 max_size 时淘汰最久未使用的条目
+- 绑定占用网格的障碍版本号：墙壁 / 湖泊 / 矿场变化后整体清空
+- 记录命中 / 未命中次数，便于根据实际对局调整缓存大小
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class PathCache:
+    """按障碍版本失效的有界 LRU 缓存"""
+
+    def __init__(self, max_size: int = 512) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._version = None
+
+    def sync_version(self, version: int) -> None:
+        """障碍版本变化时丢弃全部条目"""
+        if self._version != version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, float]]:
+        """返回缓存的下一步；未命中时返回 None"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        """缓存的结果已不可用（如下一步被单位占住）时调用；把这次查询记为未命中"""
+        if self._entries.pop(key, None) is not None:
+            self.hits -= 1
+            self.misses += 1
+
+    def put(self, key: Hashable, value: Tuple[float, float]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
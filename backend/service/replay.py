@@ -0,0 +1,249 @@
+"""
+LiveWar 对局录像与回放
+
+说明：
+- 房间的全部随机性来自房间随机数（RoomGameState.rng，由 seed 初始化）和地图种子，
+  游戏逻辑只使用按 tick 推导的模拟时钟；墙上时间只在对局开始时读取一次（随命令一起记录）
+- 因此一局对局可以由 (房间种子, 地图种子序列, 按 tick 排列的客户端命令) 完整复现；
+  唯一依赖 CPU 计时的 AI 决策预算截断也记录在录像中，回放时按记录截断
+- MatchRecording 记录这些输入，并每隔若干 tick 记录一次状态校验和；
+  replay_match 在无网络、无广播、不等待的情况下全速重跑对局，并逐个比对校验和
+- 录像在房间释放时写入 LIVEWAR_RECORD_DIR，可用 python -m service.replay <录像文件> 回放
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from protos import game_pb2
+from service.map_gen import MapData, default_bases, generate_map
+
+
+@dataclass(slots=True)
+class RecordedCommand:
+    """一条客户端命令：step 为命令到达前房间已推进的 tick 数"""
+
+    step: int
+    now: float
+    user_id: Optional[int]
+    username: str
+    data: bytes  # 序列化后的 GameMessage
+
+
+@dataclass
+class MatchRecording:
+    """一个房间从创建到释放期间的全部输入"""
+
+    room_id: int
+    seed: int  # 房间随机数种子
+    base_seed: Optional[int]  # 录制时的确定性模式全局种子（None 为正常模式）
+    tick_rate: float
+    numpy_units: bool
+    steps: int = 0  # 已推进的 tick 数（包括对局结束后等待重置的 tick）
+    map_seeds: List[int] = field(default_factory=list)
+    commands: List[RecordedCommand] = field(default_factory=list)
+    checksums: List[Tuple[int, int]] = field(default_factory=list)  # (step, 状态的 crc32)
+    decision_cuts: Dict[int, int] = field(default_factory=dict)  # step -> AI 预算截断时已决策的单位数
+    created_at: float = field(default_factory=time.time)
+
+    def record_command(self, now: float, user_id: Optional[int], username: str, data: bytes) -> None:
+        self.commands.append(RecordedCommand(self.steps, now, user_id, username, data))
+
+    def record_checksum(self, state_bytes: bytes) -> None:
+        self.checksums.append((self.steps, zlib.crc32(state_bytes)))
+
+    # ========== 读写 ==========
+
+    def to_dict(self) -> dict:
+        return {
+            "room_id": self.room_id,
+            "seed": self.seed,
+            "base_seed": self.base_seed,
+            "tick_rate": self.tick_rate,
+            "numpy_units": self.numpy_units,
+            "steps": self.steps,
+            "map_seeds": self.map_seeds,
+            "commands": [
+                [c.step, c.now, c.user_id, c.username, base64.b64encode(c.data).decode("ascii")]
+                for c in self.commands
+            ],
+            "checksums": self.checksums,
+            "decision_cuts": self.decision_cuts,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MatchRecording":
+        return cls(
+            room_id=data["room_id"],
+            seed=data["seed"],
+            base_seed=data.get("base_seed"),
+            tick_rate=data["tick_rate"],
+            numpy_units=data.get("numpy_units", False),
+            steps=data["steps"],
+            map_seeds=list(data["map_seeds"]),
+            commands=[
+                RecordedCommand(step, now, user_id, username, base64.b64decode(raw))
+                for step, now, user_id, username, raw in data["commands"]
+            ],
+            checksums=[tuple(item) for item in data["checksums"]],
+            decision_cuts={int(step): count for step, count in data.get("decision_cuts", {}).items()},
+            created_at=data.get("created_at", 0.0),
+        )
+
+    def save(self, directory: str) -> str:
+        """写入 <directory>/room<id>-<创建时间>.json，返回文件路径"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"room{self.room_id}-{int(self.created_at * 1000)}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "MatchRecording":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+class ReplayDivergence(Exception):
+    """回放结果与录像不一致"""
+
+
+class ReplayMapSource:
+    """回放时代替 MapPool：按录像中的顺序返回同样种子的地图"""
+
+    def __init__(self, seeds: List[int]) -> None:
+        self._seeds: Deque[int] = deque(seeds)
+
+    def take(self, width: int, height: int, seed: Optional[int] = None) -> MapData:
+        if self._seeds:
+            seed = self._seeds.popleft()
+        if seed is None:
+            raise ReplayDivergence("录像中的地图种子已用完")
+        return generate_map(width, height, seed, default_bases(width, height))
+
+    def refill(self, width: int, height: int) -> None:
+        pass
+
+    def prefetch(self, width: int, height: int, seed: int) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"ready": len(self._seeds), "pending": 0, "hits": 0, "misses": 0}
+
+
+@dataclass
+class ReplayResult:
+    steps: int
+    commands: int
+    duration: float  # 回放耗时（秒）
+    checksums_matched: int
+    winner: str
+    replayed: MatchRecording  # 回放过程重新录制的结果，可与原录像逐项比较
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.steps / self.duration if self.duration > 0 else 0.0
+
+
+async def replay_match(recording: MatchRecording, verify: bool = True):
+    """
+    全速重跑一局录像（不启动调度器、不广播、不等待），返回 (ReplayResult, 回放后的 LiveWarGameManager)。
+
+    verify 为 True 时逐个比对状态校验和，第一次不一致即抛出 ReplayDivergence。
+    """
+    from service.game_manager import GAME_RULES, SIMULATION_CONFIG, LiveWarGameManager
+
+    if abs(1.0 / GAME_RULES["tick_interval"] - recording.tick_rate) > 1e-9:
+        print(
+            f"[Replay] Warning: recorded at {recording.tick_rate}Hz, replaying at {1.0 / GAME_RULES['tick_interval']}Hz",
+            flush=True,
+        )
+    if SIMULATION_CONFIG["numpy_units"] != recording.numpy_units:
+        print("[Replay] Warning: numpy_units differs from the recording", flush=True)
+
+    room_id = recording.room_id
+    gm = LiveWarGameManager(seed=recording.base_seed, record=True)
+    gm.map_pool = ReplayMapSource(recording.map_seeds)
+    gm.room_seeds[room_id] = recording.seed
+    gm.replay_decision_cuts[room_id] = recording.decision_cuts
+
+    expected = recording.checksums
+    matched = 0
+
+    def check() -> None:
+        nonlocal matched
+        replayed = gm.recordings[room_id].checksums
+        while matched < min(len(replayed), len(expected)):
+            if verify and tuple(replayed[matched]) != tuple(expected[matched]):
+                step, got = replayed[matched]
+                raise ReplayDivergence(
+                    f"状态在第 {step} 个 tick 出现分歧（录像 {expected[matched][1]:#x}，回放 {got:#x}）"
+                )
+            matched += 1
+
+    async def advance_to(step: int) -> None:
+        replayed = gm.recordings.get(room_id)
+        while replayed is not None and replayed.steps < step:
+            before = replayed.steps
+            await gm._process_tick(room_id)
+            if replayed.steps == before:
+                raise ReplayDivergence(f"第 {before} 个 tick 时对局未在进行，无法推进到第 {step} 个 tick")
+            check()
+
+    started_at = time.perf_counter()
+    for command in recording.commands:
+        await advance_to(command.step)
+        gm.handle_envelope_from_client(
+            room_id=room_id,
+            user_id=command.user_id,
+            username=command.username,
+            msg=game_pb2.GameMessage.FromString(command.data),
+            now=command.now,
+        )
+        # 回放不使用全局调度器：由 advance_to 直接推进 tick
+        gm._stop_game_loop(room_id)
+    await advance_to(recording.steps)
+    duration = time.perf_counter() - started_at
+
+    replayed = gm.recordings.get(room_id)
+    if replayed is None:
+        raise ReplayDivergence("录像中没有任何命令")
+    state = gm.room_states[room_id]
+    result = ReplayResult(
+        steps=replayed.steps,
+        commands=len(recording.commands),
+        duration=duration,
+        checksums_matched=matched,
+        winner=state.winner,
+        replayed=replayed,
+    )
+    return result, gm
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="全速回放 LiveWar 对局录像")
+    parser.add_argument("path", help="录像文件（LIVEWAR_RECORD_DIR 下的 room<id>-<时间>.json）")
+    parser.add_argument("--no-verify", action="store_true", help="不比对状态校验和")
+    args = parser.parse_args()
+
+    recording = MatchRecording.load(args.path)
+    result, _ = asyncio.run(replay_match(recording, verify=not args.no_verify))
+    print(
+        f"room {recording.room_id}: {result.steps} ticks, {result.commands} commands, "
+        f"{result.duration:.3f}s ({result.ticks_per_second:.0f} ticks/s), "
+        f"checksums {result.checksums_matched}/{len(recording.checksums)} matched, "
+        f"winner={result.winner or '-'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+LiveWar 单位空间索引（均匀网格哈希）
+
+说明：
+- 地图按 cell_size × cell_size 的桶划分，每个桶保存其中的单位（unit_id -> unit）
+- 每 tick 开始时整体重建，单位出生 / 死亡 / 移动后增量维护，保证与 state.units 一致
+- 提供半径查询（复制或不复制候选列表）和最近单位查询，替代对 state.units 的线性扫描
+"""
+
+import math
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+
+class SpatialHash:
+    """均匀网格哈希，元素需要有 id / x / y 属性"""
+
+    def __init__(self, cell_size: int = 4) -> None:
+        self.cell_size = cell_size
+        self._buckets: Dict[Cell, Dict[int, object]] = {}
+        self._unit_cells: Dict[int, Cell] = {}
+        # 出现过单位的桶坐标范围 (min_cx, min_cy, max_cx, max_cy)，用于限制最近邻搜索的环数
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._unit_cells)
+
+    def cell_of(self, x: float, y: float) -> Cell:
+        """坐标所在的桶"""
+        return int(math.floor(x)) // self.cell_size, int(math.floor(y)) // self.cell_size
+
+    # ========== 维护 ==========
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._unit_cells.clear()
+        self._bounds = None
+
+    def _place(self, unit, cell: Cell) -> None:
+        self._buckets.setdefault(cell, {})[unit.id] = unit
+        self._unit_cells[unit.id] = cell
+        cx, cy = cell
+        if self._bounds is None:
+            self._bounds = (cx, cy, cx, cy)
+        else:
+            min_cx, min_cy, max_cx, max_cy = self._bounds
+            if cx < min_cx or cy < min_cy or cx > max_cx or cy > max_cy:
+                self._bounds = (min(min_cx, cx), min(min_cy, cy), max(max_cx, cx), max(max_cy, cy))
+
+    def rebuild(self, units: Iterable) -> None:
+        """按当前位置整体重建"""
+        self.clear()
+        for unit in units:
+            self.insert(unit)
+
+    def insert(self, unit) -> None:
+        self._place(unit, self.cell_of(unit.x, unit.y))
+
+    def remove(self, unit) -> None:
+        cell = self._unit_cells.pop(unit.id, None)
+        if cell is None:
+            return
+        bucket = self._buckets.get(cell)
+        if bucket is not None:
+            bucket.pop(unit.id, None)
+            if not bucket:
+                del self._buckets[cell]
+
+    def update(self, unit) -> None:
+        """单位移动后调用：跨桶时迁移"""
+        cell = self.cell_of(unit.x, unit.y)
+        old_cell = self._unit_cells.get(unit.id)
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            self.remove(unit)
+        self._place(unit, cell)
+
+    # ========== 查询 ==========
+
+    def cells(self) -> Iterable[Tuple[Cell, Iterable]]:
+        """所有非空桶：(桶坐标, 桶内单位)，用于按区域分组处理"""
+        return ((cell, bucket.values()) for cell, bucket in self._buckets.items())
+
+    def query_radius(self, x: float, y: float, radius: float) -> List:
+        """
+        返回半径范围所覆盖的桶中的所有单位（候选集，调用方仍需做精确距离判断）。
+        返回列表副本，调用方在遍历时可以安全地增删单位。
+        """
+        min_cx, min_cy = self.cell_of(x - radius, y - radius)
+        max_cx, max_cy = self.cell_of(x + radius, y + radius)
+        result = []
+        buckets = self._buckets
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = buckets.get((cx, cy))
+                if bucket:
+                    result.extend(bucket.values())
+        return result
+
+    def iter_radius(self, x: float, y: float, radius: float) -> Iterator:
+        """
+        与 query_radius 覆盖相同的桶，但直接遍历桶而不复制列表。
+        调用方在增删单位（例如击杀目标）后必须停止遍历。
+        """
+        min_cx, min_cy = self.cell_of(x - radius, y - radius)
+        max_cx, max_cy = self.cell_of(x + radius, y + radius)
+        buckets = self._buckets
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = buckets.get((cx, cy))
+                if bucket:
+                    yield from bucket.values()
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        predicate: Callable[[object], bool],
+        max_radius: Optional[float] = None,
+    ):
+        """
+        按桶环逐层向外搜索满足 predicate 的最近单位。
+
+        第 r 环之外的单位距离至少为 r * cell_size，一旦当前最优距离不超过该值即可停止。
+        """
+        if not self._buckets:
+            return None
+        cx0, cy0 = self.cell_of(x, y)
+        min_cx, min_cy, max_cx, max_cy = self._bounds
+        max_ring = max(cx0 - min_cx, cy0 - min_cy, max_cx - cx0, max_cy - cy0, 0)
+        if max_radius is not None:
+            max_ring = min(max_ring, int(math.ceil(max_radius / self.cell_size)) + 1)
+
+        best = None
+        best_dist_sq = float("inf")
+        buckets = self._buckets
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(cx0, cy0, ring):
+                bucket = buckets.get(cell)
+                if not bucket:
+                    continue
+                for unit in bucket.values():
+                    if not predicate(unit):
+                        continue
+                    dist_sq = (unit.x - x) ** 2 + (unit.y - y) ** 2
+                    if dist_sq < best_dist_sq:
+                        best_dist_sq = dist_sq
+                        best = unit
+            if best is not None and math.sqrt(best_dist_sq) <= ring * self.cell_size:
+                break
+
+        if best is not None and max_radius is not None and math.sqrt(best_dist_sq) > max_radius:
+            return None
+        return best
+
+    @staticmethod
+    def _ring_cells(cx0: int, cy0: int, ring: int) -> Iterable[Cell]:
+        """切比雪夫距离恰好为 ring 的所有桶"""
+        if ring == 0:
+            yield cx0, cy0
+            return
+        for cx in range(cx0 - ring, cx0 + ring + 1):
+            yield cx, cy0 - ring
+            yield cx, cy0 + ring
+        for cy in range(cy0 - ring + 1, cy0 + ring):
+            yield cx0 - ring, cy
+            yield cx0 + ring, cy
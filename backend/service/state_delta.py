@@ -0,0 +1,82 @@
+"""
+LiveWar 增量状态编码
+
+说明：
+- 每个房间一个编码器，记录上一次广播的实体（按 id 保存序列化后的字节）
+- 每次广播只输出新增 / 变化 / 移除的实体，每隔 keyframe_interval 帧输出一次关键帧
+- 增量基于上一次广播（而不是每个连接），因此同一帧的增量可以被所有支持增量的连接共享；
+  基线以帧序号（frame_seq）标识，没有收到基线帧的连接（新加入、漏帧）由房间服务改发完整状态（见 StateFrame.for_user）
+- 治疗 / 子弹特效是一次性事件，每帧只包含新事件：原样放入增量，不记录基线也不产生移除列表
+"""
+
+from typing import Dict, Optional, Tuple
+
+from protos import game_pb2
+
+# Room 中按 id 做增量的重复字段：字段名 -> RoomDelta 中的移除列表字段名
+_ENTITY_FIELDS = {
+    "units": "removed_unit_ids",
+    "mine_fields": "removed_mine_field_ids",
+    "energy_drops": "removed_energy_drop_ids",
+}
+# Room 中的一次性事件字段：每帧原样下发
+_EVENT_FIELDS = ("heal_effects", "bullet_effects")
+_BASE_FIELDS = ("red_base", "blue_base")
+
+
+class StateDeltaEncoder:
+    """单个房间的增量编码器"""
+
+    def __init__(self, keyframe_interval: int) -> None:
+        self.keyframe_interval = keyframe_interval
+        self.base_seq: Optional[int] = None
+        self.frames_since_keyframe = 0
+        # 字段名 -> (实体 id -> 序列化字节)
+        self._entities: Dict[str, Dict[str, bytes]] = {name: {} for name in _ENTITY_FIELDS}
+        self._bases: Dict[str, bytes] = {}
+
+    def reset(self) -> None:
+        """丢弃基线，下一帧强制为关键帧"""
+        self.base_seq = None
+
+    def encode(self, seq: int, room: game_pb2.Room) -> Optional[Tuple[int, game_pb2.RoomDelta]]:
+        """
+        以 room 更新基线（seq 为本帧的帧序号）。
+
+        Returns:
+            (基线帧序号, RoomDelta)；本帧应作为关键帧发送时返回 None
+        """
+        keyframe = self.base_seq is None or self.frames_since_keyframe + 1 >= self.keyframe_interval
+        delta = None if keyframe else game_pb2.RoomDelta()
+
+        for name, removed_name in _ENTITY_FIELDS.items():
+            previous = self._entities[name]
+            current: Dict[str, bytes] = {}
+            for entity in getattr(room, name):
+                data = entity.SerializeToString()
+                current[entity.id] = data
+                if delta is not None and previous.get(entity.id) != data:
+                    getattr(delta, name).add().CopyFrom(entity)
+            if delta is not None:
+                getattr(delta, removed_name).extend(eid for eid in previous if eid not in current)
+            self._entities[name] = current
+
+        if delta is not None:
+            for name in _EVENT_FIELDS:
+                getattr(delta, name).extend(getattr(room, name))
+
+        for name in _BASE_FIELDS:
+            data = getattr(room, name).SerializeToString()
+            if delta is not None and self._bases.get(name) != data:
+                getattr(delta, name).CopyFrom(getattr(room, name))
+            self._bases[name] = data
+
+        if delta is None:
+            self.frames_since_keyframe = 0
+            self.base_seq = seq
+            return None
+
+        base_seq = self.base_seq
+        self.frames_since_keyframe += 1
+        self.base_seq = seq
+        return base_seq, delta
@@ -0,0 +1,183 @@
+"""
+LiveWar 状态帧（共享序列化）
+
+说明：
+- 每个 tick 只构建并序列化一次房间公共部分（GameStatePayload 去掉 player 字段）
+- 玩家私有的 Player 字段按 protobuf 线格式直接拼接到公共部分之后
+- 所有观战者共享同一份预先序列化好的 WsEnvelope 字节
+- 支持增量且收到过基线帧（base_seq）的连接取 delta_body，其余连接（新加入、漏帧）退化为完整状态
+- 支持紧凑编码的连接取 packed_body（实体按列、坐标定点化）
+- 设置了视野的连接从 aoi（见 service/interest.py）取只含视野内实体的字节
+- 每个房间只构建在线连接实际需要的编码（见 ENCODING_*）
+"""
+
+from typing import Dict, FrozenSet, Hashable, Optional, Tuple
+
+from protos import chat_pb2, game_pb2
+
+_WIRE_VARINT = 0
+_WIRE_LENGTH_DELIMITED = 2
+
+_PLAYER_FIELD = game_pb2.GameStatePayload.DESCRIPTOR.fields_by_name["player"].number
+_TYPE_FIELD = game_pb2.GameMessage.DESCRIPTOR.fields_by_name["type"].number
+_GAME_STATE_FIELD = game_pb2.GameMessage.DESCRIPTOR.fields_by_name["game_state"].number
+_ENVELOPE_GAME_FIELD = chat_pb2.WsEnvelope.DESCRIPTOR.fields_by_name["game"].number
+
+# 连接协商出的状态编码
+ENCODING_FULL = "full"  # 旧版完整状态
+ENCODING_DELTA = "delta"  # RoomDelta + 周期关键帧（关键帧即完整状态）
+ENCODING_PACKED = "packed"  # PackedEntities
+ENCODING_AOI = "aoi"  # 视野裁剪（旧版实体格式）
+ENCODING_AOI_PACKED = "aoi_packed"  # 视野裁剪（PackedEntities）
+# 房间未声明时的默认编码（与引入协商之前的行为一致）
+DEFAULT_ENCODINGS: FrozenSet[str] = frozenset({ENCODING_FULL, ENCODING_DELTA})
+
+
+def encode_varint(value: int) -> bytes:
+    """protobuf varint 编码（仅非负整数）"""
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def encode_tag(field_number: int, wire_type: int) -> bytes:
+    return encode_varint((field_number << 3) | wire_type)
+
+
+def encode_length_delimited(field_number: int, data: bytes) -> bytes:
+    """编码一个 length-delimited 字段（子消息 / bytes / string）"""
+    return encode_tag(field_number, _WIRE_LENGTH_DELIMITED) + encode_varint(len(data)) + data
+
+
+def wrap_game_payload(type_value: int, payload_field: int, payload: bytes) -> bytes:
+    """把已序列化的 GameMessage 负载包装成完整的 WsEnvelope 字节"""
+    game_msg = (
+        encode_tag(_TYPE_FIELD, _WIRE_VARINT)
+        + encode_varint(type_value)
+        + encode_length_delimited(payload_field, payload)
+    )
+    return encode_length_delimited(_ENVELOPE_GAME_FIELD, game_msg)
+
+
+class StateFrame:
+    """
+    一个 tick 的 GAME_STATE 帧。
+
+    body 为不含 player 字段的 GameStatePayload 序列化结果（房间内没有需要完整状态的连接时为 None）；
+    delta_body 为同一 tick 的增量版本（本帧是关键帧时为 None），基于帧序号为 base_seq 的帧；
+    seq 为本帧的帧序号（单独发给新连接的帧为 0）；
+    packed_body 为同一 tick 的紧凑编码版本（房间内没有声明 supports_packed 的连接时为 None）；
+    aoi 为视野裁剪数据 AoiFrame（房间内没有设置视野的连接时为 None）；
+    players 为房间内玩家 user_id -> Player，用于拼接玩家视角。
+    """
+
+    __slots__ = (
+        "room_id", "tick", "body", "delta_body", "packed_body", "aoi", "players", "seq", "base_seq",
+        "_spectator_bytes", "_player_bytes",
+    )
+
+    def __init__(
+        self,
+        room_id: int,
+        tick: int,
+        body: bytes,
+        players: Dict[int, game_pb2.Player],
+        delta_body: Optional[bytes] = None,
+        packed_body: Optional[bytes] = None,
+        aoi=None,
+        seq: int = 0,
+        base_seq: Optional[int] = None,
+    ) -> None:
+        self.room_id = room_id
+        self.tick = tick
+        self.body = body
+        self.delta_body = delta_body
+        self.packed_body = packed_body
+        self.aoi = aoi
+        self.players = players
+        self.seq = seq
+        self.base_seq = base_seq
+        # 视图 -> 字节；视图为编码名，或视野裁剪时的 (桶范围, 是否紧凑编码)
+        self._spectator_bytes: Dict[Hashable, bytes] = {}
+        self._player_bytes: Dict[Tuple[int, Hashable], bytes] = {}
+
+    def encoded_size(self) -> int:
+        """本帧已序列化的共享字节数（各编码版本之和，不含按连接拼接的 Player 字段）"""
+        size = sum(len(body) for body in (self.body, self.delta_body, self.packed_body) if body is not None)
+        if self.aoi is not None:
+            size += self.aoi.encoded_size()
+        return size
+
+    def holds_baseline(self, last_seq: Optional[int]) -> bool:
+        """持有帧序号 last_seq 的连接能否应用本帧的增量"""
+        return self.delta_body is not None and last_seq == self.base_seq
+
+    def is_baseline_view(self, packed: bool, viewport: Optional[Tuple[float, float, float, float]]) -> bool:
+        """连接收到的是否为完整状态或增量（收到后本帧即成为该连接的增量基线）"""
+        return self._select(True, packed, viewport) in (ENCODING_FULL, ENCODING_DELTA)
+
+    def _select(self, delta: bool, packed: bool, viewport: Optional[Tuple[float, float, float, float]]) -> Hashable:
+        """按连接能力选择本帧实际可用的视图"""
+        if viewport is not None and self.aoi is not None:
+            return self.aoi.cell_range(viewport), packed
+        if packed and self.packed_body is not None:
+            return ENCODING_PACKED
+        if delta and self.delta_body is not None:
+            return ENCODING_DELTA
+        if self.body is None and self.packed_body is not None:
+            return ENCODING_PACKED  # 只构建了紧凑编码（连接能力刚变化、房间编码尚未更新）
+        return ENCODING_FULL
+
+    def _wrap(self, player: game_pb2.Player, view: Hashable) -> bytes:
+        if view == ENCODING_PACKED:
+            body = self.packed_body
+        elif view == ENCODING_DELTA:
+            body = self.delta_body
+        elif view == ENCODING_FULL:
+            body = self.body
+        else:
+            body = self.aoi.body(*view)
+        payload = body + encode_length_delimited(_PLAYER_FIELD, player.SerializeToString())
+        return wrap_game_payload(game_pb2.GameMessage.GAME_STATE, _GAME_STATE_FIELD, payload)
+
+    def spectator_bytes(
+        self,
+        delta: bool = False,
+        packed: bool = False,
+        viewport: Optional[Tuple[float, float, float, float]] = None,
+    ) -> bytes:
+        """观战者视角（player 为空），视图相同的观战者共享同一份字节"""
+        view = self._select(delta, packed, viewport)
+        data = self._spectator_bytes.get(view)
+        if data is None:
+            data = self._wrap(game_pb2.Player(), view)
+            self._spectator_bytes[view] = data
+        return data
+
+    def for_user(
+        self,
+        user_id: Optional[int],
+        delta: bool = False,
+        packed: bool = False,
+        viewport: Optional[Tuple[float, float, float, float]] = None,
+    ) -> bytes:
+        """
+        返回指定用户应收到的完整 WsEnvelope 字节
+        （delta 表示该连接支持增量帧且持有本帧的基线（见 holds_baseline），packed 表示该连接支持紧凑编码，
+        viewport 为该连接上报的视野）
+        """
+        if user_id is None or user_id not in self.players:
+            return self.spectator_bytes(delta, packed, viewport)
+        view = self._select(delta, packed, viewport)
+        key = (user_id, view)
+        data = self._player_bytes.get(key)
+        if data is None:
+            data = self._wrap(self.players[user_id], view)
+            self._player_bytes[key] = data
+        return data
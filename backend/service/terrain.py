@@ -0,0 +1,29 @@
+"""
+LiveWar 地形网格编码
+
+说明：
+- 地形按行优先（y * width + x）存成一维 bytearray，每格一个字节：0 = 草地，1 = 泥土
+- 下发时按位打包：每格 1 bit，第 i 格位于第 i // 8 个字节的第 i % 8 位（低位在前），
+  60x60 地图固定为 450 字节
+"""
+
+TERRAIN_GRASS = 0
+TERRAIN_DIRT = 1
+
+
+def pack_bits(cells: bytes | bytearray) -> bytes:
+    """逐格地形 -> 位图（非 0 的格子记为 1）"""
+    out = bytearray((len(cells) + 7) // 8)
+    for i, value in enumerate(cells):
+        if value:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+def unpack_bits(data: bytes, size: int) -> bytearray:
+    """pack_bits 的逆操作；数据不足 size 格时剩余格子为草地"""
+    cells = bytearray(size)
+    for i in range(min(size, len(data) * 8)):
+        if data[i >> 3] >> (i & 7) & 1:
+            cells[i] = TERRAIN_DIRT
+    return cells
@@ -0,0 +1,180 @@
+"""
+LiveWar tick 性能剖析
+
+说明：
+- RoomProfile 记录每个房间最近 window 个 tick 的分阶段耗时与计数（实体数量、A* 展开节点数、序列化字节数），
+  每次记录只是写入环形缓冲区，p50 / p99 / 直方图只在读取时计算，可以在生产环境常开
+- 阶段名称与 benchmarks.tick_bench 一致：index / mine_refresh / unit_ai / combat / cleanup / state_build；
+  服务中另有 broadcast 阶段：广播协程把状态帧发送完所有连接的耗时（在发送完成时记录，不在 tick 内）
+- SamplingProfiler 是按需开启的采样剖析器：后台线程定时读取目标线程的调用栈，按函数汇总样本数；
+  关闭时没有任何开销，开启后到期自动停止
+"""
+
+import math
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Optional, Sequence, Tuple
+
+# 耗时直方图的桶上界（毫秒），最后一个桶为 +inf
+DURATION_BUCKETS_MS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+
+class RollingWindow:
+    """最近 size 个样本的环形缓冲区"""
+
+    __slots__ = ("_values", "_next", "count")
+
+    def __init__(self, size: int) -> None:
+        self._values = array("d", bytes(8 * size))
+        self._next = 0
+        self.count = 0  # 累计样本数（不限于窗口内）
+
+    def add(self, value: float) -> None:
+        values = self._values
+        values[self._next] = value
+        self._next = (self._next + 1) % len(values)
+        self.count += 1
+
+    def samples(self) -> Sequence[float]:
+        if self.count >= len(self._values):
+            return self._values
+        return self._values[:self._next]
+
+    def summary(self, scale: float = 1.0, buckets: Sequence[float] = ()) -> Dict[str, object]:
+        """窗口内样本的 mean / p50 / p99 / max（乘以 scale），buckets 非空时附带直方图"""
+        ordered = sorted(self.samples())
+        if not ordered:
+            return {"count": self.count, "window": 0}
+        size = len(ordered)
+
+        def pct(p: float) -> float:
+            return ordered[min(size - 1, max(0, math.ceil(p / 100 * size) - 1))] * scale
+
+        result: Dict[str, object] = {
+            "count": self.count,
+            "window": size,
+            "mean": sum(ordered) / size * scale,
+            "p50": pct(50),
+            "p99": pct(99),
+            "max": ordered[-1] * scale,
+        }
+        if buckets:
+            histogram = [0] * (len(buckets) + 1)
+            index = 0
+            for value in ordered:
+                value *= scale
+                while index < len(buckets) and value > buckets[index]:
+                    index += 1
+                histogram[index] += 1
+            result["histogram"] = {
+                "le": [*buckets, "+inf"],
+                "counts": histogram,
+            }
+        return result
+
+
+class RoomProfile:
+    """单个房间最近若干 tick 的分阶段耗时（秒）与计数"""
+
+    def __init__(self, window: int = 600) -> None:
+        self.window = window
+        self.phases: Dict[str, RollingWindow] = {}
+        self.counters: Dict[str, RollingWindow] = {}
+
+    def phase(self, name: str, started: float) -> float:
+        """记录从 started 到现在的阶段耗时，返回当前时间（作为下一阶段的开始时间）"""
+        now = time.perf_counter()
+        window = self.phases.get(name)
+        if window is None:
+            window = self.phases[name] = RollingWindow(self.window)
+        window.add(now - started)
+        return now
+
+    def count(self, name: str, value: float) -> None:
+        window = self.counters.get(name)
+        if window is None:
+            window = self.counters[name] = RollingWindow(self.window)
+        window.add(value)
+
+    def snapshot(self) -> Dict[str, object]:
+        """耗时单位为毫秒"""
+        return {
+            "phases_ms": {
+                name: window.summary(1000.0, DURATION_BUCKETS_MS) for name, window in self.phases.items()
+            },
+            "counters": {name: window.summary() for name, window in self.counters.items()},
+        }
+
+
+class SamplingProfiler:
+    """定时采样目标线程调用栈的剖析器（按需开启，到期自动停止）"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 32) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._self_counts: Counter = Counter()  # 函数位于栈顶的样本数
+        self._total_counts: Counter = Counter()  # 函数出现在栈中的样本数
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float = 30.0, thread_id: Optional[int] = None) -> None:
+        """开始采样 thread_id（默认为调用方所在线程），duration 秒后自动停止；重新开始会清空之前的结果"""
+        self.stop()
+        target = thread_id if thread_id is not None else threading.get_ident()
+        with self._lock:
+            self.samples = 0
+            self._self_counts.clear()
+            self._total_counts.clear()
+        self._stop.clear()
+        self.started_at = time.time()
+        self.stopped_at = 0.0
+        self._thread = threading.Thread(
+            target=self._run, args=(target, time.monotonic() + duration), name="livewar-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, thread_id: int, deadline: float) -> None:
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break  # 目标线程已退出
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            with self._lock:
+                self.samples += 1
+                self._self_counts[stack[0]] += 1
+                self._total_counts.update(set(stack))
+        self.stopped_at = time.time()
+
+    def report(self, limit: int = 30) -> Dict[str, object]:
+        """按栈顶样本数（self）与出现在栈中的样本数（total）排序的函数列表"""
+        with self._lock:
+            return {
+                "running": self.running,
+                "samples": self.samples,
+                "interval": self.interval,
+                "started_at": self.started_at,
+                "stopped_at": self.stopped_at,
+                "self": self._self_counts.most_common(limit),
+                "total": self._total_counts.most_common(limit),
+            }
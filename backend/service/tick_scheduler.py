@@ -0,0 +1,109 @@
+"""
+LiveWar 固定步长调度
+
+说明：
+- 每个 tick 有固定的截止时间（start + n * interval），处理完后只睡到下一个截止时间，而不是再睡满一个 interval
+- 处理超时（overrun）时按策略处理：
+  - catch_up：不等待直接执行下一个 tick 追赶进度，落后超过 max_catch_up_ticks 帧时丢弃多余的帧
+  - skip：丢弃所有已错过的帧，重新对齐到下一个截止时间
+- 所有房间共用一个调度循环：一帧（tick_interval）切分为若干子时隙，房间均匀分配到各子时隙，
+  每个子时隙批量推进其中的房间，平滑每帧内的 CPU 占用
+- 每个房间记录一份 TickStats，调度器整体记录每帧的 FrameStats
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class TickStats:
+    """单个房间的调度统计"""
+
+    ticks: int = 0
+    overruns: int = 0  # 处理完成时已错过下一个截止时间的次数
+    catch_up_ticks: int = 0  # 为追赶进度而不等待直接执行的 tick 数
+    skipped_ticks: int = 0  # 因落后过多而丢弃的 tick 数
+    last_tick_duration: float = 0.0
+    max_tick_duration: float = 0.0
+    total_tick_duration: float = 0.0
+
+    @property
+    def avg_tick_duration(self) -> float:
+        return self.total_tick_duration / self.ticks if self.ticks else 0.0
+
+    def record(self, duration: float) -> None:
+        self.ticks += 1
+        self.last_tick_duration = duration
+        self.total_tick_duration += duration
+        if duration > self.max_tick_duration:
+            self.max_tick_duration = duration
+
+
+@dataclass
+class FrameStats:
+    """全局调度器每帧（所有子时隙）的统计"""
+
+    frames: int = 0
+    active_rooms: int = 0
+    last_frame_cpu: float = 0.0  # 上一帧所有房间 tick 的总耗时（秒）
+    max_frame_cpu: float = 0.0
+    total_frame_cpu: float = 0.0
+
+    @property
+    def avg_frame_cpu(self) -> float:
+        return self.total_frame_cpu / self.frames if self.frames else 0.0
+
+    def record(self, cpu: float, active_rooms: int) -> None:
+        self.frames += 1
+        self.active_rooms = active_rooms
+        self.last_frame_cpu = cpu
+        self.total_frame_cpu += cpu
+        if cpu > self.max_frame_cpu:
+            self.max_frame_cpu = cpu
+
+
+class FixedTimestepClock:
+    """计算每个步长之后应等待的时间，并维护 TickStats"""
+
+    def __init__(
+        self,
+        interval: float,
+        stats: TickStats,
+        overrun_policy: str = "catch_up",
+        max_catch_up_ticks: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.stats = stats
+        self.overrun_policy = overrun_policy
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.clock = clock
+        self.next_deadline = clock()
+
+    def now(self) -> float:
+        return self.clock()
+
+    def finish_tick(self, started_at: float) -> float:
+        """一个 tick 处理完成后调用，返回距离下一个 tick 应等待的秒数"""
+        now = self.clock()
+        stats = self.stats
+        stats.record(now - started_at)
+
+        self.next_deadline += self.interval
+        lag = now - self.next_deadline
+        if lag <= 0:
+            return -lag
+
+        stats.overruns += 1
+        # 除了马上要执行的这一帧之外，还完整落后了多少帧
+        behind = int(lag // self.interval)
+        if self.overrun_policy == "catch_up" and behind <= self.max_catch_up_ticks:
+            stats.catch_up_ticks += 1
+            return 0.0
+
+        # 丢弃已错过的帧，重新对齐到下一个截止时间
+        skipped = behind + 1
+        stats.skipped_ticks += skipped
+        self.next_deadline += skipped * self.interval
+        return self.next_deadline - now
@@ -0,0 +1,198 @@
+"""
+LiveWar 单位列式存储（NumPy SoA）
+
+说明：
+- UnitState 仍是权威数据，UnitArrays 是每 tick 开始时重建的列式镜像（x / y / hp / team / type / 冷却 / 射程 / 攻击力）
+- 单位出生 / 死亡 / 移动后增量维护（与 unit_index、occupancy 同步），保证 tick 内查询看到的是当前位置
+- 最近目标查询与战斗结算（目标选择、射程判断、冷却过滤、伤害累加、死亡判定）按列向量化
+- units[row] 返回对应的 UnitState，AI 代码仍然直接读写 UnitState
+- numpy 是可选依赖：未安装时 NUMPY_AVAILABLE 为 False，调用方退回逐单位的实现
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy 未安装时使用逐单位的实现
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+TEAM_CODES = {"red": 0, "blue": 1}
+TYPE_CODES = {"miner": 0, "engineer": 1, "heavy_tank": 2, "assault_tank": 3}
+_TANK_CODES = (TYPE_CODES["heavy_tank"], TYPE_CODES["assault_tank"])
+# 突击坦克的目标优先级（越小越优先）：坦克 > 工程师 > 矿工，同优先级内按距离
+_ASSAULT_PRIORITY = (3, 2, 1, 1)
+# 优先级之间的间隔，远大于地图内任意两点距离的平方
+_PRIORITY_STEP = 1e6
+
+
+class UnitArrays:
+    """单位的列式镜像，行号与 units 列表一一对应（死亡单位只标记 alive=False，下个 tick 重建时剔除）"""
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.units: List = []
+        self._rows: Dict[int, int] = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.hp = np.zeros(capacity, dtype=np.float64)
+        self.team = np.zeros(capacity, dtype=np.int8)
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.last_attack = np.zeros(capacity, dtype=np.float64)
+        self.attack_range = np.zeros(capacity, dtype=np.float64)
+        self.attack = np.zeros(capacity, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self) -> None:
+        old = (self.x, self.y, self.hp, self.team, self.type, self.last_attack, self.attack_range, self.attack, self.alive)
+        size = len(self.units)
+        self._allocate(self.capacity * 2)
+        new = (self.x, self.y, self.hp, self.team, self.type, self.last_attack, self.attack_range, self.attack, self.alive)
+        for old_column, new_column in zip(old, new):
+            new_column[:size] = old_column[:size]
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    # ========== 维护 ==========
+
+    def rebuild(self, units: Sequence) -> None:
+        """按当前单位列表整体重建"""
+        self.units = []
+        self._rows.clear()
+        capacity = self.capacity
+        while capacity < len(units):
+            capacity *= 2
+        if capacity != self.capacity:
+            self._allocate(capacity)
+        for unit in units:
+            self.add(unit)
+
+    def add(self, unit) -> None:
+        if len(self.units) >= self.capacity:
+            self._grow()
+        row = len(self.units)
+        self.units.append(unit)
+        self._rows[unit.id] = row
+        self.x[row] = unit.x
+        self.y[row] = unit.y
+        self.hp[row] = unit.hp
+        self.team[row] = TEAM_CODES.get(unit.team, -1)
+        self.type[row] = TYPE_CODES.get(unit.type, -1)
+        self.last_attack[row] = unit.last_attack_time
+        self.attack_range[row] = unit.attack_range
+        self.attack[row] = unit.attack
+        self.alive[row] = not unit.is_dead
+
+    def remove(self, unit) -> None:
+        row = self._rows.get(unit.id)
+        if row is not None:
+            self.alive[row] = False
+
+    def move(self, unit) -> None:
+        row = self._rows.get(unit.id)
+        if row is not None:
+            self.x[row] = unit.x
+            self.y[row] = unit.y
+
+    # ========== 查询 ==========
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        team: str,
+        enemy: bool,
+        types: Tuple[str, ...] = (),
+        exclude_id: Optional[int] = None,
+    ):
+        """最近的敌方（enemy=True）或友方单位，可按类型过滤"""
+        size = len(self.units)
+        if not size:
+            return None
+        team_code = TEAM_CODES.get(team, -1)
+        teams = self.team[:size]
+        mask = self.alive[:size] & ((teams != team_code) if enemy else (teams == team_code))
+        if types:
+            unit_types = self.type[:size]
+            type_mask = unit_types == TYPE_CODES[types[0]]
+            for unit_type in types[1:]:
+                type_mask |= unit_types == TYPE_CODES[unit_type]
+            mask &= type_mask
+        if exclude_id is not None:
+            row = self._rows.get(exclude_id)
+            if row is not None:
+                mask[row] = False
+        candidates = np.flatnonzero(mask)
+        if not candidates.size:
+            return None
+        dist_sq = (self.x[candidates] - x) ** 2 + (self.y[candidates] - y) ** 2
+        return self.units[candidates[np.argmin(dist_sq)]]
+
+    # ========== 战斗 ==========
+
+    def select_targets(self, current_time: float, cooldown: float) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        为所有冷却完毕的存活单位选择攻击目标。
+
+        目标筛选规则与逐单位实现相同：
+        - 重装坦克只攻击坦克；突击坦克按 坦克 > 工程师 > 矿工 的优先级；其他单位攻击任意敌人
+        - 目标必须存活、属于敌方并且在攻击范围内，同优先级内选最近的
+
+        Returns:
+            (attackers, targets)：攻击者行号与目标行号，没有可攻击单位的目标为 -1
+        """
+        size = len(self.units)
+        alive = self.alive[:size]
+        attackers = np.flatnonzero(alive & (current_time - self.last_attack[:size] >= cooldown))
+        if not attackers.size:
+            return attackers, attackers
+
+        dx = self.x[attackers, None] - self.x[None, :size]
+        dy = self.y[attackers, None] - self.y[None, :size]
+        dist_sq = dx * dx + dy * dy
+        valid = (
+            alive[None, :]
+            & (self.team[attackers, None] != self.team[None, :size])
+            & (dist_sq <= self.attack_range[attackers, None] ** 2)
+        )
+
+        attacker_types = self.type[attackers]
+        target_types = self.type[:size]
+        heavy = attacker_types == TYPE_CODES["heavy_tank"]
+        if heavy.any():
+            is_tank = (target_types == _TANK_CODES[0]) | (target_types == _TANK_CODES[1])
+            valid[heavy] &= is_tank[None, :]
+
+        score = np.where(valid, dist_sq, np.inf)
+        assault = attacker_types == TYPE_CODES["assault_tank"]
+        if assault.any():
+            priority = np.take(np.array(_ASSAULT_PRIORITY, dtype=np.float64), np.clip(target_types, 0, 3))
+            score[assault] += priority[None, :] * _PRIORITY_STEP
+
+        best = score.argmin(axis=1)
+        has_target = np.isfinite(score[np.arange(attackers.size), best])
+        return attackers, np.where(has_target, best, -1)
+
+    def apply_damage(self, attackers: "np.ndarray", targets: "np.ndarray", current_time: float) -> "np.ndarray":
+        """
+        同时结算所有攻击：按目标累加伤害并更新冷却。
+
+        Returns:
+            被击中的目标行号（去重），结算后的血量在 self.hp 中
+        """
+        hit = targets >= 0
+        if not hit.any():
+            return targets[:0]
+        hit_targets = targets[hit]
+        # 伤害前同步血量（治疗等逻辑直接修改 UnitState）
+        for row in np.unique(hit_targets).tolist():
+            self.hp[row] = self.units[row].hp
+        np.subtract.at(self.hp, hit_targets, self.attack[attackers[hit]])
+        np.maximum(self.hp, 0, out=self.hp)
+        self.last_attack[attackers[hit]] = current_time
+        return np.unique(hit_targets)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 测试按 backend 目录下的顶层包（protos / service / rooms）导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,47 @@
+"""CooldownQueue：待命单位按 id 顺序返回，挂起的单位在自己移动或敌方单位靠近时唤醒"""
+from types import SimpleNamespace
+
+from service.combat_queue import CooldownQueue
+
+
+def _unit(unit_id: int, team: str, x: float, y: float, last_attack_time: float = 0.0):
+    return SimpleNamespace(id=unit_id, team=team, x=x, y=y, attack_range=3.0, last_attack_time=last_attack_time)
+
+
+def test_ready_units_are_returned_in_id_order():
+    queue = CooldownQueue(cooldown=1.0)
+    for unit_id, last_attack_time in ((5, 0.5), (2, 0.0), (9, 0.2), (1, 0.9)):
+        queue.add(_unit(unit_id, "red", 0, 0, last_attack_time))
+    assert [u.id for u in queue.pop_ready(1.3)] == [2, 9]
+    assert [u.id for u in queue.pop_ready(2.0)] == [1, 2, 5, 9]
+
+
+def test_parked_unit_wakes_on_own_move_or_approaching_enemy():
+    queue = CooldownQueue(cooldown=1.0)
+    watcher = _unit(1, "red", 10, 10)
+    ally = _unit(2, "red", 30, 30)
+    enemy = _unit(3, "blue", 50, 50)
+    for unit in (watcher, ally, enemy):
+        queue.add(unit)
+    queue.pop_ready(1.0)
+    queue.park(watcher)
+    assert 1 not in [u.id for u in queue.pop_ready(2.0)]
+
+    # 友军靠近不唤醒，敌方单位进入攻击范围覆盖的格子时唤醒
+    ally.x, ally.y = 11, 11
+    queue.moved(ally)
+    assert queue.parked_count == 1
+    enemy.x, enemy.y = 12, 10
+    queue.moved(enemy)
+    assert queue.parked_count == 0 and 1 in [u.id for u in queue.pop_ready(2.0)]
+
+    # 挂起的单位自己移动后重新查找目标；攻击后回到冷却堆，移除后不再返回
+    queue.park(watcher)
+    watcher.x += 1
+    queue.moved(watcher)
+    assert 1 in [u.id for u in queue.pop_ready(2.0)]
+    watcher.last_attack_time = 2.0
+    queue.cooled_down(watcher)
+    assert 1 not in [u.id for u in queue.pop_ready(2.5)]
+    queue.remove(watcher)
+    assert 1 not in [u.id for u in queue.pop_ready(5.0)] and len(queue) == 2
@@ -0,0 +1,42 @@
+"""多进程模式：工作进程退出后，房间连接的清理通知不应抛出异常"""
+import asyncio
+
+from rooms import live_war_room
+from rooms.live_war_room import LiveWarRoomManager
+from service.game_workers import GameWorkerPool
+
+
+class FakeWebSocket:
+    async def send_bytes(self, data: bytes) -> None:
+        pass
+
+
+def test_disconnect_after_worker_exit(monkeypatch):
+    async def scenario() -> None:
+        pool = GameWorkerPool(2)
+        monkeypatch.setattr(live_war_room, "game_worker_pool", pool)
+        pool._ensure_started()
+        room_id = next(rid for rid in range(1, 20) if pool._worker_index(rid) == 0)
+        try:
+            manager = LiveWarRoomManager()
+            first, second = FakeWebSocket(), FakeWebSocket()
+            manager.room_id_to_connections[room_id] = {first, second}
+
+            pool._workers[0][0].kill()
+            for _ in range(100):
+                if 0 not in pool._pending:
+                    break
+                await asyncio.sleep(0.05)
+            assert 0 not in pool._pending
+
+            manager.disconnect(room_id, first)  # 更新房间编码
+            manager.disconnect(room_id, second)  # 释放房间
+            # 写线程已发现管道关闭时同样丢弃
+            pool._writers[0]._closed = True
+            pool._pending[0] = {}
+            pool.resume_room(room_id)
+            pool.release_room(room_id)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(scenario())
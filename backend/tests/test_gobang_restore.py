@@ -0,0 +1,70 @@
+"""从快照恢复的五子棋对局：双方各自计算断线超时"""
+import asyncio
+
+from protos import chat_pb2
+from rooms import gobang_room
+from rooms.gobang_room import GobangRoomManager, GobangRoomState
+
+ROOM_ID = 9004
+BLACK, WHITE = 1, 2
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.sent.append(chat_pb2.WsEnvelope.FromString(data))
+
+
+def _restored_manager() -> GobangRoomManager:
+    original = GobangRoomManager()
+    original.room_states[ROOM_ID] = GobangRoomState(
+        black_user_id=BLACK, white_user_id=WHITE, joined_user_ids={BLACK, WHITE}, started=True
+    )
+    restored = GobangRoomManager()
+    assert restored.restore_rooms(original.checkpoint_rooms()) == [ROOM_ID]
+    return restored
+
+
+def _system_texts(ws: FakeWebSocket) -> list:
+    return [env.chat.content for env in ws.sent if env.HasField("chat")]
+
+
+def test_black_reconnect_still_times_out_white(monkeypatch):
+    monkeypatch.setattr(gobang_room, "DISCONNECT_TIMEOUT_SECONDS", 0.05)
+
+    async def scenario() -> None:
+        manager = _restored_manager()
+        ws = FakeWebSocket()
+        await manager.connect(ROOM_ID, ws, "black", BLACK)
+        assert (ROOM_ID, WHITE) in manager._disconnect_tasks
+        await asyncio.sleep(0.1)
+
+        state = manager.room_states[ROOM_ID]
+        assert not state.started and state.black_user_id is None
+        assert any("白方" in text and "black 获胜" in text for text in _system_texts(ws))
+        manager.disconnect(ROOM_ID, ws)
+
+    asyncio.run(scenario())
+
+
+def test_neither_player_returns_ends_without_winner(monkeypatch):
+    monkeypatch.setattr(gobang_room, "DISCONNECT_TIMEOUT_SECONDS", 0.05)
+
+    async def scenario() -> None:
+        manager = _restored_manager()
+        spectator = FakeWebSocket()
+        await manager.connect(ROOM_ID, spectator, "viewer", 3)
+        await asyncio.sleep(0.1)
+
+        assert not manager.room_states[ROOM_ID].started
+        assert not manager._disconnect_tasks
+        texts = [text for text in _system_texts(spectator) if "对局结束" in text]
+        assert texts and all("不判胜负" in text for text in texts)
+        manager.disconnect(ROOM_ID, spectator)
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+"""LiveWar 模拟时钟只由游戏循环推进，客户端命令不会让对局时间快进"""
+import asyncio
+
+from protos import game_pb2
+from service.game_manager import LiveWarGameManager
+
+ROOM_ID = 9002
+
+
+def test_commands_do_not_advance_simulation_clock():
+    async def scenario() -> None:
+        gm = LiveWarGameManager()
+        for user_id, team in ((1, "red"), (2, "blue")):
+            join = game_pb2.GameMessage(
+                type=game_pb2.GameMessage.JOIN_GAME,
+                join_game=game_pb2.JoinGameRequest(team=team),
+            )
+            gm.handle_envelope_from_client(ROOM_ID, user_id, f"user{user_id}", join)
+        gm._stop_game_loop(ROOM_ID)
+        state = gm.room_states[ROOM_ID]
+        tick, game_time, frame_seq = state.tick, state.game_time, state.frame_seq
+
+        select = game_pb2.GameMessage(
+            type=game_pb2.GameMessage.SELECT_UNIT,
+            select_unit=game_pb2.SelectUnitRequest(unit_type="miner"),
+        )
+        for _ in range(50):
+            assert gm.handle_envelope_from_client(ROOM_ID, 1, "user1", select)  # 仍然回复状态帧
+
+        assert (state.tick, state.game_time) == (tick, game_time)
+        assert state.frame_seq == frame_seq + 50
+
+        await gm._process_tick(ROOM_ID)
+        assert state.tick == tick + 1
+        gm.release_room(ROOM_ID)
+
+    asyncio.run(scenario())
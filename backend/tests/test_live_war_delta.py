@@ -0,0 +1,157 @@
+"""
+LiveWar 状态帧下发：中途加入 / 漏帧的连接先收到完整状态，之后的增量总是基于该连接收到过的帧；
+一次性特效只随一个状态帧下发
+"""
+import asyncio
+
+from protos import chat_pb2, game_pb2
+from rooms.live_war_room import LiveWarRoomManager
+from service import game_manager as live_war_game_manager
+from service.game_manager import HealEffect
+
+ROOM_ID = 9001
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_bytes(self, data: bytes) -> None:
+        self.sent.append(data)
+
+    async def close(self) -> None:
+        pass
+
+    def state_frames(self):
+        frames = []
+        for data in self.sent:
+            env = chat_pb2.WsEnvelope.FromString(data)
+            if env.HasField("game") and env.game.type == game_pb2.GameMessage.GAME_STATE:
+                frames.append(env.game.game_state)
+        return frames
+
+
+async def _join(manager: LiveWarRoomManager, user_id: int, team: str = "") -> FakeWebSocket:
+    ws = FakeWebSocket()
+    await manager.connect(ROOM_ID, ws, f"user{user_id}", user_id)
+    await manager.send_initial_state(ROOM_ID, ws)
+    options = game_pb2.GameMessage(
+        type=game_pb2.GameMessage.CLIENT_OPTIONS,
+        client_options=game_pb2.ClientOptionsRequest(supports_delta=True),
+    )
+    await manager.handle_game_message(ROOM_ID, ws, options)
+    if team:
+        join = game_pb2.GameMessage(
+            type=game_pb2.GameMessage.JOIN_GAME,
+            join_game=game_pb2.JoinGameRequest(team=team),
+        )
+        await manager.handle_game_message(ROOM_ID, ws, join)
+    return ws
+
+
+async def _run_ticks(count: int) -> None:
+    gm = live_war_game_manager.game_manager
+    for _ in range(count):
+        await gm._process_tick(ROOM_ID)
+        await asyncio.sleep(0)  # 广播回调在任务中发送
+
+
+def _assert_delta_chain(frames) -> int:
+    """每个增量帧的基线都是该连接上一个收到的完整 / 增量帧，返回增量帧数"""
+    assert frames and not frames[0].HasField("delta")
+    deltas = 0
+    for previous, frame in zip(frames, frames[1:]):
+        if frame.HasField("delta"):
+            assert previous.frame_seq > 0
+            assert frame.base_frame_seq == previous.frame_seq
+            deltas += 1
+    return deltas
+
+
+def test_joining_client_gets_full_frame_before_deltas():
+    async def scenario() -> None:
+        gm = live_war_game_manager.game_manager
+        manager = LiveWarRoomManager()
+        try:
+            first = await _join(manager, 1, "red")
+            await _join(manager, 2, "blue")
+            gm._stop_game_loop(ROOM_ID)  # 手动推进 tick
+            await _run_ticks(20)
+
+            second = await _join(manager, 3)  # 中途加入的观战者
+            joined_at = len(first.state_frames())
+            await _run_ticks(20)
+
+            first_frames = first.state_frames()
+            second_frames = second.state_frames()
+            assert _assert_delta_chain(first_frames) > 0
+            assert _assert_delta_chain(second_frames) > 0
+            # 加入后的第一个广播帧：老连接收到增量，新连接收到同一帧的完整状态
+            broadcast = next(f for f in second_frames if f.frame_seq > 0)
+            assert not broadcast.HasField("delta") and len(broadcast.room.units) > 0
+            same_frame = next(f for f in first_frames[joined_at:] if f.frame_seq == broadcast.frame_seq)
+            assert same_frame.HasField("delta")
+        finally:
+            gm.release_room(ROOM_ID)
+
+    asyncio.run(scenario())
+
+
+def test_connection_that_missed_a_frame_gets_full_frame():
+    async def scenario() -> None:
+        gm = live_war_game_manager.game_manager
+        manager = LiveWarRoomManager()
+        try:
+            ws = await _join(manager, 1, "red")
+            await _join(manager, 2, "blue")
+            gm._stop_game_loop(ROOM_ID)
+            await _run_ticks(10)
+            # 模拟漏掉一帧：该连接的基线停留在更早的帧
+            manager.websocket_to_frame_seq[ws] -= 1
+            received = len(ws.state_frames())
+            await _run_ticks(4)
+
+            frames = ws.state_frames()[received:]
+            assert not frames[0].HasField("delta")
+            assert _assert_delta_chain(frames) > 0
+        finally:
+            gm.release_room(ROOM_ID)
+
+    asyncio.run(scenario())
+
+
+def test_effects_are_delivered_in_exactly_one_frame():
+    async def scenario() -> None:
+        gm = live_war_game_manager.game_manager
+        manager = LiveWarRoomManager()
+        try:
+            ws = await _join(manager, 1, "red")
+            await _join(manager, 2, "blue")
+            gm._stop_game_loop(ROOM_ID)
+            await _run_ticks(4)
+            state = gm.room_states[ROOM_ID]
+            state.heal_effects.append(HealEffect(id=999999, x=1.0, y=1.0, created_time=state.game_time, team="red"))
+            received = len(ws.state_frames())
+
+            # 命令回复帧取走特效，之后的周期广播不再重复下发
+            select = game_pb2.GameMessage(
+                type=game_pb2.GameMessage.SELECT_UNIT,
+                select_unit=game_pb2.SelectUnitRequest(unit_type="miner"),
+            )
+            await manager.handle_game_message(ROOM_ID, ws, select)
+            await _run_ticks(4)
+
+            frames = ws.state_frames()[received:]
+            assert len(frames) > 1
+            carried = [
+                f.frame_seq for f in frames
+                if any(h.id == "999999" for h in list(f.room.heal_effects) + list(f.delta.heal_effects))
+            ]
+            assert carried == [frames[0].frame_seq]
+        finally:
+            gm.release_room(ROOM_ID)
+
+    asyncio.run(scenario())
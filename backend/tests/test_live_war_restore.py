@@ -0,0 +1,38 @@
+"""从快照恢复的 LiveWar 对局：在有连接重新进入房间之前暂停"""
+import asyncio
+
+from protos import game_pb2
+from service.game_manager import LiveWarGameManager
+
+ROOM_ID = 9003
+
+
+def test_restored_room_stays_paused_until_resumed():
+    async def scenario() -> None:
+        gm = LiveWarGameManager()
+        for user_id, team in ((1, "red"), (2, "blue")):
+            join = game_pb2.GameMessage(
+                type=game_pb2.GameMessage.JOIN_GAME,
+                join_game=game_pb2.JoinGameRequest(team=team),
+            )
+            gm.handle_envelope_from_client(ROOM_ID, user_id, f"user{user_id}", join)
+        gm._stop_game_loop(ROOM_ID)
+        for _ in range(5):
+            await gm._process_tick(ROOM_ID)
+        sections = gm.checkpoint_rooms()
+
+        restored = LiveWarGameManager()
+        assert restored.restore_rooms(sections) == [ROOM_ID]
+        state = restored.room_states[ROOM_ID]
+        assert state.game_started and state.tick == 5
+        assert ROOM_ID not in restored.scheduled_rooms
+
+        restored.resume_room(ROOM_ID)
+        assert ROOM_ID in restored.scheduled_rooms
+        await asyncio.sleep(0.35)
+        assert state.tick > 5
+        restored.resume_room(ROOM_ID)  # 已在运行：不受影响
+        restored.release_room(ROOM_ID)
+        await asyncio.sleep(0.15)  # 全局循环在没有房间后自行退出
+
+    asyncio.run(scenario())